@@ -7,8 +7,19 @@ from flask import Flask
 from config import config
 from flask_cors import CORS
 
-def create_app(config_name='default'):
-    """Factory function do tworzenia aplikacji Flask."""
+def create_app(config_name='default', preload=None):
+    """
+    Factory function do tworzenia aplikacji Flask.
+    
+    Parameters:
+    -----------
+    config_name : str
+        Nazwa konfiguracji z config.config
+    preload : bool lub None
+        Wczytanie i rozgrzewka modelu w wątku w tle zaraz po utworzeniu
+        aplikacji (None = MODEL_PRELOAD z konfiguracji). Gotowość
+        zgłasza /readyz.
+    """
     from pathlib import Path
     
     BASE_DIR = Path(__file__).parent.parent
@@ -19,8 +30,26 @@ def create_app(config_name='default'):
         static_folder=str(BASE_DIR / 'static')
     )
     app.config.from_object(config[config_name])
+    
+    # Serializacja JSON przez orjson (jeśli zainstalowany)
+    from app.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
     CORS(app)
     
+    # Metryki (rejestr procesu - wyłączony nie mierzy nic)
+    from app.services.metrics import metrics
+    metrics.enabled = app.config.get('METRICS_ENABLED', True)
+    
+    # Profiler żądań (domyślnie wyłączony - zero kosztu poza jednym sprawdzeniem)
+    if app.config.get('PROFILING_ENABLED', False):
+        from app.api.routes import init_profiler
+        init_profiler(app.config)
+    
+    # Kontrola przyjęć predykcji (0 = wyłączona)
+    if app.config.get('ADMISSION_MAX_IN_FLIGHT', 0) > 0:
+        from app.api.routes import init_admission
+        init_admission(app.config)
+    
     # Register blueprints
     from app.api import bp as api_bp
     app.register_blueprint(api_bp, url_prefix='/api')
@@ -28,5 +57,11 @@ def create_app(config_name='default'):
     from app.main import bp as main_bp
     app.register_blueprint(main_bp)
     
+    if preload is None:
+        preload = app.config.get('MODEL_PRELOAD', True)
+    if preload:
+        from app.api.routes import start_background_load
+        start_background_load(app)
+    
     return app
 
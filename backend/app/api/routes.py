@@ -2,63 +2,631 @@
 API Routes dla predykcji CPV
 """
 
+import hmac
+import threading
+import time
+
 from app.api import bp
-from flask import request, jsonify
+from flask import request, jsonify, current_app, g, Response, stream_with_context
 from app.services.predictor import CPVPredictor
+from app.services.prediction_cache import PredictionCache
+from app.services.shared_cache import SQLitePredictionCache
+from app.services.micro_batcher import MicroBatcher, BatcherOverloaded, BatcherTimeout
+from app.services.admission import AdmissionController, AdmissionRejected, DEADLINE_MESSAGE
+from app.services.model_reload import PredictorHandle, ModelReloader, validate_predictor
+from app.services.metrics import metrics, server_timing
+from app.services.model_info import EncodedPayload
+from app.services import stream_scoring
+from app.services.profiler import RequestProfiler, MODES as PROFILE_MODES
 from app.models.model_loader import ModelLoader
 
-# Globalna instancja predyktora
-predictor = None
+# Bieżący predyktor - podmieniany atomowo przy przeładowaniu modelu;
+# żądanie odczytuje go raz i używa tej samej instancji do końca
+predictor_handle = PredictorHandle()
+
+# Przeładowanie modelu w tle (endpoint administracyjny / obserwacja pliku)
+model_reloader = None
+
+# Profiler żądań (None = wyłączony, PROFILING_ENABLED)
+request_profiler = None
+
+# Endpointy objęte uzbrojonym przebiegiem profilowania
+PROFILED_ENDPOINTS = ('api.api_predict', 'api.api_predict_batch')
+
+# Zserializowana odpowiedź /model-info: (predyktor, EncodedPayload)
+_model_info_payload = (None, None)
+
+# Jedno wczytanie modelu naraz (wątek startowy vs pierwsze żądania)
+_init_lock = threading.Lock()
+
+# Stan gotowości procesu dla /readyz: pending -> loading -> ready | failed
+readiness = {'state': 'pending', 'error': None, 'duration_s': None}
+
+# Cache predykcji (None = wyłączony)
+prediction_cache = None
+
+# Mikro-batcher pojedynczych predykcji (None = wyłączony)
+micro_batcher = None
+
+# Kontrola przyjęć predykcji (None = wyłączona, ADMISSION_MAX_IN_FLIGHT)
+admission = None
+
+# Endpointy objęte kontrolą przyjęć (strumień trzymałby miejsce przez cały plik)
+ADMITTED_ENDPOINTS = ('api.api_predict', 'api.api_predict_batch')
 
 def init_predictor():
     """Inicjalizuje predyktor przy starcie aplikacji."""
-    global predictor
-    if predictor is None:
+    with _init_lock:
+        return _init_predictor()
+
+def _init_predictor():
+    global prediction_cache, micro_batcher, model_reloader
+    if predictor_handle.get() is None:
         model_data = ModelLoader.load()
         if model_data:
-            predictor = CPVPredictor(model_data)
+            backend = current_app.config.get('PREDICTION_BACKEND', 'sklearn')
+            predictor_handle.set_if_empty(CPVPredictor(model_data, backend=backend))
+    
+    cache_size = current_app.config.get('PREDICTION_CACHE_SIZE', 0)
+    if prediction_cache is None and cache_size > 0:
+        prediction_cache = create_prediction_cache(current_app.config)
+    ModelLoader.register_reload_hook(on_model_reload)
+    
+    if micro_batcher is None and current_app.config.get('MICRO_BATCH_ENABLED', False):
+        micro_batcher = MicroBatcher(
+            get_predictor=predictor_handle.get,
+            max_wait_ms=current_app.config.get('MICRO_BATCH_MAX_WAIT_MS', 2.0),
+            max_batch=current_app.config.get('MICRO_BATCH_MAX_SIZE', 64),
+            max_queue=current_app.config.get('MICRO_BATCH_MAX_QUEUE', 1024)
+        )
+    
+    if model_reloader is None:
+        settings = ModelLoader.settings()
+        model_reloader = ModelReloader(
+            predictor_handle,
+            build=lambda: build_predictor(settings),
+            watch_path=ModelLoader.watch_path(settings),
+            poll_interval=current_app.config.get('MODEL_WATCH_INTERVAL', 0)
+        )
+        model_reloader.on_swap(on_predictor_swap)
+    model_reloader.ensure_watching()
+    return predictor_handle.get()
+
+def warm_up():
+    """
+    Wczytuje model i wykonuje syntetyczną predykcję rozgrzewkową.
+    
+    Po sukcesie /readyz zgłasza gotowość - pierwsze prawdziwe żądanie nie
+    płaci za unpickle ani za pierwsze wywołanie lasu.
+    
+    Returns:
+    --------
+    CPVPredictor lub None
+    """
+    start = time.perf_counter()
+    readiness.update(state='loading', error=None)
+    try:
+        predictor = init_predictor()
+        if predictor is None:
+            raise RuntimeError('Model nie został wczytany')
+        validate_predictor(predictor)
+        model_info_payload(predictor)
+    except Exception as e:
+        readiness.update(state='failed', error=str(e))
+        print(f"❌ Rozgrzewka modelu nieudana: {e}")
+        return None
+    readiness.update(state='ready', duration_s=time.perf_counter() - start)
+    print(f"✅ Model gotowy (wczytanie i rozgrzewka: {readiness['duration_s']:.2f}s)")
     return predictor
 
+def model_info_payload(current):
+    """Odpowiedź /model-info serializowana raz dla danego predyktora (wersji modelu)."""
+    global _model_info_payload
+    owner, payload = _model_info_payload
+    if owner is not current:
+        payload = EncodedPayload(current_app.json.dumps(current.get_model_info()).encode('utf-8'))
+        _model_info_payload = (current, payload)
+    return payload
+
+def start_background_load(app):
+    """Uruchamia warm_up() w wątku w tle - create_app nie czeka na model."""
+    def run():
+        with app.app_context():
+            warm_up()
+    
+    thread = threading.Thread(target=run, name='model-preload', daemon=True)
+    thread.start()
+    return thread
+
+def is_ready():
+    """Model wczytany i rozgrzany."""
+    return readiness['state'] == 'ready' and predictor_handle.get() is not None
+
+def get_predictor():
+    """Bieżący predyktor (inicjalizacja przy pierwszym żądaniu)."""
+    current = predictor_handle.get()
+    if current is None:
+        current = init_predictor()
+        # Bez MODEL_PRELOAD rozgrzewką jest pierwsze żądanie
+        if current is not None and readiness['state'] == 'pending':
+            readiness.update(state='ready')
+        return current
+    # Wątek obserwacji pliku nie przeżywa fork - uruchamiany w każdym workerze
+    model_reloader.ensure_watching()
+    return current
+
+def build_predictor(settings):
+    """Wczytuje model z dysku i buduje nowy predyktor (bez podmiany bieżącego)."""
+    model_data = ModelLoader.read(settings)
+    new = CPVPredictor(model_data, backend=settings['PREDICTION_BACKEND'])
+    # Ustawienia procesu (np. n_jobs=1 z wsgi.py) przechodzą na nowy model
+    old = predictor_handle.get()
+    if old is not None and hasattr(old.model, 'n_jobs') and hasattr(new.model, 'n_jobs'):
+        new.model.n_jobs = old.model.n_jobs
+    return new
+
+def create_prediction_cache(config):
+    """Tworzy cache predykcji: 'memory' (w procesie) lub 'sqlite' (wspólny dla procesów)."""
+    backend = config.get('PREDICTION_CACHE_BACKEND', 'memory')
+    if backend == 'sqlite':
+        return SQLitePredictionCache(
+            config['SHARED_CACHE_PATH'],
+            maxsize=config.get('PREDICTION_CACHE_SIZE'),
+            ttl=config.get('PREDICTION_CACHE_TTL')
+        )
+    if backend != 'memory':
+        raise ValueError(f"Nieznany backend cache: {backend}")
+    return PredictionCache(
+        maxsize=config.get('PREDICTION_CACHE_SIZE'),
+        ttl=config.get('PREDICTION_CACHE_TTL')
+    )
+
+def on_predictor_swap(new, old):
+    """Po podmianie predyktora: ModelLoader wskazuje nowy model (i uruchamia hooki)."""
+    ModelLoader.replace(new.model_data)
+
+def on_model_reload():
+    """Po przeładowaniu modelu: predyktor dla nowego modelu i unieważniony cache."""
+    model_data = ModelLoader.load()
+    current = predictor_handle.get()
+    # ModelLoader.reload() wywołane bezpośrednio - predyktor budowany od razu
+    if model_data and current is not None and current.model_data is not model_data:
+        predictor_handle.swap(CPVPredictor(model_data, backend=current.backend))
+    if prediction_cache is not None:
+        prediction_cache.invalidate()
+
+def compute_predict(current_predictor, data):
+    """Predykcja bezpośrednio albo przez mikro-batcher (jedno predict_proba dla wielu żądań)."""
+    if micro_batcher is None:
+        return current_predictor.predict(data)
+    # Nie czekamy na partię dłużej niż klient na odpowiedź
+    timeout = current_app.config.get('MICRO_BATCH_TIMEOUT', 5.0)
+    deadline = g.get('request_deadline')
+    if deadline is not None:
+        timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+    # Czas oczekiwania w kolejce i na partię (etapy lasu liczy wątek batchera)
+    with metrics.stage('batch_wait'):
+        return micro_batcher.predict(data, timeout=timeout)
+
+def cached_predict(current_predictor, data):
+    """Predykcja przez cache - powtarzające się oferty nie przechodzą przez las."""
+    if prediction_cache is None:
+        return compute_predict(current_predictor, data)
+    
+    # Wersja modelu w kluczu - wyniki różnych modeli nigdy się nie mieszają
+    key = (current_predictor.model_version,) + current_predictor.cache_key(
+        data, snap=current_app.config.get('PREDICTION_CACHE_SNAP', False)
+    )
+    with metrics.stage('cache'):
+        result = prediction_cache.get(key)
+    if result is None:
+        result = compute_predict(current_predictor, data)
+        with metrics.stage('cache'):
+            prediction_cache.set(key, result)
+    return result
+
+@bp.before_request
+def start_request_metrics():
+    """Początek pomiaru żądania (i zbierania etapów dla Server-Timing)."""
+    g.request_start = time.perf_counter()
+    if current_app.config.get('SERVER_TIMING_ENABLED', False):
+        metrics.begin_request()
+
+@bp.after_request
+def record_request_metrics(response):
+    """Czas żądania, liczniki i opcjonalny nagłówek Server-Timing."""
+    start = g.pop('request_start', None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    endpoint = request.endpoint or 'unknown'
+    metrics.observe('cpv_request_seconds', elapsed, endpoint=endpoint)
+    metrics.inc('cpv_requests_total', endpoint=endpoint, status=response.status_code)
+    if response.status_code >= 400:
+        metrics.inc('cpv_request_errors_total', endpoint=endpoint)
+    if current_app.config.get('SERVER_TIMING_ENABLED', False):
+        response.headers['Server-Timing'] = server_timing(metrics.end_request(), total=elapsed)
+    return response
+
+def init_admission(config):
+    """Tworzy kontrolę przyjęć procesu (limit równoległych predykcji i kolejka)."""
+    global admission
+    admission = AdmissionController(
+        config['ADMISSION_MAX_IN_FLIGHT'],
+        max_queue=config.get('ADMISSION_MAX_QUEUE', 16),
+        queue_timeout_ms=config.get('ADMISSION_QUEUE_TIMEOUT_MS', 100.0)
+    )
+    return admission
+
+def request_deadline():
+    """
+    Termin klienta (time.monotonic()) z nagłówków żądania.
+    
+    X-Request-Timeout-Ms - budżet w milisekundach od przyjęcia żądania,
+    X-Request-Deadline - bezwzględny termin (sekundy Unix). Niepoprawne
+    wartości są ignorowane.
+    """
+    deadlines = []
+    try:
+        if 'X-Request-Timeout-Ms' in request.headers:
+            deadlines.append(time.monotonic() + float(request.headers['X-Request-Timeout-Ms']) / 1000.0)
+        if 'X-Request-Deadline' in request.headers:
+            remaining = float(request.headers['X-Request-Deadline']) - time.time()
+            deadlines.append(time.monotonic() + remaining)
+    except ValueError:
+        return None
+    return min(deadlines) if deadlines else None
+
+def overloaded_response(message, status=503):
+    """Szybka odpowiedź przy przeciążeniu - z Retry-After dla klienta i load balancera."""
+    response = jsonify({'error': message})
+    response.status_code = status
+    if status == 503:
+        response.headers['Retry-After'] = str(current_app.config.get('ADMISSION_RETRY_AFTER', 1))
+    return response
+
+def expired_deadline_response():
+    """
+    504 dla żądania, którego termin klienta już minął (None = można oceniać).
+    
+    Sprawdzane przed przyjęciem (także bez kontroli przyjęć) i ponownie
+    tuż przed predykcją - miejsce może zwolnić się już po terminie.
+    """
+    deadline = g.get('request_deadline')
+    if deadline is None or deadline > time.monotonic():
+        return None
+    if admission is not None:
+        admission.record_shed('deadline')
+    metrics.inc('cpv_admission_total', decision='shed', reason='deadline')
+    return overloaded_response(DEADLINE_MESSAGE, status=504)
+
+@bp.before_request
+def admit_request():
+    """Kontrola przyjęć: 503 przy przeciążeniu, 504 gdy termin klienta już minął."""
+    g.request_deadline = request_deadline()
+    if request.endpoint not in ADMITTED_ENDPOINTS:
+        return None
+    if admission is None:
+        return expired_deadline_response()
+    try:
+        waited = admission.acquire(g.request_deadline)
+    except AdmissionRejected as e:
+        metrics.inc('cpv_admission_total', decision='shed', reason=e.reason)
+        return overloaded_response(str(e), status=504 if e.reason == 'deadline' else 503)
+    g.admitted = True
+    metrics.inc('cpv_admission_total', decision='admitted', reason='')
+    metrics.observe('cpv_admission_wait_seconds', waited)
+    return None
+
+@bp.teardown_request
+def release_admission(exc):
+    """Zwalnia miejsce przyjętego żądania (także po wyjątku)."""
+    if g.pop('admitted', False):
+        admission.release()
+
+def init_profiler(config):
+    """Tworzy profiler żądań; PROFILE_REQUESTS > 0 uzbraja go od startu."""
+    global request_profiler
+    request_profiler = RequestProfiler(
+        config['PROFILE_DIR'], interval_ms=config.get('PROFILE_SAMPLE_INTERVAL_MS', 1.0)
+    )
+    if config.get('PROFILE_REQUESTS', 0) > 0:
+        request_profiler.arm(config.get('PROFILE_MODE', 'sample'), config['PROFILE_REQUESTS'])
+    return request_profiler
+
+@bp.before_request
+def start_request_profile():
+    """
+    Profilowanie żądania: nagłówek X-Profile: sample|cprofile (z X-Admin-Token)
+    albo uzbrojony przebieg dla endpointów predykcji.
+    """
+    if request_profiler is None:
+        return
+    mode = request.headers.get('X-Profile')
+    if mode is not None:
+        if mode not in PROFILE_MODES or not admin_authorized():
+            return
+    elif request.endpoint not in PROFILED_ENDPOINTS:
+        return
+    session = request_profiler.begin(mode)
+    if session is not None:
+        g.profile_session = session
+
+@bp.after_request
+def finish_request_profile(response):
+    """Koniec profilowania; nazwa pliku wynikowego w nagłówku X-Profile-Output."""
+    session = g.pop('profile_session', None)
+    if session is not None:
+        path = request_profiler.end(session)
+        if path is not None:
+            response.headers['X-Profile-Output'] = path.name
+    return response
+
+@bp.teardown_request
+def abort_request_profile(exc):
+    """Zamyka profilowanie, jeśli żądanie zakończyło się wyjątkiem przed after_request."""
+    session = g.pop('profile_session', None)
+    if session is not None:
+        request_profiler.end(session)
+
+def metrics_gauges():
+    """Wartości chwilowe dla /metrics: model, gotowość, cache, batcher, przeładowania."""
+    current = predictor_handle.get()
+    gauges = [('cpv_ready', 'Model wczytany i rozgrzany', {}, int(is_ready()))]
+    if current is not None:
+        gauges.append(('cpv_model_info', 'Bieżąca wersja modelu',
+                       {'version': current.model_version or 'unknown', 'backend': current.backend}, 1))
+    if prediction_cache is not None:
+        stats = prediction_cache.stats()
+        for key in ('size', 'hits', 'misses', 'evictions'):
+            gauges.append((f'cpv_cache_{key}', f'Cache predykcji: {key}',
+                           {'backend': stats['backend']}, stats[key]))
+    if micro_batcher is not None:
+        stats = micro_batcher.stats()
+        for key in ('queue_depth', 'batches', 'rejected', 'timed_out', 'avg_batch_size'):
+            gauges.append((f'cpv_batcher_{key}', f'Mikro-batcher: {key}', {}, stats[key]))
+    if admission is not None:
+        stats = admission.stats()
+        for key in ('in_flight', 'waiting', 'max_in_flight'):
+            gauges.append((f'cpv_admission_{key}', f'Kontrola przyjęć: {key}', {}, stats[key]))
+    if model_reloader is not None:
+        gauges.append(('cpv_model_reloads', 'Udane przeładowania modelu', {}, model_reloader.reloads))
+        gauges.append(('cpv_model_reload_failures', 'Nieudane przeładowania modelu', {},
+                       model_reloader.failures))
+    return gauges
+
 @bp.route('/predict', methods=['POST'])
 def api_predict():
     """API endpoint do predykcji."""
-    global predictor
+    predictor = get_predictor()
     
     if predictor is None:
-        predictor = init_predictor()
+        return jsonify({'error': 'Model nie został wczytany'}), 500
+    
+    try:
+        with metrics.stage('parse'):
+            data = request.get_json()
+        
+        # Walidacja danych - ta sama co dla wierszy /predict/batch, przed cache
+        # i mikro-batcherem (wynik nie zależy od ustawień wydajności)
+        error = predictor.validate_offer(data)
+        if error is not None:
+            return jsonify({'error': error}), 400
+        
+        # Termin klienta mógł minąć w kolejce lub przy parsowaniu
+        expired = expired_deadline_response()
+        if expired is not None:
+            return expired
+        
+        # Predykcja
+        result = cached_predict(predictor, data)
+        
+        with metrics.stage('serialize'):
+            return jsonify({
+                'success': True,
+                'result': result
+            })
+    except BatcherOverloaded as e:
+        return overloaded_response(str(e))
+    except BatcherTimeout as e:
+        return overloaded_response(str(e), status=504)
+    except ValueError as e:
+        # Błąd walidacji oferty zgłoszony przez mikro-batcher
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/predict/batch', methods=['POST'])
+def api_predict_batch():
+    """API endpoint do predykcji wsadowej (wiele ofert w jednym żądaniu)."""
+    predictor = get_predictor()
     
     if predictor is None:
         return jsonify({'error': 'Model nie został wczytany'}), 500
     
     try:
-        data = request.get_json()
+        with metrics.stage('parse'):
+            data = request.get_json()
         
         # Walidacja danych
-        required_fields = ['VALUE_EURO', 'CAE_NAME', 'NUTS', 'TYPE_OF_CONTRACT']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Brakuje pola: {field}'}), 400
+        if not isinstance(data, dict) or not isinstance(data.get('offers'), list):
+            return jsonify({'error': 'Brakuje pola: offers (lista ofert)'}), 400
+        
+        offers = data['offers']
+        max_batch_size = current_app.config.get('MAX_BATCH_SIZE', 1000)
+        if len(offers) > max_batch_size:
+            return jsonify({'error': f'Za dużo ofert w partii (maksymalnie {max_batch_size})'}), 400
+        
+        top_n = data.get('top_n', 5)
+        if not isinstance(top_n, int) or top_n < 1:
+            return jsonify({'error': 'Nieprawidłowa wartość top_n'}), 400
+        
+        expired = expired_deadline_response()
+        if expired is not None:
+            return expired
         
         # Predykcja
-        result = predictor.predict(data)
+        results = predictor.predict_batch(offers, top_n=top_n)
         
-        return jsonify({
-            'success': True,
-            'result': result
-        })
+        with metrics.stage('serialize'):
+            return jsonify({
+                'success': True,
+                'count': len(results),
+                'results': results
+            })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/predict/stream', methods=['POST'])
+def api_predict_stream():
+    """
+    API endpoint do strumieniowej predykcji plików CSV / NDJSON.
+    
+    Ciało żądania: CSV (Content-Type: text/csv, kolumny jak w
+    data/ted_sample.csv) albo NDJSON (application/x-ndjson). Parametry:
+    format=ndjson|csv (wynik), top_n, id (kolumna przepisywana do wyniku).
+    Odpowiedź jest wysyłana partiami (chunked transfer encoding); cały
+    plik jest oceniany jedną wersją modelu.
+    """
+    predictor = get_predictor()
+    
+    if predictor is None:
+        return jsonify({'error': 'Model nie został wczytany'}), 500
+    
+    input_format = stream_scoring.INPUT_MIMETYPES.get(request.mimetype)
+    if input_format is None:
+        return jsonify({'error': 'Obsługiwane typy: text/csv, application/x-ndjson'}), 415
+    
+    output_format = request.args.get('format', 'ndjson')
+    if output_format not in stream_scoring.OUTPUT_MIMETYPES:
+        return jsonify({'error': f'Nieznany format wyniku: {output_format}'}), 400
+    
+    top_n = request.args.get('top_n', 5, type=int)
+    if top_n is None or top_n < 1:
+        return jsonify({'error': 'Nieprawidłowa wartość top_n'}), 400
+    
+    id_field = request.args.get('id')
+    lines = stream_scoring.iter_lines(
+        request.stream, max_length=current_app.config.get('STREAM_MAX_LINE_LENGTH',
+                                                          stream_scoring.MAX_LINE_LENGTH)
+    )
+    if input_format == 'csv':
+        header, error = stream_scoring.read_csv_header(lines)
+        if error is not None:
+            return jsonify({'error': error}), 400
+        offers = stream_scoring.iter_csv_offers(lines, header)
+    else:
+        offers = stream_scoring.iter_ndjson_offers(lines)
+    
+    chunks = stream_scoring.score_chunks(
+        predictor, offers,
+        chunk_size=current_app.config.get('STREAM_CHUNK_SIZE', 1000), top_n=top_n
+    )
+    if output_format == 'csv':
+        body = stream_scoring.format_csv(chunks, id_field=id_field)
+    else:
+        body = stream_scoring.format_ndjson(chunks, current_app.json.dumps, id_field=id_field)
+    
+    response = Response(stream_with_context(body),
+                        mimetype=stream_scoring.OUTPUT_MIMETYPES[output_format])
+    # Bez buforowania odpowiedzi przez proxy (nginx)
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @bp.route('/model-info', methods=['GET'])
 def api_model_info():
     """API endpoint z informacjami o modelu."""
-    global predictor
+    predictor = get_predictor()
     
     if predictor is None:
-        predictor = init_predictor()
+        return jsonify({'error': 'Model nie został wczytany'}), 500
     
-    if predictor is None:
+    return model_info_payload(predictor).response(
+        request, current_app.response_class,
+        max_age=current_app.config.get('MODEL_INFO_MAX_AGE', 300)
+    )
+
+
+@bp.route('/cache-stats', methods=['GET'])
+def api_cache_stats():
+    """API endpoint ze statystykami cache predykcji."""
+    if prediction_cache is None:
+        return jsonify({'enabled': False})
+    
+    return jsonify(dict(prediction_cache.stats(), enabled=True))
+
+@bp.route('/batcher-stats', methods=['GET'])
+def api_batcher_stats():
+    """API endpoint ze statystykami mikro-batchera."""
+    if micro_batcher is None:
+        return jsonify({'enabled': False})
+    
+    return jsonify(dict(micro_batcher.stats(), enabled=True))
+
+@bp.route('/admission-stats', methods=['GET'])
+def api_admission_stats():
+    """API endpoint ze statystykami kontroli przyjęć."""
+    if admission is None:
+        return jsonify({'enabled': False})
+    
+    return jsonify(dict(admission.stats(), enabled=True))
+
+def admin_authorized():
+    """Sprawdza nagłówek X-Admin-Token (endpointy administracyjne są wyłączone bez ADMIN_TOKEN)."""
+    token = current_app.config.get('ADMIN_TOKEN')
+    provided = request.headers.get('X-Admin-Token', '')
+    return bool(token) and hmac.compare_digest(provided.encode(), token.encode())
+
+@bp.route('/admin/reload', methods=['GET', 'POST'])
+def api_admin_reload():
+    """
+    API endpoint przeładowania modelu bez przestoju.
+    
+    POST uruchamia wczytanie, walidację i rozgrzewkę nowego modelu w tle
+    (?wait=1 - czeka na wynik), GET zwraca stan ostatniego przeładowania.
+    Dotyczy tylko procesu, który obsłużył żądanie - przy wielu workerach
+    przeładowanie wszystkich zapewnia MODEL_WATCH_INTERVAL.
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Brak uprawnień'}), 403
+    
+    if get_predictor() is None:
         return jsonify({'error': 'Model nie został wczytany'}), 500
     
-    return jsonify(predictor.get_model_info())
+    if request.method == 'GET':
+        return jsonify(model_reloader.stats())
+    
+    if request.args.get('wait', '').lower() in ('1', 'true'):
+        swapped = model_reloader.reload('admin')
+        return jsonify(dict(model_reloader.stats(), swapped=swapped)), 200 if swapped else 500
+    
+    accepted = model_reloader.reload_async('admin')
+    return jsonify(dict(model_reloader.stats(), accepted=accepted)), 202 if accepted else 409
 
+@bp.route('/admin/profile', methods=['GET', 'POST'])
+def api_admin_profile():
+    """
+    API endpoint profilera żądań.
+    
+    POST {"mode": "sample"|"cprofile", "requests": N} profiluje następne N
+    żądań predykcji tego procesu i zapisuje jeden plik w PROFILE_DIR;
+    GET zwraca stan i ostatnie pliki.
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Brak uprawnień'}), 403
+    
+    if request_profiler is None:
+        return jsonify({'error': 'Profilowanie jest wyłączone (PROFILING_ENABLED)'}), 404
+    
+    if request.method == 'GET':
+        return jsonify(request_profiler.status())
+    
+    data = request.get_json(silent=True) or {}
+    mode = data.get('mode', 'sample')
+    requests_count = data.get('requests', 100)
+    if mode not in PROFILE_MODES:
+        return jsonify({'error': f'Nieznany tryb profilowania: {mode}'}), 400
+    if not isinstance(requests_count, int) or requests_count < 1:
+        return jsonify({'error': 'Nieprawidłowa wartość requests'}), 400
+    
+    return jsonify(request_profiler.arm(mode, requests_count)), 202
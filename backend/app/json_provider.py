@@ -0,0 +1,54 @@
+"""
+Szybszy dostawca JSON dla odpowiedzi API
+Model: CPVClassifier v1.0
+
+Gdy zainstalowany jest orjson, odpowiedzi są serializowane bezpośrednio
+do bajtów (bez sortowania kluczy i bez escapowania znaków spoza ASCII),
+a typy NumPy są obsługiwane natywnie. Parsowanie żądań przyjmuje to samo
+co standardowy json (NaN, Infinity, duże liczby całkowite). Bez orjson -
+standardowy DefaultJSONProvider Flask.
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - zależność opcjonalna
+    orjson = None
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider z serializacją przez orjson (jeśli dostępny)."""
+
+    OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def dumps_bytes(self, obj):
+        """Serializacja do bajtów UTF-8."""
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=self.default, option=self.OPTIONS)
+            except TypeError:
+                # Typy nieobsługiwane przez orjson - ścieżka standardowa
+                pass
+        return super().dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # NaN / Infinity i liczby całkowite ponad 64 bity - akceptowane
+            # przez json ze standardowej biblioteki
+            return super().loads(s)
+
+    def response(self, *args, **kwargs):
+        # Tryb debug (wcięcia) - jak w DefaultJSONProvider
+        if orjson is None or (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
@@ -3,10 +3,36 @@ Routes dla głównego interfejsu webowego
 """
 
 from app.main import bp
-from flask import render_template
+from flask import render_template, jsonify, Response, current_app
+from app.api import routes as api_routes
+from app.services.metrics import metrics
 
 @bp.route('/')
 def index():
     """Główna strona aplikacji."""
     return render_template('index.html')
 
+
+@bp.route('/healthz')
+def healthz():
+    """Liveness - proces odpowiada (niezależnie od stanu modelu)."""
+    return jsonify({'status': 'ok'})
+
+@bp.route('/readyz')
+def readyz():
+    """Readiness - 200 dopiero po wczytaniu modelu i predykcji rozgrzewkowej."""
+    state = dict(api_routes.readiness)
+    if not api_routes.is_ready():
+        return jsonify(dict(state, ready=False)), 503
+    
+    return jsonify(dict(state, ready=True,
+                        model_version=api_routes.predictor_handle.get().model_version))
+
+@bp.route('/metrics')
+def prometheus_metrics():
+    """Metryki procesu w formacie tekstowym Prometheus."""
+    if not current_app.config.get('METRICS_ENABLED', True):
+        return jsonify({'error': 'Metryki są wyłączone'}), 404
+    
+    return Response(metrics.render(api_routes.metrics_gauges()),
+                    mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,188 @@
+"""
+Artefakt modelu mapowany do pamięci (bez sklearn)
+Model: CPVClassifier v1.0
+
+Katalog z plikiem manifest.json oraz surowymi tablicami lasu w formacie
+.npy. Tablice są otwierane przez np.load(mmap_mode='r'): start workera
+trwa milisekundy, strony pamięci są współdzielone przez page cache
+systemu, a serwowanie nie wymaga importu sklearn.
+
+Struktura katalogu:
+    manifest.json         - wersje, klasy CPV, parametry skalera, słowniki kategorii
+                            (parametry FeaturePipeline) i pliki tablic
+    <tablica>.<eksport>.npy - roots, feature, threshold, left, right, value, children,
+                            is_leaf (engine 'compact': roots, feature, threshold,
+                            children, leaf_ptr, leaf_class, leaf_prob - src/compact_model.py)
+
+Każdy eksport zapisuje tablice pod nowymi nazwami (identyfikator eksportu
+w nazwie pliku), a manifest podmienia na końcu przez os.replace. Manifest
+zawsze wskazuje kompletny zestaw tablic jednego eksportu.
+"""
+
+import json
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from app.services.forest_engine import CompiledForest, CompactForest
+
+# Identyfikator i wersja formatu
+ARTIFACT_FORMAT = 'cpv-forest-mmap'
+FORMAT_VERSION = 1
+
+class ValueScaler:
+    """Parametry StandardScaler dla VALUE_EURO (interfejs transform jak w sklearn)."""
+
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X):
+        """(X - mean) / scale - te same operacje co StandardScaler.transform."""
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+def export_artifact(model_data, out_dir, model_version=None, engine=None):
+    """
+    Zapisuje model jako artefakt mmap.
+
+    Tablice trafiają do nowych plików (nazwy z identyfikatorem eksportu),
+    a manifest.json jest podmieniany atomowo (os.replace) dopiero po ich
+    zapisaniu - katalog i manifest istnieją przez cały czas, a manifest
+    nigdy nie wskazuje tablic innego eksportu. Tablice poprzedniego
+    eksportu zostają (czytelnik, który właśnie przeczytał stary manifest,
+    nadal je otworzy); starsze są usuwane.
+
+    Parameters:
+    -----------
+    model_data : dict
+        Dane modelu jak w models/model.pkl (model, label_encoder, scaler, słowniki)
+    out_dir : str lub Path
+        Katalog docelowy artefaktu
+    model_version : str
+        Wersja modelu (skrót pliku model.pkl) zapisywana w manifeście
+    engine : CompiledForest lub CompactForest
+        Skompilowany las (None = kompilacja z model_data['model'])
+
+    Returns:
+    --------
+    Path
+        Katalog artefaktu
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if engine is None:
+        engine = CompiledForest.from_sklearn(model_data['model'])
+
+    previous = _manifest_files(out_dir)
+    export_id = uuid.uuid4().hex[:12]
+    arrays = {}
+    for name, array in engine.arrays().items():
+        array = np.ascontiguousarray(array)
+        file_name = f'{name}.{export_id}.npy'
+        np.save(out_dir / file_name, array)
+        arrays[name] = {'file': file_name, 'dtype': str(array.dtype), 'shape': list(array.shape)}
+
+    scaler = model_data['scaler']
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'format_version': FORMAT_VERSION,
+        'model_name': 'CPVClassifier',
+        'model_version': model_version,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'engine': 'compact' if isinstance(engine, CompactForest) else 'compiled',
+        'n_trees': engine.n_trees,
+        'n_classes': engine.n_classes,
+        'n_features': 1 + len(model_data['cae_names']) + len(model_data['nuts_codes']) +
+                      len(model_data['contract_types']),
+        'max_depth': engine.max_depth,
+        'classes': [int(c) for c in model_data['label_encoder'].classes_],
+        'scaler': {
+            'mean': [float(v) for v in scaler.mean_],
+            'scale': [float(v) for v in scaler.scale_]
+        },
+        'cae_names': list(model_data['cae_names']),
+        'nuts_codes': list(model_data['nuts_codes']),
+        'contract_types': list(model_data['contract_types']),
+        'arrays': arrays
+    }
+    fd, tmp_manifest = tempfile.mkstemp(prefix='manifest.', suffix='.tmp', dir=out_dir)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    # Podmiana manifestu - od teraz czytelnicy widzą nowe tablice
+    os.replace(tmp_manifest, out_dir / 'manifest.json')
+
+    keep = previous | {spec['file'] for spec in arrays.values()}
+    for path in out_dir.glob('*.npy'):
+        if path.name not in keep:
+            try:
+                path.unlink()
+            except OSError:
+                # Plik nadal zmapowany (Windows) - usunięty przy kolejnym eksporcie
+                pass
+    return out_dir
+
+def _manifest_files(path):
+    """Pliki tablic wskazywane przez bieżący manifest (pusty zbiór, gdy brak)."""
+    try:
+        with open(Path(path) / 'manifest.json', encoding='utf-8') as f:
+            return {spec['file'] for spec in json.load(f).get('arrays', {}).values()}
+    except (OSError, ValueError, AttributeError):
+        return set()
+
+def read_manifest(path):
+    """Wczytuje i sprawdza manifest artefaktu."""
+    with open(Path(path) / 'manifest.json', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"Nieznany format artefaktu: {manifest.get('format')}")
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Nieobsługiwana wersja artefaktu: {manifest.get('format_version')}")
+    return manifest
+
+def load_artifact(path):
+    """
+    Wczytuje artefakt mmap.
+
+    Parameters:
+    -----------
+    path : str lub Path
+        Katalog artefaktu
+
+    Returns:
+    --------
+    dict
+        Dane modelu w formacie ModelLoader: engine (CompiledForest lub
+        CompactForest na tablicach mmap), classes, scaler (ValueScaler), słowniki kategorii;
+        'model' i 'label_encoder' są None
+    """
+    path = Path(path)
+    manifest = read_manifest(path)
+    arrays = {
+        name: np.load(path / spec['file'], mmap_mode='r')
+        for name, spec in manifest['arrays'].items()
+    }
+    if manifest.get('engine', 'compiled') == 'compact':
+        engine = CompactForest(n_classes=manifest['n_classes'], max_depth=manifest['max_depth'],
+                               **arrays)
+    else:
+        engine = CompiledForest(max_depth=manifest['max_depth'], **arrays)
+    scaler = manifest['scaler']
+    return {
+        'model': None,
+        'label_encoder': None,
+        'engine': engine,
+        'classes': np.array(manifest['classes']),
+        'scaler': ValueScaler(scaler['mean'], scaler['scale']),
+        'cae_names': manifest['cae_names'],
+        'nuts_codes': manifest['nuts_codes'],
+        'contract_types': manifest['contract_types'],
+        'model_version': manifest['model_version'],
+        'num_features': manifest['n_features']
+    }
@@ -2,14 +2,30 @@
 Model Loader - wczytuje i zarządza modelem CPVClassifier
 """
 
+import hashlib
 import pickle
 from pathlib import Path
 from flask import current_app
+from app.services.answer_table import AnswerTable
+from app.models.artifact import load_artifact
+
+def model_version(raw):
+    """Zwraca wersję modelu - skrót SHA-1 zawartości pliku."""
+    return hashlib.sha1(raw).hexdigest()[:12]
+
+def model_file_version(path, block_size=1 << 20):
+    """Wersja modelu jak model_version, liczona blokami (bez wczytywania całego pliku)."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
 
 class ModelLoader:
     """Klasa do ładowania modelu."""
     
     _model_data = None
+    _reload_hooks = []
     
     @classmethod
     def load(cls):
@@ -23,29 +39,7 @@ class ModelLoader:
         """
         if cls._model_data is None:
             try:
-                # Użyj ścieżki z konfiguracji jeśli dostępna
-                try:
-                    from flask import has_app_context
-                    if has_app_context():
-                        model_path = current_app.config.get('MODEL_PATH')
-                    else:
-                        raise RuntimeError("No app context")
-                except (RuntimeError, ImportError):
-                    # Fallback dla bezpośredniego użycia
-                    BASE_DIR = Path(__file__).parent.parent.parent
-                    model_path = BASE_DIR / 'models' / 'model.pkl'
-                
-                with open(model_path, 'rb') as f:
-                    data = pickle.load(f)
-                
-                cls._model_data = {
-                    'model': data['model'],
-                    'label_encoder': data['label_encoder'],
-                    'scaler': data['scaler'],
-                    'cae_names': data['cae_names'],
-                    'nuts_codes': data['nuts_codes'],
-                    'contract_types': data['contract_types']
-                }
+                cls._model_data = cls.read(cls.settings())
                 print("✅ Model CPVClassifier wczytany pomyślnie!")
             except Exception as e:
                 print(f"❌ Błąd podczas wczytywania modelu: {e}")
@@ -53,9 +47,130 @@ class ModelLoader:
         
         return cls._model_data
     
+    @staticmethod
+    def settings():
+        """
+        Ustawienia wczytywania modelu z konfiguracji aplikacji.
+        
+        Returns:
+        --------
+        dict
+            MODEL_PATH, MODEL_FORMAT, MODEL_ARTIFACT_PATH,
+            PREDICTION_BACKEND, ANSWER_TABLE_PATH
+        """
+        # Użyj ścieżki z konfiguracji jeśli dostępna
+        try:
+            from flask import has_app_context
+            if has_app_context():
+                return {
+                    'MODEL_PATH': current_app.config.get('MODEL_PATH'),
+                    'MODEL_FORMAT': current_app.config.get('MODEL_FORMAT', 'pickle'),
+                    'MODEL_ARTIFACT_PATH': current_app.config.get('MODEL_ARTIFACT_PATH'),
+                    'PREDICTION_BACKEND': current_app.config.get('PREDICTION_BACKEND', 'sklearn'),
+                    'ANSWER_TABLE_PATH': current_app.config.get('ANSWER_TABLE_PATH')
+                }
+            raise RuntimeError("No app context")
+        except (RuntimeError, ImportError):
+            # Fallback dla bezpośredniego użycia
+            BASE_DIR = Path(__file__).parent.parent.parent
+            return {
+                'MODEL_PATH': BASE_DIR / 'models' / 'model.pkl',
+                'MODEL_FORMAT': 'pickle',
+                'MODEL_ARTIFACT_PATH': None,
+                'PREDICTION_BACKEND': 'sklearn',
+                'ANSWER_TABLE_PATH': None
+            }
+    
+    @classmethod
+    def read(cls, settings):
+        """
+        Wczytuje model z dysku bez zmiany stanu klasy.
+        
+        Używane przez load() oraz przez przeładowanie w tle, które musi
+        zbudować i sprawdzić nowy model, zanim zastąpi bieżący.
+        
+        Parameters:
+        -----------
+        settings : dict
+            Ustawienia z ModelLoader.settings()
+            
+        Raises:
+        -------
+        Exception
+            Gdy pliku modelu nie da się wczytać
+        """
+        if settings['MODEL_FORMAT'] == 'mmap':
+            # Artefakt mmap - bez unpickle i bez importu sklearn
+            model_data = load_artifact(settings['MODEL_ARTIFACT_PATH'])
+        else:
+            model_data = cls._load_pickle(settings['MODEL_PATH'])
+        
+        # Tablica odpowiedzi dla silnika 'table'
+        if settings['PREDICTION_BACKEND'] == 'table' and settings['ANSWER_TABLE_PATH']:
+            model_data['answer_table'] = AnswerTable.load(
+                settings['ANSWER_TABLE_PATH'], model_data['model_version']
+            )
+        return model_data
+    
+    @staticmethod
+    def watch_path(settings):
+        """Plik, którego zmiana oznacza nowy model (model.pkl lub manifest artefaktu)."""
+        if settings['MODEL_FORMAT'] == 'mmap':
+            return Path(settings['MODEL_ARTIFACT_PATH']) / 'manifest.json'
+        return Path(settings['MODEL_PATH'])
+    
+    @staticmethod
+    def _load_pickle(model_path):
+        """Wczytuje model z pliku pickle (models/model.pkl)."""
+        with open(model_path, 'rb') as f:
+            raw = f.read()
+        data = pickle.loads(raw)
+        
+        return {
+            'model': data['model'],
+            'label_encoder': data['label_encoder'],
+            'scaler': data['scaler'],
+            'cae_names': data['cae_names'],
+            'nuts_codes': data['nuts_codes'],
+            'contract_types': data['contract_types'],
+            # Kodowanie cech z treningu (None w modelach sprzed FeaturePipeline)
+            'feature_pipeline': data.get('feature_pipeline'),
+            # Wersja = skrót zawartości pliku modelu
+            'model_version': model_version(raw)
+        }
+    
+    @classmethod
+    def register_reload_hook(cls, hook):
+        """
+        Rejestruje funkcję wywoływaną po przeładowaniu modelu.
+        
+        Parameters:
+        -----------
+        hook : callable
+            Funkcja bez argumentów (np. czyszczenie cache predykcji)
+        """
+        if hook not in cls._reload_hooks:
+            cls._reload_hooks.append(hook)
+    
+    @classmethod
+    def replace(cls, model_data):
+        """
+        Podmienia bieżący model na już wczytany i uruchamia hooki.
+        
+        Nie ma chwili, w której load() zwraca None - referencja jest
+        zastępowana jednym przypisaniem.
+        """
+        cls._model_data = model_data
+        for hook in cls._reload_hooks:
+            hook()
+        return model_data
+    
     @classmethod
     def reload(cls):
-        """Przeładowuje model."""
-        cls._model_data = None
-        return cls.load()
-
+        """Przeładowuje model (synchronicznie; przy błędzie zostaje stary model)."""
+        try:
+            model_data = cls.read(cls.settings())
+        except Exception as e:
+            print(f"❌ Błąd podczas przeładowania modelu: {e}")
+            return cls._model_data
+        return cls.replace(model_data)
@@ -0,0 +1,137 @@
+"""
+Kontrola przyjęć żądań predykcji (admission control)
+Model: CPVClassifier v1.0
+
+Worker obsługuje naraz najwyżej max_in_flight predykcji. Kolejne żądania
+czekają w ograniczonej kolejce najwyżej queue_timeout_ms (lub do terminu
+podanego przez klienta) - przy przeciążeniu dostają od razu 503 zamiast
+czekać za wolnymi przejściami lasu. Żądanie, którego termin już minął,
+nie jest oceniane wcale.
+"""
+
+import threading
+import time
+
+# Powody odrzucenia
+SHED_REASONS = ('queue_full', 'queue_timeout', 'deadline')
+
+DEADLINE_MESSAGE = 'Termin żądania minął przed rozpoczęciem predykcji'
+
+class AdmissionRejected(RuntimeError):
+    """Żądanie nie zostało przyjęte do obsługi."""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+class AdmissionController:
+    """Limit równoległych predykcji procesu z ograniczoną kolejką oczekujących."""
+
+    def __init__(self, max_in_flight, max_queue=16, queue_timeout_ms=100.0):
+        """
+        Inicjalizacja kontroli przyjęć.
+
+        Parameters:
+        -----------
+        max_in_flight : int
+            Maksymalna liczba jednocześnie obsługiwanych żądań
+        max_queue : int
+            Maksymalna liczba żądań czekających na miejsce (więcej = 503 od razu)
+        queue_timeout_ms : float
+            Maksymalny czas oczekiwania w kolejce
+        """
+        self.max_in_flight = int(max_in_flight)
+        self.max_queue = int(max_queue)
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self._cond = threading.Condition()
+
+        # Stan i statystyki
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = dict.fromkeys(SHED_REASONS, 0)
+        self.max_waiting_seen = 0
+
+    def _reject(self, reason):
+        self.shed[reason] += 1
+        if reason == 'deadline':
+            raise AdmissionRejected(reason, DEADLINE_MESSAGE)
+        raise AdmissionRejected(reason, 'Serwer przeciążony - spróbuj ponownie później')
+
+    def acquire(self, deadline=None):
+        """
+        Przyjmuje żądanie albo je odrzuca.
+
+        Parameters:
+        -----------
+        deadline : float
+            Termin klienta (time.monotonic()); None = brak
+
+        Returns:
+        --------
+        float
+            Czas oczekiwania w kolejce [s]
+
+        Raises:
+        -------
+        AdmissionRejected
+            Pełna kolejka, przekroczony czas oczekiwania lub termin klienta
+        """
+        start = time.monotonic()
+        with self._cond:
+            if deadline is not None and deadline <= start:
+                self._reject('deadline')
+            # Nowe żądanie nie wyprzedza czekających
+            if self.in_flight < self.max_in_flight and self.waiting == 0:
+                self.in_flight += 1
+                self.admitted += 1
+                return 0.0
+            if self.waiting >= self.max_queue:
+                self._reject('queue_full')
+
+            limit = start + self.queue_timeout
+            if deadline is not None:
+                limit = min(limit, deadline)
+            self.waiting += 1
+            self.queued += 1
+            self.max_waiting_seen = max(self.max_waiting_seen, self.waiting)
+            try:
+                while self.in_flight >= self.max_in_flight:
+                    remaining = limit - time.monotonic()
+                    if remaining <= 0:
+                        expired = deadline is not None and deadline <= time.monotonic()
+                        self._reject('deadline' if expired else 'queue_timeout')
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            self.admitted += 1
+            return time.monotonic() - start
+
+    def record_shed(self, reason):
+        """Liczy odrzucenie poza acquire (np. termin minął już po przyjęciu)."""
+        with self._cond:
+            self.shed[reason] += 1
+
+    def release(self):
+        """Zwalnia miejsce po zakończeniu obsługi żądania."""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def stats(self):
+        """Zwraca konfigurację i liczniki kontroli przyjęć."""
+        with self._cond:
+            return {
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue,
+                'queue_timeout_ms': self.queue_timeout * 1000.0,
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'max_waiting': self.max_waiting_seen,
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'shed': dict(self.shed),
+                'shed_total': sum(self.shed.values())
+            }
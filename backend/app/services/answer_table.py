@@ -0,0 +1,202 @@
+"""
+Tablica odpowiedzi dla kombinacji cech kategorycznych
+Model: CPVClassifier v1.0
+
+Jedyną cechą ciągłą modelu jest przeskalowane VALUE_EURO (cecha 0),
+pozostałe cechy to one-hot CAE_NAME x NUTS x TYPE_OF_CONTRACT. Dla
+ustalonej kombinacji kategorii las jest więc funkcją schodkową wartości.
+Tablica przechowuje dla każdej kombinacji progi podziału na cesze 0
+oraz gotowe top N / pewność dla każdego przedziału - predykcja to
+wyszukanie w słowniku i np.searchsorted, bez przechodzenia drzew.
+"""
+
+import pickle
+from pathlib import Path
+
+import numpy as np
+
+from app.services.forest_engine import float32_floor
+
+# Wersja formatu pliku tablicy
+FORMAT_VERSION = 1
+
+class AnswerTable:
+    """Prekomputowane odpowiedzi lasu dla kombinacji kategorii."""
+
+    def __init__(self, table, top_k, model_version=None):
+        """
+        Inicjalizacja tablicy.
+
+        Parameters:
+        -----------
+        table : dict
+            (CAE_NAME, NUTS, TYPE_OF_CONTRACT) -> (breaks, top_indices, top_probs);
+            breaks - progi float32 (m,), top_indices / top_probs - (m + 1, top_k)
+        top_k : int
+            Liczba klas zapisanych dla każdego przedziału
+        model_version : str
+            Wersja modelu, z którego zbudowano tablicę
+        """
+        self.table = table
+        self.top_k = top_k
+        self.model_version = model_version
+
+    def __len__(self):
+        return len(self.table)
+
+    @staticmethod
+    def _reachable_thresholds(engine, onehot):
+        """
+        Progi na cesze 0 osiągalne dla ustalonych cech kategorycznych.
+
+        Parameters:
+        -----------
+        engine : CompiledForest
+            Skompilowany las
+        onehot : np.array
+            Wektor cech (float32) z ustalonymi cechami kategorycznymi
+
+        Returns:
+        --------
+        np.array
+            Progi (float64) wszystkich osiągalnych podziałów na cesze 0
+        """
+        found = []
+        frontier = engine.roots
+        while frontier.size:
+            frontier = frontier[~engine.is_leaf[frontier]]
+            features = engine.feature[frontier]
+            on_value = features == 0
+
+            # Podział na VALUE_EURO - zapamiętujemy próg, idziemy w obie strony
+            value_nodes = frontier[on_value]
+            found.append(engine.threshold[value_nodes])
+
+            # Podział kategoryczny - znamy kierunek
+            cat_nodes = frontier[~on_value]
+            go_left = onehot[features[~on_value]] <= engine.threshold[cat_nodes]
+            frontier = np.concatenate([
+                engine.left[value_nodes],
+                engine.right[value_nodes],
+                np.where(go_left, engine.left[cat_nodes], engine.right[cat_nodes])
+            ])
+        return np.concatenate(found) if found else np.empty(0)
+
+    @classmethod
+    def build(cls, engine, cae_names, nuts_codes, contract_types,
+              top_k=5, model_version=None):
+        """
+        Kompiluje tablicę dla wszystkich kombinacji kategorii.
+
+        Parameters:
+        -----------
+        engine : CompiledForest
+            Skompilowany las
+        cae_names, nuts_codes, contract_types : list
+            Słowniki kategorii w kolejności kolumn one-hot
+        top_k : int
+            Liczba klas zapisywanych dla każdego przedziału
+        model_version : str
+            Wersja modelu (zapisywana do walidacji przy wczytaniu)
+
+        Returns:
+        --------
+        AnswerTable
+            Skompilowana tablica
+        """
+        from app.services.predictor import CPVPredictor
+
+        n_features = 1 + len(cae_names) + len(nuts_codes) + len(contract_types)
+        nuts_offset = 1 + len(cae_names)
+        contract_offset = nuts_offset + len(nuts_codes)
+        table = {}
+
+        for i, cae in enumerate(cae_names):
+            for j, nuts in enumerate(nuts_codes):
+                for l, contract in enumerate(contract_types):
+                    onehot = np.zeros(n_features, dtype=np.float32)
+                    onehot[[1 + i, nuts_offset + j, contract_offset + l]] = 1
+
+                    thresholds = cls._reachable_thresholds(engine, onehot)
+                    breaks = np.unique(float32_floor(thresholds))
+
+                    # Punkt reprezentatywny każdego przedziału (x <= breaks[i])
+                    points = np.append(breaks, np.float32(np.inf))
+                    X = np.tile(onehot, (len(points), 1))
+                    X[:, 0] = points
+                    probabilities = engine.predict_proba(X)
+                    top_indices, top_probs = CPVPredictor.top_n_indices(probabilities, top_k)
+
+                    # Scalanie sąsiednich przedziałów o identycznej odpowiedzi
+                    same = (np.all(top_indices[1:] == top_indices[:-1], axis=1) &
+                            np.all(top_probs[1:] == top_probs[:-1], axis=1))
+                    keep = np.append(~same, True)
+                    table[(cae, nuts, contract)] = (
+                        breaks[keep[:-1]],
+                        top_indices[keep].astype(np.int32),
+                        top_probs[keep]
+                    )
+
+        return cls(table, top_k, model_version)
+
+    def lookup(self, cae_name, nuts, contract_type, scaled_value):
+        """
+        Odpowiedź dla jednej oferty.
+
+        Parameters:
+        -----------
+        cae_name, nuts, contract_type : str
+            Kategorie oferty
+        scaled_value : float
+            Przeskalowane VALUE_EURO
+
+        Returns:
+        --------
+        tuple lub None
+            (top_indices, top_probs) lub None dla nieznanej kombinacji
+        """
+        entry = self.table.get((cae_name, nuts, contract_type))
+        if entry is None:
+            return None
+        breaks, top_indices, top_probs = entry
+        position = np.searchsorted(breaks, np.float32(scaled_value), side='left')
+        return top_indices[position], top_probs[position]
+
+    def save(self, file_path):
+        """Zapisuje tablicę do pliku."""
+        with open(file_path, 'wb') as f:
+            pickle.dump({
+                'format_version': FORMAT_VERSION,
+                'model_version': self.model_version,
+                'top_k': self.top_k,
+                'table': self.table
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, file_path, model_version=None):
+        """
+        Wczytuje tablicę z pliku.
+
+        Parameters:
+        -----------
+        file_path : str lub Path
+            Ścieżka do pliku tablicy
+        model_version : str
+            Oczekiwana wersja modelu (None = bez sprawdzania)
+
+        Returns:
+        --------
+        AnswerTable lub None
+            Tablica lub None, jeśli plik nie istnieje lub nie pasuje do modelu
+        """
+        if not Path(file_path).exists():
+            return None
+        with open(file_path, 'rb') as f:
+            data = pickle.load(f)
+        if data.get('format_version') != FORMAT_VERSION:
+            print(f"⚠️ Nieobsługiwana wersja tablicy odpowiedzi: {file_path}")
+            return None
+        if model_version is not None and data.get('model_version') != model_version:
+            print(f"⚠️ Tablica odpowiedzi nie pasuje do modelu: {file_path}")
+            return None
+        return cls(data['table'], data['top_k'], data['model_version'])
@@ -0,0 +1,227 @@
+"""
+Kodowanie cech ofert - wspólne dla treningu i serwowania
+Model: CPVClassifier v1.0
+
+Wektor cech: [VALUE_EURO (znormalizowana), one-hot CAE_NAME,
+one-hot NUTS, one-hot TYPE_OF_CONTRACT]. Słowniki i parametry
+normalizacji są ustalane raz przy treningu i zapisywane razem z modelem
+(model.pkl: 'feature_pipeline', artefakt mmap: manifest). Kodowanie
+trafia do macierzy float32 (drzewa sklearn i tak porównują float32)
+o przesunięciach kolumn liczonych raz, a normalizacja to
+(x - mean) / scale - bez wywołania StandardScaler.transform. Macierz
+treningową transform_codes buduje partiami w jednej alokacji: gęstą albo
+CSR (dla dużych słowników kategorii).
+"""
+
+import threading
+
+import numpy as np
+
+# Pola kategoryczne w kolejności bloków one-hot
+CATEGORICAL_FIELDS = ('CAE_NAME', 'NUTS', 'TYPE_OF_CONTRACT')
+
+# Partie do tylu wierszy korzystają z bufora wątku zamiast nowej macierzy
+BUFFER_ROWS = 64
+
+# Partie wierszy przy budowie macierzy treningowej (ograniczają tablice tymczasowe)
+CHUNK_ROWS = 262144
+
+class FeaturePipeline:
+    """Dopasowane słowniki kategorii i normalizacja VALUE_EURO."""
+
+    def __init__(self, cae_names, nuts_codes, contract_types, mean, scale):
+        """
+        Inicjalizacja z dopasowanych parametrów.
+
+        Parameters:
+        -----------
+        cae_names, nuts_codes, contract_types : list
+            Słowniki kategorii (kolejność = kolejność kolumn one-hot)
+        mean, scale : float
+            Parametry normalizacji VALUE_EURO (StandardScaler.mean_[0], scale_[0])
+        """
+        self.vocabularies = tuple(vocab if isinstance(vocab, list) else list(vocab)
+                                  for vocab in (cae_names, nuts_codes, contract_types))
+        self.mean = float(mean)
+        self.scale = float(scale)
+
+        # Mapowania i przesunięcia kolumn liczone raz
+        self.maps = tuple({name: i for i, name in enumerate(vocab)} for vocab in self.vocabularies)
+        offsets = [1]
+        for vocab in self.vocabularies:
+            offsets.append(offsets[-1] + len(vocab))
+        self.offsets = tuple(offsets[:-1])
+        self.sizes = tuple(len(vocab) for vocab in self.vocabularies)
+        self.num_features = offsets[-1]
+        self._local = threading.local()
+
+    @classmethod
+    def from_model_data(cls, model_data):
+        """
+        Pipeline zapisany z modelem albo odtworzony ze słowników i skalera
+        (modele sprzed zapisu 'feature_pipeline').
+        """
+        saved = model_data.get('feature_pipeline')
+        if saved is not None:
+            return cls.from_dict(saved)
+        scaler = model_data['scaler']
+        return cls(model_data['cae_names'], model_data['nuts_codes'], model_data['contract_types'],
+                   scaler.mean_[0], scaler.scale_[0])
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['cae_names'], data['nuts_codes'], data['contract_types'],
+                   data['mean'], data['scale'])
+
+    def to_dict(self):
+        """Parametry do zapisu (model.pkl / manifest artefaktu)."""
+        cae_names, nuts_codes, contract_types = self.vocabularies
+        return {
+            'cae_names': cae_names,
+            'nuts_codes': nuts_codes,
+            'contract_types': contract_types,
+            'mean': self.mean,
+            'scale': self.scale
+        }
+
+    def scale_value(self, value):
+        """Normalizacja VALUE_EURO - to samo co StandardScaler.transform."""
+        return (value - self.mean) / self.scale
+
+    def buffer(self, n):
+        """
+        Macierz (n, num_features) do ponownego użycia w bieżącym wątku.
+
+        Dla n > BUFFER_ROWS zwraca None (transform zaalokuje nową).
+        Zawartość jest ważna do następnego wywołania w tym wątku.
+        """
+        if n > BUFFER_ROWS:
+            return None
+        buf = getattr(self._local, 'buffer', None)
+        if buf is None:
+            buf = self._local.buffer = np.zeros((BUFFER_ROWS, self.num_features), dtype=np.float32)
+        return buf[:n]
+
+    def encode_codes(self, values, codes, out=None):
+        """
+        Macierz cech z wartości i indeksów kategorii.
+
+        Parameters:
+        -----------
+        values : np.array
+            VALUE_EURO (przed normalizacją)
+        codes : sequence of np.array
+            Indeksy w słownikach CAE_NAME, NUTS, TYPE_OF_CONTRACT
+        out : np.array
+            Macierz (n, num_features) do wypełnienia (None = nowa float32)
+
+        Returns:
+        --------
+        np.array
+            Macierz cech z nieznormalizowaną kolumną VALUE_EURO
+        """
+        n = len(values)
+        if out is None:
+            out = np.zeros((n, self.num_features), dtype=np.float32)
+        else:
+            out.fill(0)
+        out[:, 0] = values
+        flat = out.reshape(-1)
+        base = np.arange(n, dtype=np.intp) * self.num_features
+        for offset, size, idx in zip(self.offsets, self.sizes, codes):
+            if size == 0:
+                # Pusty słownik - blok bez kolumn (indeks 0 trafiłby do następnego bloku)
+                continue
+            flat[base + offset + np.asarray(idx, dtype=np.intp)] = 1
+        return out
+
+    def encode(self, offers, out=None):
+        """
+        Macierz cech dla ofert (słowników); kolumna VALUE_EURO nieznormalizowana.
+
+        Nieznana kategoria koduje się jak pierwsza ze słownika (indeks 0).
+        """
+        values = np.fromiter((float(o['VALUE_EURO']) for o in offers), dtype=np.float64,
+                             count=len(offers))
+        codes = [
+            np.fromiter((mapping.get(o[field], 0) for o in offers), dtype=np.intp, count=len(offers))
+            for mapping, field in zip(self.maps, CATEGORICAL_FIELDS)
+        ]
+        X = self.encode_codes(values, codes, out=out)
+        return X, values
+
+    def scale_column(self, X, values):
+        """Wpisuje znormalizowane VALUE_EURO do kolumny 0 (liczone w float64)."""
+        X[:, 0] = (values - self.mean) / self.scale
+        return X
+
+    def transform(self, offers, out=None):
+        """
+        Macierz cech float32 (len(offers), num_features) - kodowanie i normalizacja.
+
+        Parameters:
+        -----------
+        offers : list of dict
+            Oferty (VALUE_EURO, CAE_NAME, NUTS, TYPE_OF_CONTRACT)
+        out : np.array
+            Macierz do ponownego użycia (np. buffer(len(offers)))
+        """
+        X, values = self.encode(offers, out=out)
+        return self.scale_column(X, values)
+
+    def transform_codes(self, values, codes, sparse=False, chunk_rows=CHUNK_ROWS):
+        """
+        Macierz cech z kolumn (trening) budowana partiami w jednej alokacji.
+
+        Parameters:
+        -----------
+        values : np.array
+            VALUE_EURO (przed normalizacją)
+        codes : sequence of np.array
+            Indeksy w słownikach CAE_NAME, NUTS, TYPE_OF_CONTRACT
+        sparse : bool
+            True = scipy.sparse.csr_matrix (1 + liczba niepustych słowników
+            niezerowych na wiersz), False = gęsta float32
+        chunk_rows : int
+            Liczba wierszy partii
+
+        Returns:
+        --------
+        np.array or scipy.sparse.csr_matrix
+            Macierz (len(values), num_features) float32 ze znormalizowaną kolumną 0
+        """
+        n = len(values)
+        # Bloki one-hot z kolumnami (pusty słownik nie daje niezerowej)
+        blocks = [(j, offset) for j, (offset, size) in enumerate(zip(self.offsets, self.sizes))
+                  if size]
+        width = 1 + len(blocks)
+        if sparse:
+            # Wiersz: [kolumna 0, po jednej kolumnie każdego bloku one-hot] - indeksy rosnące
+            indices = np.empty((n, width), dtype=np.int32)
+            data = np.ones((n, width), dtype=np.float32)
+            indices[:, 0] = 0
+        else:
+            X = np.empty((n, self.num_features), dtype=np.float32)
+
+        for start in range(0, n, chunk_rows):
+            stop = min(start + chunk_rows, n)
+            chunk_values = values[start:stop]
+            chunk_codes = [idx[start:stop] for idx in codes]
+            if sparse:
+                data[start:stop, 0] = (chunk_values - self.mean) / self.scale
+                for col, (j, offset) in enumerate(blocks, 1):
+                    indices[start:stop, col] = chunk_codes[j]
+                    indices[start:stop, col] += offset
+            else:
+                self.scale_column(self.encode_codes(chunk_values, chunk_codes, out=X[start:stop]),
+                                  chunk_values)
+
+        if not sparse:
+            return X
+        from scipy.sparse import csr_matrix
+        index_dtype = np.int32 if n * width < 2 ** 31 else np.int64
+        indptr = np.arange(0, n * width + 1, width, dtype=index_dtype)
+        X = csr_matrix((data.reshape(-1), indices.reshape(-1).astype(index_dtype, copy=False), indptr),
+                       shape=(n, self.num_features))
+        X.has_sorted_indices = True
+        return X
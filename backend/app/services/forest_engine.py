@@ -0,0 +1,455 @@
+"""
+Skompilowany silnik inferencji dla lasu losowego
+Model: CPVClassifier v1.0
+
+Wszystkie drzewa z `model.estimators_` są spłaszczane do ciągłych tablic
+NumPy (cecha, próg, dzieci, rozkłady w liściach). Predykcja przechodzi
+wszystkie drzewa dla całej partii jednocześnie, poziom po poziomie.
+
+CompactForest to wariant dla dużej liczby klas CPV: rozkłady są
+przechowywane tylko dla liści i rzadko (klasy o niezerowym
+prawdopodobieństwie), progi w float32/float16, a dzieci jako int32.
+"""
+
+import numpy as np
+
+def float32_floor(thresholds, dtype=np.float32):
+    """
+    Największa liczba float32 (lub dtype) nie większa od każdego progu.
+
+    Drzewa porównują float32(x) <= próg, więc dla x w float32
+    warunek x <= t jest równoważny x <= float32_floor(t). Dla dtype
+    float16 równoważność zachodzi tylko dla x poza (floor(t), t].
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    t32 = thresholds.astype(dtype)
+    too_big = t32.astype(np.float64) > thresholds
+    t32[too_big] = np.nextafter(t32[too_big], dtype(-np.inf))
+    return t32
+
+def split_breakpoints(model, feature=0):
+    """
+    Posortowane progi float32 wszystkich podziałów lasu na danej cesze.
+
+    Wartości cechy wpadające w ten sam przedział (np.searchsorted) dają
+    identyczny wynik każdego drzewa.
+
+    Parameters:
+    -----------
+    model : CompiledForest lub RandomForestClassifier
+        Las
+    feature : int
+        Indeks cechy
+
+    Returns:
+    --------
+    np.array
+        Unikalne progi float32
+    """
+    if isinstance(model, CompactForest):
+        thresholds = model.threshold[model.feature == feature]
+    elif isinstance(model, CompiledForest):
+        thresholds = model.threshold[(model.feature == feature) & ~model.is_leaf]
+    else:
+        thresholds = np.concatenate([
+            est.tree_.threshold[(est.tree_.feature == feature) & (est.tree_.children_left != -1)]
+            for est in model.estimators_
+        ])
+    return np.unique(float32_floor(thresholds))
+
+class CompiledForest:
+    """Las losowy w postaci płaskich tablic NumPy."""
+
+    # Co ile poziomów usuwać z przejścia pary zakończone w liściu
+    COMPACT_EVERY = 4
+
+    def __init__(self, roots, feature, threshold, left, right, value, max_depth,
+                 children=None, is_leaf=None):
+        """
+        Inicjalizacja z gotowych tablic.
+
+        Parameters:
+        -----------
+        roots : np.array
+            Indeksy korzeni kolejnych drzew w tablicach węzłów
+        feature : np.array
+            Indeks cechy dla każdego węzła (0 dla liści)
+        threshold : np.array
+            Próg podziału dla każdego węzła
+        left, right : np.array
+            Globalne indeksy dzieci; liść wskazuje sam na siebie
+        value : np.array
+            Znormalizowane rozkłady klas (n_nodes, n_classes)
+        max_depth : int
+            Maksymalna głębokość drzew (liczba kroków przejścia)
+        children, is_leaf : np.array
+            Tablice pomocnicze; wyliczane, jeśli nie podano (przy
+            artefakcie mmap są wczytywane z pliku, bez kopiowania)
+        """
+        self.roots = np.asarray(roots)
+        self.feature = np.asarray(feature)
+        self.threshold = np.asarray(threshold)
+        self.left = np.asarray(left)
+        self.right = np.asarray(right)
+        self.value = np.asarray(value)
+        self.max_depth = int(max_depth)
+        self.n_trees = len(self.roots)
+        self.n_classes = self.value.shape[1]
+
+        # children[2 * node + go_left] - jedno pobranie zamiast dwóch
+        if children is None:
+            children = np.stack([self.right, self.left], axis=1).ravel()
+        if is_leaf is None:
+            is_leaf = self.left == np.arange(len(self.left))
+        self.children = np.asarray(children)
+        self.is_leaf = np.asarray(is_leaf)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        Kompiluje wytrenowany RandomForestClassifier.
+
+        Parameters:
+        -----------
+        model : RandomForestClassifier
+            Wytrenowany model (jedno wyjście)
+
+        Returns:
+        --------
+        CompiledForest
+            Skompilowany las
+        """
+        roots, features, thresholds, lefts, rights, values = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(n_nodes)
+
+            roots.append(offset)
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+            # Normalizacja jak w DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        return cls(
+            roots=np.array(roots, dtype=np.intp),
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values),
+            max_depth=max_depth
+        )
+
+    def arrays(self):
+        """Tablice lasu do zapisu (np. w artefakcie mmap)."""
+        return {
+            'roots': self.roots,
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'left': self.left,
+            'right': self.right,
+            'value': self.value,
+            'children': self.children,
+            'is_leaf': self.is_leaf
+        }
+
+    def apply(self, X):
+        """
+        Zwraca globalne indeksy liści dla każdej próbki i każdego drzewa.
+
+        Parameters:
+        -----------
+        X : np.array
+            Macierz cech (n_samples, n_features)
+
+        Returns:
+        --------
+        np.array
+            Indeksy liści (n_samples, n_trees)
+        """
+        # Drzewa sklearn porównują cechy w float32
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_samples, n_features = X.shape
+        flat_X = X.ravel()
+
+        # Jedna pozycja na parę (próbka, drzewo)
+        nodes = np.tile(self.roots, n_samples)
+        row_base = np.repeat(np.arange(n_samples, dtype=np.intp) * n_features, self.n_trees)
+        active = np.arange(nodes.size)
+        current = nodes.copy()
+
+        for depth in range(1, self.max_depth + 1):
+            go_left = flat_X[row_base + self.feature[current]] <= self.threshold[current]
+            current = self.children[2 * current + go_left]
+
+            # Co kilka poziomów odrzucamy pary, które doszły już do liścia
+            if depth % self.COMPACT_EVERY == 0:
+                nodes[active] = current
+                keep = ~self.is_leaf[current]
+                active = active[keep]
+                current = current[keep]
+                row_base = row_base[keep]
+                if active.size == 0:
+                    break
+
+        nodes[active] = current
+        nodes = nodes.reshape(n_samples, self.n_trees)
+        return nodes
+
+    def predict_proba(self, X):
+        """
+        Prawdopodobieństwa klas - odpowiednik model.predict_proba.
+
+        Parameters:
+        -----------
+        X : np.array
+            Macierz cech (n_samples, n_features)
+
+        Returns:
+        --------
+        np.array
+            Prawdopodobieństwa (n_samples, n_classes)
+        """
+        leaves = self.apply(X)
+        proba = np.zeros((leaves.shape[0], self.n_classes))
+        for t in range(self.n_trees):
+            proba += self.value[leaves[:, t]]
+        proba /= self.n_trees
+        return proba
+
+def forest_nbytes(model):
+    """Rozmiar tablic lasu w bajtach (CompiledForest, CompactForest lub drzewa sklearn)."""
+    if hasattr(model, 'arrays'):
+        return sum(np.asarray(array).nbytes for array in model.arrays().values())
+    total = 0
+    for est in model.estimators_:
+        tree = est.tree_
+        # Tablice węzłów Tree (cechy, progi, dzieci, nieczystość, liczności) i value
+        total += tree.node_count * 8 * 7 + tree.value.nbytes
+    return total
+
+class CompactForest:
+    """
+    Las losowy w zwartej postaci: węzły wewnętrzne i rzadkie rozkłady w liściach.
+
+    Dzieci węzła są kodowane w jednej tablicy int32: wartość >= 0 to
+    indeks węzła wewnętrznego, wartość < 0 to ~indeks liścia. Rozkład
+    liścia to klasy leaf_class[leaf_ptr[l]:leaf_ptr[l + 1]] z
+    prawdopodobieństwami leaf_prob (format CSR).
+    """
+
+    def __init__(self, roots, feature, threshold, children, leaf_ptr, leaf_class, leaf_prob,
+                 n_classes, max_depth):
+        """
+        Inicjalizacja z gotowych tablic (np. z artefaktu mmap).
+
+        Parameters:
+        -----------
+        roots : np.array
+            Zakodowane korzenie drzew (jak children)
+        feature, threshold : np.array
+            Cecha i próg każdego węzła wewnętrznego
+        children : np.array
+            children[2 * node + go_left] - zakodowane dziecko
+        leaf_ptr, leaf_class, leaf_prob : np.array
+            Rzadkie rozkłady klas w liściach (CSR)
+        n_classes : int
+            Liczba klas
+        max_depth : int
+            Maksymalna głębokość drzew
+        """
+        self.roots = np.asarray(roots)
+        self.feature = np.asarray(feature)
+        self.threshold = np.asarray(threshold)
+        self.children = np.asarray(children)
+        self.leaf_ptr = np.asarray(leaf_ptr)
+        self.leaf_class = np.asarray(leaf_class)
+        self.leaf_prob = np.asarray(leaf_prob)
+        self.n_classes = int(n_classes)
+        self.max_depth = int(max_depth)
+        self.n_trees = len(self.roots)
+        self.n_leaves = len(self.leaf_ptr) - 1
+
+    @classmethod
+    def from_sklearn(cls, model, threshold_dtype=np.float32, prob_dtype=np.float32,
+                     max_leaf_classes=None):
+        """
+        Kompaktuje wytrenowany RandomForestClassifier.
+
+        Parameters:
+        -----------
+        model : RandomForestClassifier
+            Wytrenowany model (jedno wyjście)
+        threshold_dtype : np.dtype
+            float32 (wyniki jak sklearn) lub float16 (przybliżone progi)
+        prob_dtype : np.dtype
+            Typ prawdopodobieństw w liściach (float32 lub float16)
+        max_leaf_classes : int
+            Najwyżej tyle najbardziej prawdopodobnych klas na liść
+            (None = wszystkie niezerowe, wyniki jak sklearn)
+
+        Returns:
+        --------
+        CompactForest
+            Zwarty las
+        """
+        threshold_dtype = np.dtype(threshold_dtype).type
+        roots, features, thresholds, children = [], [], [], []
+        leaf_counts, leaf_classes, leaf_probs = [], [], []
+        n_internal = 0
+        n_leaves = 0
+        max_depth = 0
+        n_classes = len(model.classes_)
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            # Nowe numery: węzły wewnętrzne i liście numerowane osobno, globalnie
+            code = np.empty(tree.node_count, dtype=np.int64)
+            code[~is_leaf] = n_internal + np.arange(np.count_nonzero(~is_leaf))
+            code[is_leaf] = ~(n_leaves + np.arange(np.count_nonzero(is_leaf)))
+
+            roots.append(code[0])
+            features.append(tree.feature[~is_leaf])
+            thresholds.append(float32_floor(tree.threshold[~is_leaf], threshold_dtype))
+            # Kolejność [prawe, lewe] - indeks 2 * node + go_left
+            children.append(np.stack([code[tree.children_right[~is_leaf]],
+                                      code[tree.children_left[~is_leaf]]], axis=1).ravel())
+
+            # Normalizacja jak w DecisionTreeClassifier.predict_proba
+            value = tree.value[is_leaf, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            value /= normalizer
+            rows, classes = np.nonzero(value)
+            probs = value[rows, classes]
+            if max_leaf_classes is not None:
+                # Najbardziej prawdopodobne klasy każdego liścia
+                order = np.lexsort((-probs, rows))
+                rows, classes, probs = rows[order], classes[order], probs[order]
+                starts = np.searchsorted(rows, rows, side='left')
+                keep = np.arange(len(rows)) - starts < max_leaf_classes
+                rows, classes, probs = rows[keep], classes[keep], probs[keep]
+            leaf_counts.append(np.bincount(rows, minlength=len(value)))
+            leaf_classes.append(classes)
+            leaf_probs.append(probs)
+
+            n_internal += np.count_nonzero(~is_leaf)
+            n_leaves += len(value)
+            max_depth = max(max_depth, tree.max_depth)
+
+        counts = np.concatenate(leaf_counts)
+        n_entries = int(counts.sum())
+        ptr_dtype = np.int32 if n_entries < np.iinfo(np.int32).max else np.int64
+        leaf_ptr = np.zeros(len(counts) + 1, dtype=ptr_dtype)
+        np.cumsum(counts, out=leaf_ptr[1:])
+        class_dtype = np.uint16 if n_classes <= np.iinfo(np.uint16).max else np.int32
+        return cls(
+            roots=np.array(roots, dtype=np.int32),
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds),
+            children=np.concatenate(children).astype(np.int32),
+            leaf_ptr=leaf_ptr,
+            leaf_class=np.concatenate(leaf_classes).astype(class_dtype),
+            leaf_prob=np.concatenate(leaf_probs).astype(prob_dtype),
+            n_classes=n_classes,
+            max_depth=max_depth
+        )
+
+    def arrays(self):
+        """Tablice lasu do zapisu (np. w artefakcie mmap)."""
+        return {
+            'roots': self.roots,
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'children': self.children,
+            'leaf_ptr': self.leaf_ptr,
+            'leaf_class': self.leaf_class,
+            'leaf_prob': self.leaf_prob
+        }
+
+    def apply(self, X):
+        """
+        Zwraca indeksy liści dla każdej próbki i każdego drzewa.
+
+        Parameters:
+        -----------
+        X : np.array
+            Macierz cech (n_samples, n_features)
+
+        Returns:
+        --------
+        np.array
+            Indeksy liści (n_samples, n_trees)
+        """
+        # Drzewa sklearn porównują cechy w float32
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_samples, n_features = X.shape
+        flat_X = X.ravel()
+
+        # Jedna pozycja na parę (próbka, drzewo)
+        current = np.tile(self.roots, n_samples).astype(np.intp)
+        leaves = np.empty(current.size, dtype=np.intp)
+        pairs = np.arange(current.size)
+        row_base = np.repeat(np.arange(n_samples, dtype=np.intp) * n_features, self.n_trees)
+
+        while True:
+            done = current < 0
+            if done.any():
+                leaves[pairs[done]] = ~current[done]
+                keep = ~done
+                pairs = pairs[keep]
+                current = current[keep]
+                row_base = row_base[keep]
+            if pairs.size == 0:
+                break
+            go_left = flat_X[row_base + self.feature[current]] <= self.threshold[current]
+            current = self.children[2 * current + go_left].astype(np.intp)
+
+        return leaves.reshape(n_samples, self.n_trees)
+
+    def predict_proba(self, X):
+        """
+        Prawdopodobieństwa klas - odpowiednik model.predict_proba.
+
+        Parameters:
+        -----------
+        X : np.array
+            Macierz cech (n_samples, n_features)
+
+        Returns:
+        --------
+        np.array
+            Prawdopodobieństwa (n_samples, n_classes)
+        """
+        leaves = self.apply(X).ravel()
+        n_samples = len(leaves) // max(self.n_trees, 1)
+        starts = self.leaf_ptr[leaves].astype(np.intp)
+        counts = self.leaf_ptr[leaves + 1].astype(np.intp) - starts
+
+        # Pozycje wpisów CSR wszystkich trafionych liści
+        offsets = np.cumsum(counts) - counts
+        entries = np.arange(int(counts.sum())) - np.repeat(offsets - starts, counts)
+        rows = np.repeat(np.arange(len(leaves)) // self.n_trees, counts)
+
+        proba = np.bincount(
+            rows * self.n_classes + self.leaf_class[entries],
+            weights=self.leaf_prob[entries].astype(np.float64),
+            minlength=n_samples * self.n_classes
+        ).reshape(n_samples, self.n_classes)
+        proba /= self.n_trees
+        return proba
@@ -0,0 +1,227 @@
+"""
+Metryki serwisu predykcji (format tekstowy Prometheus)
+Model: CPVClassifier v1.0
+
+Histogramy czasów etapów predykcji (parsowanie JSON, cechy, skalowanie,
+las, top N, dekodowanie, serializacja), czasy żądań, rozmiary partii
+i liczniki. Pomiar etapu to dwa wywołania perf_counter i jedno
+bisect - koszt rzędu mikrosekundy; przy wyłączonych metrykach stage()
+zwraca pusty kontekst.
+
+Metryki są liczone w obrębie procesu - przy kilku workerach gunicorn
+każdy raportuje własne wartości (etykieta pid).
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Granice kubełków histogramów czasu (sekundy)
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Granice kubełków rozmiaru partii (liczba ofert)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+HELP = {
+    'cpv_stage_seconds': ('histogram', 'Czas etapu obsługi predykcji'),
+    'cpv_request_seconds': ('histogram', 'Czas obsługi żądania API'),
+    'cpv_batch_size': ('histogram', 'Liczba ofert w jednym wywołaniu predict_batch'),
+    'cpv_requests_total': ('counter', 'Liczba żądań API'),
+    'cpv_request_errors_total': ('counter', 'Liczba żądań API zakończonych błędem'),
+    'cpv_predictions_total': ('counter', 'Liczba ocenionych ofert'),
+    'cpv_admission_total': ('counter', 'Decyzje kontroli przyjęć (admitted / shed z powodem)'),
+    'cpv_admission_wait_seconds': ('histogram', 'Czas oczekiwania żądania w kolejce przyjęć'),
+}
+
+class Histogram:
+    """Histogram kumulatywny o stałych granicach kubełków."""
+
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+class _Stage:
+    """Kontekst mierzący czas jednego etapu."""
+
+    __slots__ = ('registry', 'name', 'start')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.record_stage(self.name, time.perf_counter() - self.start)
+        return False
+
+class _NoopStage:
+    """Pusty kontekst (metryki wyłączone)."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP_STAGE = _NoopStage()
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    body = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                    for k, v in labels)
+    return '{' + body + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class MetricsRegistry:
+    """Rejestr histogramów i liczników procesu."""
+
+    def __init__(self):
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._local = threading.local()
+
+    def stage(self, name):
+        """
+        Kontekst mierzący etap predykcji.
+
+        Przykład:
+        ---------
+        with metrics.stage('forest'):
+            probabilities = engine.predict_proba(X)
+        """
+        if not self.enabled:
+            return _NOOP_STAGE
+        return _Stage(self, name)
+
+    def record_stage(self, name, seconds):
+        """Zapisuje czas etapu w histogramie i w czasach bieżącego żądania."""
+        self.observe('cpv_stage_seconds', seconds, stage=name)
+        timings = getattr(self._local, 'timings', None)
+        if timings is not None:
+            timings.append((name, seconds))
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        """Dodaje obserwację do histogramu."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        """Zwiększa licznik."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def begin_request(self):
+        """Zaczyna zbieranie czasów etapów bieżącego wątku (nagłówek Server-Timing)."""
+        self._local.timings = []
+
+    def end_request(self):
+        """Kończy zbieranie i zwraca listę (etap, sekundy)."""
+        timings = getattr(self._local, 'timings', None) or []
+        self._local.timings = None
+        return timings
+
+    def reset(self):
+        """Zeruje wszystkie metryki."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self, gauges=()):
+        """
+        Metryki w formacie tekstowym Prometheus.
+
+        Parameters:
+        -----------
+        gauges : iterable
+            Dodatkowe wartości chwilowe: (nazwa, opis, dict etykiet, wartość)
+
+        Returns:
+        --------
+        str
+        """
+        pid = ('pid', str(os.getpid()))
+        with self._lock:
+            histograms = {k: (h.buckets, list(h.counts), h.sum) for k, h in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        described = set()
+
+        def describe(name, kind, text):
+            if name not in described:
+                described.add(name)
+                lines.append(f'# HELP {name} {text}')
+                lines.append(f'# TYPE {name} {kind}')
+
+        for (name, labels), (buckets, counts, total) in sorted(histograms.items()):
+            describe(name, *HELP.get(name, ('histogram', name)))
+            labels = labels + (pid,)
+            cumulative = 0
+            for bound, count in zip(buckets + (float('inf'),), counts):
+                cumulative += count
+                le = labels + (('le', _format_value(bound)),)
+                lines.append(f'{name}_bucket{_format_labels(le)} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total!r}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+
+        for (name, labels), value in sorted(counters.items()):
+            describe(name, *HELP.get(name, ('counter', name)))
+            lines.append(f'{name}{_format_labels(labels + (pid,))} {_format_value(value)}')
+
+        for name, text, labels, value in gauges:
+            describe(name, 'gauge', text)
+            labels = tuple(sorted(labels.items())) + (pid,)
+            lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+def server_timing(timings, total=None):
+    """
+    Wartość nagłówka Server-Timing (czasy w milisekundach).
+
+    Etapy powtórzone w jednym żądaniu są sumowane.
+    """
+    merged = {}
+    for name, seconds in timings:
+        merged[name] = merged.get(name, 0.0) + seconds
+    parts = [f'{name};dur={seconds * 1000:.3f}' for name, seconds in merged.items()]
+    if total is not None:
+        parts.append(f'total;dur={total * 1000:.3f}')
+    return ', '.join(parts)
+
+# Rejestr procesu
+metrics = MetricsRegistry()
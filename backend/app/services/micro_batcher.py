@@ -0,0 +1,185 @@
+"""
+Dynamiczne mikro-batchowanie pojedynczych predykcji
+Model: CPVClassifier v1.0
+
+Współbieżne żądania /api/predict trafiają do kolejki. Wątek w tle zbiera
+je przez co najwyżej max_wait_ms (lub do max_batch ofert), wykonuje jedno
+CPVPredictor.predict_batch dla całej grupy i rozsyła wyniki do
+oczekujących żądań.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+class BatcherOverloaded(RuntimeError):
+    """Kolejka mikro-batchera jest pełna."""
+
+class BatcherTimeout(RuntimeError):
+    """Wynik predykcji nie przyszedł w limicie czasu (oferta wycofana z kolejki)."""
+
+class MicroBatcher:
+    """Kolejka predykcji obsługiwana partiami przez wątek w tle."""
+
+    def __init__(self, get_predictor, max_wait_ms=2.0, max_batch=64, max_queue=1024):
+        """
+        Inicjalizacja mikro-batchera.
+
+        Parameters:
+        -----------
+        get_predictor : callable
+            Zwraca aktualny CPVPredictor (odczytywany dla każdej partii,
+            więc przeładowanie modelu działa bez restartu batchera)
+        max_wait_ms : float
+            Maksymalny czas zbierania partii od pierwszego żądania
+        max_batch : int
+            Maksymalna liczba ofert w partii
+        max_queue : int
+            Maksymalna liczba oczekujących ofert (pełna kolejka = odrzucenie)
+        """
+        self.get_predictor = get_predictor
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = int(max_batch)
+        self.max_queue = int(max_queue)
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        # Statystyki
+        self.submitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.batches = 0
+        self.batched_offers = 0
+        self.max_batch_seen = 0
+        self.max_queue_depth = 0
+
+    def _ensure_worker(self):
+        """Uruchamia wątek roboczy (także ponownie po fork w nowym procesie)."""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, offer_data, top_n=5):
+        """
+        Dodaje ofertę do kolejki.
+
+        Returns:
+        --------
+        Future
+            Wynik predykcji (dict) albo wyjątek ValueError z komunikatem walidacji
+
+        Raises:
+        -------
+        BatcherOverloaded
+            Gdy kolejka jest pełna
+        """
+        self._ensure_worker()
+        future = Future()
+        try:
+            self._queue.put_nowait((offer_data, top_n, future))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise BatcherOverloaded('Kolejka predykcji jest pełna')
+        with self._lock:
+            self.submitted += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return future
+
+    def predict(self, offer_data, top_n=5, timeout=None):
+        """
+        Predykcja przez kolejkę - blokuje do czasu otrzymania wyniku.
+
+        Raises:
+        -------
+        BatcherOverloaded
+            Gdy kolejka jest pełna
+        BatcherTimeout
+            Gdy wynik nie przyszedł w timeout sekund - oferta jeszcze
+            nieobsłużona jest anulowana i wątek roboczy ją pominie
+        """
+        future = self.submit(offer_data, top_n)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self.timed_out += 1
+            raise BatcherTimeout('Przekroczono czas oczekiwania na predykcję')
+
+    def _collect(self):
+        """Zbiera partię: czeka na pierwszą ofertę, potem max_wait lub max_batch."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Pętla wątku roboczego."""
+        while True:
+            batch = self._collect()
+            # Oferty anulowane po przekroczeniu czasu nie trafiają do lasu
+            live = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            with self._lock:
+                self.cancelled += len(batch) - len(live)
+            batch = live
+            if not batch:
+                continue
+            with self._lock:
+                self.batches += 1
+                self.batched_offers += len(batch)
+                self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+            # Partie grupowane po top_n (zwykle jedna grupa)
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+
+            for top_n, items in groups.items():
+                try:
+                    results = self.get_predictor().predict_batch(
+                        [offer for offer, _, _ in items], top_n=top_n
+                    )
+                except Exception as e:
+                    for _, _, future in items:
+                        future.set_exception(e)
+                    continue
+                for (_, _, future), result in zip(items, results):
+                    if result['success']:
+                        future.set_result(result['result'])
+                    else:
+                        future.set_exception(ValueError(result['error']))
+
+    def stats(self):
+        """Zwraca konfigurację i liczniki mikro-batchera."""
+        with self._lock:
+            return {
+                'max_wait_ms': self.max_wait * 1000.0,
+                'max_batch': self.max_batch,
+                'max_queue': self.max_queue,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'cancelled': self.cancelled,
+                'batches': self.batches,
+                'avg_batch_size': self.batched_offers / self.batches if self.batches else 0.0,
+                'max_batch_size': self.max_batch_seen
+            }
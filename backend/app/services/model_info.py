@@ -0,0 +1,70 @@
+"""
+Odpowiedź /api/model-info liczona raz na wersję modelu
+Model: CPVClassifier v1.0
+
+Słowniki modelu (kody CPV, zamawiający, NUTS) są serializowane raz,
+przechowywane jako gotowe bajty (i wersja gzip) z ETag - kolejne
+żądania dostają te same bajty albo 304 Not Modified.
+"""
+
+import gzip
+import hashlib
+
+# Mniejsze odpowiedzi nie są kompresowane
+GZIP_MIN_SIZE = 1024
+
+def build_model_info(classes, cae_names, nuts_codes, contract_types, num_features,
+                     model_version=None):
+    """Słownik informacji o modelu (schemat /api/model-info)."""
+    cpv_codes = [str(int(c)) for c in classes]
+    return {
+        'model_name': 'CPVClassifier',
+        'algorithm': 'Random Forest',
+        'version': '1.0',
+        'model_version': model_version,
+        'num_categories': len(cpv_codes),
+        'num_features': int(num_features),
+        'cpv_codes': cpv_codes,
+        'cae_names': list(cae_names),
+        'nuts_codes': list(nuts_codes),
+        'contract_types': list(contract_types)
+    }
+
+class EncodedPayload:
+    """Zserializowana odpowiedź JSON z ETag i opcjonalną wersją gzip."""
+
+    def __init__(self, body):
+        """
+        Parameters:
+        -----------
+        body : bytes
+            Zserializowany JSON
+        """
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        self.gzip = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None
+
+    def response(self, request, response_class, max_age=300):
+        """
+        Odpowiedź Flask: 304 przy zgodnym If-None-Match, gzip przy Accept-Encoding.
+
+        Parameters:
+        -----------
+        request : flask.Request
+            Bieżące żądanie
+        response_class : type
+            Klasa odpowiedzi aplikacji (app.response_class)
+        max_age : int
+            Cache-Control max-age w sekundach (po nim - rewalidacja przez ETag)
+        """
+        if request.if_none_match.contains(self.etag):
+            response = response_class(status=304)
+        elif self.gzip is not None and 'gzip' in request.accept_encodings:
+            response = response_class(self.gzip, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = response_class(self.body, mimetype='application/json')
+        response.set_etag(self.etag)
+        response.headers['Cache-Control'] = f'public, max-age={int(max_age)}'
+        response.vary.add('Accept-Encoding')
+        return response
@@ -0,0 +1,251 @@
+"""
+Przeładowanie modelu bez przestoju
+Model: CPVClassifier v1.0
+
+Wątki żądań czytają bieżący predyktor z PredictorHandle bez blokad
+(odczyt jednego atrybutu). Nowy model jest wczytywany w tle, sprawdzany,
+rozgrzewany partią syntetycznych ofert i dopiero wtedy podmieniany jednym
+przypisaniem (read-copy-update). Żądania w toku kończą się na starym
+predyktorze; stary model zwalnia GC, gdy przestaje być używany.
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+class PredictorHandle:
+    """Referencja do bieżącego CPVPredictor podmieniana atomowo."""
+
+    def __init__(self, predictor=None):
+        self._predictor = predictor
+        self._lock = threading.Lock()
+        self.swaps = 0
+
+    def get(self):
+        """Bieżący predyktor (bez blokady - odczyt referencji jest atomowy)."""
+        return self._predictor
+
+    def swap(self, predictor):
+        """Podmienia predyktor i zwraca poprzedni."""
+        with self._lock:
+            old, self._predictor = self._predictor, predictor
+            self.swaps += 1
+        return old
+
+    def set_if_empty(self, predictor):
+        """Ustawia predyktor tylko jeśli żaden nie jest jeszcze ustawiony."""
+        with self._lock:
+            if self._predictor is None:
+                self._predictor = predictor
+            return self._predictor
+
+def warmup_offers(predictor, n=64, seed=0):
+    """Syntetyczne oferty ze słowników modelu (rozgrzewka i walidacja)."""
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'VALUE_EURO': float(round(rng.lognormal(10, 1.5), -2)),
+            'CAE_NAME': predictor.cae_names[i % len(predictor.cae_names)],
+            'NUTS': predictor.nuts_codes[i % len(predictor.nuts_codes)],
+            'TYPE_OF_CONTRACT': predictor.contract_types[i % len(predictor.contract_types)]
+        }
+        for i in range(n)
+    ]
+
+def validate_predictor(predictor, n=64):
+    """
+    Sprawdza nowy predyktor i rozgrzewa jego ścieżkę predykcji.
+
+    Parameters:
+    -----------
+    predictor : CPVPredictor
+        Predyktor zbudowany z nowego modelu
+    n : int
+        Liczba syntetycznych ofert w partii rozgrzewkowej
+
+    Raises:
+    -------
+    ValueError
+        Gdy model nie pasuje do słowników cech lub daje błędne wyniki
+    """
+    n_features = getattr(predictor.engine, 'n_features_in_', None)
+    if n_features is None:
+        n_features = int(np.max(predictor.engine.feature)) + 1
+        if n_features > predictor.num_features:
+            raise ValueError(f"Las używa cechy {n_features - 1}, "
+                             f"a wektor cech ma {predictor.num_features}")
+    elif n_features != predictor.num_features:
+        raise ValueError(f"Model oczekuje {n_features} cech, "
+                         f"a słowniki dają {predictor.num_features}")
+
+    classes = set(int(c) for c in predictor.classes)
+    offers = warmup_offers(predictor, n)
+    # Rozgrzewka: partia i pojedyncza predykcja (obie ścieżki żądań)
+    results = predictor.predict_batch(offers)
+    results.append({'success': True, 'result': predictor.predict(offers[0])})
+    for item in results:
+        if not item['success']:
+            raise ValueError(f"Błąd predykcji rozgrzewkowej: {item['error']}")
+        result = item['result']
+        if result['cpv'] not in classes or not 0.0 <= result['confidence'] <= 1.0 + 1e-9:
+            raise ValueError(f"Nieprawidłowy wynik predykcji: {result}")
+
+class ModelReloader:
+    """Wczytanie, walidacja i podmiana modelu w tle (na żądanie lub po zmianie pliku)."""
+
+    def __init__(self, handle, build, watch_path=None, poll_interval=0):
+        """
+        Inicjalizacja.
+
+        Parameters:
+        -----------
+        handle : PredictorHandle
+            Referencja podmieniana po udanym przeładowaniu
+        build : callable
+            Wczytuje model i zwraca nowy CPVPredictor (bez efektów ubocznych)
+        watch_path : Path lub None
+            Plik modelu obserwowany przez wątek w tle
+        poll_interval : float
+            Co ile sekund sprawdzać plik (0 = bez obserwacji)
+        """
+        self.handle = handle
+        self.build = build
+        self.watch_path = watch_path
+        self.poll_interval = float(poll_interval or 0)
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._reload_thread = None
+        self._watch_thread = None
+        self._pid = None
+        self._on_swap = []
+
+        # Stan ostatniego przeładowania
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_reload_at = None
+        self.last_duration_s = None
+
+    def on_swap(self, hook):
+        """Rejestruje funkcję wywoływaną po podmianie: hook(new_predictor, old_predictor)."""
+        self._on_swap.append(hook)
+
+    @property
+    def in_progress(self):
+        thread = self._reload_thread
+        return thread is not None and thread.is_alive()
+
+    def reload_async(self, reason='manual'):
+        """
+        Uruchamia przeładowanie w tle.
+
+        Returns:
+        --------
+        bool
+            False, jeśli przeładowanie już trwa
+        """
+        with self._lock:
+            if self.in_progress:
+                return False
+            self._reload_thread = threading.Thread(
+                target=self.reload, args=(reason,), name='model-reload', daemon=True
+            )
+            self._reload_thread.start()
+            return True
+
+    def reload(self, reason='manual'):
+        """
+        Wczytuje, sprawdza i rozgrzewa nowy model, a potem podmienia predyktor.
+
+        Przy błędzie bieżący predyktor zostaje bez zmian.
+
+        Returns:
+        --------
+        bool
+            True, jeśli model został podmieniony
+        """
+        with self._reload_lock:
+            return self._reload(reason)
+
+    def _reload(self, reason):
+        start = time.perf_counter()
+        try:
+            predictor = self.build()
+            validate_predictor(predictor)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"❌ Przeładowanie modelu ({reason}) nieudane - zostaje poprzedni model: {e}")
+            return False
+
+        old = self.handle.swap(predictor)
+        for hook in self._on_swap:
+            hook(predictor, old)
+        self.reloads += 1
+        self.last_error = None
+        self.last_reload_at = time.time()
+        self.last_duration_s = time.perf_counter() - start
+        print(f"✅ Model przeładowany ({reason}): wersja {predictor.model_version} "
+              f"w {self.last_duration_s:.2f}s")
+        return True
+
+    def _signature(self):
+        try:
+            st = os.stat(self.watch_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def ensure_watching(self):
+        """Uruchamia wątek obserwujący plik (także ponownie po fork w nowym procesie)."""
+        if self.poll_interval <= 0 or self.watch_path is None:
+            return
+        if self._watch_thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._watch_thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._watch_thread = threading.Thread(
+                    target=self._watch, name='model-watch', daemon=True
+                )
+                self._watch_thread.start()
+
+    def _watch(self):
+        """
+        Pętla obserwacji pliku modelu.
+
+        Przeładowanie startuje dopiero, gdy zmieniony plik jest stabilny
+        przez jeden pełny interwał - nie wczytujemy pliku w trakcie zapisu.
+        """
+        current = self._signature()
+        pending = None
+        while True:
+            time.sleep(self.poll_interval)
+            signature = self._signature()
+            if signature is None or signature == current:
+                pending = None
+                continue
+            if signature != pending:
+                pending = signature
+                continue
+            current = signature
+            pending = None
+            self.reload('file change')
+
+    def stats(self):
+        """Zwraca stan przeładowań."""
+        predictor = self.handle.get()
+        return {
+            'model_version': predictor.model_version if predictor is not None else None,
+            'in_progress': self.in_progress,
+            'watching': self._watch_thread is not None and self._watch_thread.is_alive(),
+            'watch_path': str(self.watch_path) if self.watch_path else None,
+            'poll_interval': self.poll_interval,
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'last_reload_at': self.last_reload_at,
+            'last_duration_s': self.last_duration_s
+        }
@@ -0,0 +1,97 @@
+"""
+Cache predykcji w pamięci procesu
+Model: CPVClassifier v1.0
+
+Ograniczony rozmiar (LRU), opcjonalny czas życia wpisów (TTL) i liczniki
+trafień / chybień / usunięć. Bezpieczny dla wielu wątków.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+class PredictionCache:
+    """Cache LRU/TTL dla wyników CPVPredictor.predict."""
+
+    def __init__(self, maxsize=10000, ttl=None):
+        """
+        Inicjalizacja cache.
+
+        Parameters:
+        -----------
+        maxsize : int
+            Maksymalna liczba wpisów
+        ttl : float lub None
+            Czas życia wpisu w sekundach (None lub 0 = bez limitu)
+        """
+        self.maxsize = int(maxsize)
+        self.ttl = ttl or None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """
+        Zwraca zapisany wynik lub None.
+
+        Parameters:
+        -----------
+        key : tuple
+            Klucz z CPVPredictor.cache_key
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Zapisuje wynik, usuwając najdawniej używany wpis po przekroczeniu rozmiaru."""
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Usuwa wszystkie wpisy."""
+        with self._lock:
+            self._data.clear()
+    
+    def invalidate(self):
+        """Unieważnienie po przeładowaniu modelu - wpisy starego modelu są usuwane."""
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """Zwraca liczniki cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'memory',
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
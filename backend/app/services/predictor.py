@@ -5,11 +5,21 @@ Model: CPVClassifier v1.0
 
 import numpy as np
 from pathlib import Path
+from app.services.feature_pipeline import CATEGORICAL_FIELDS, FeaturePipeline
+from app.services.forest_engine import CompiledForest, CompactForest, split_breakpoints
+from app.services.metrics import metrics, SIZE_BUCKETS
+from app.services.model_info import build_model_info
+
+# Pola wymagane w każdej ofercie
+REQUIRED_FIELDS = ['VALUE_EURO', 'CAE_NAME', 'NUTS', 'TYPE_OF_CONTRACT']
+
+# Dostępne silniki inferencji
+BACKENDS = ('sklearn', 'compiled', 'compact', 'table')
 
 class CPVPredictor:
     """Serwis do predykcji kodów CPV."""
     
-    def __init__(self, model_data):
+    def __init__(self, model_data, backend='sklearn'):
         """
         Inicjalizacja predyktora.
         
@@ -17,18 +27,61 @@ class CPVPredictor:
         -----------
         model_data : dict
             Słownik zawierający model, scaler, label_encoder i listy cech
+        backend : str
+            Silnik inferencji: 'sklearn' (model.predict_proba),
+            'compiled' (CompiledForest - płaskie tablice NumPy),
+            'compact' (CompactForest - rzadkie rozkłady w liściach) lub
+            'table' (AnswerTable z model_data['answer_table'], a dla
+            nieznanych kombinacji kategorii - CompiledForest)
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Nieznany silnik inferencji: {backend}")
+        
+        self.model_data = model_data
         self.model = model_data['model']
         self.label_encoder = model_data['label_encoder']
         self.scaler = model_data['scaler']
         self.cae_names = model_data['cae_names']
         self.nuts_codes = model_data['nuts_codes']
         self.contract_types = model_data['contract_types']
+        self.model_version = model_data.get('model_version')
+        
+        # Artefakt mmap nie zawiera obiektu sklearn - tylko skompilowany las
+        if self.model is None and backend in ('sklearn', 'compact'):
+            compact = isinstance(model_data.get('engine'), CompactForest)
+            backend = 'compact' if compact else 'compiled'
+        
+        # Silnik inferencji (wszystkie udostępniają predict_proba)
+        self.backend = backend
+        if backend in ('compiled', 'table'):
+            self.engine = model_data.get('engine') or CompiledForest.from_sklearn(self.model)
+        elif backend == 'compact':
+            engine = model_data.get('engine')
+            self.engine = engine if isinstance(engine, CompactForest) \
+                else CompactForest.from_sklearn(self.model)
+        else:
+            self.engine = self.model
+        
+        # Informacje o modelu - liczone przy pierwszym get_model_info()
+        self._model_info = None
         
-        # Mapowania dla szybkiego dostępu
-        self.cae_map = {name: i for i, name in enumerate(self.cae_names)}
-        self.nuts_map = {code: i for i, code in enumerate(self.nuts_codes)}
-        self.contract_map = {ct: i for i, ct in enumerate(self.contract_types)}
+        # Progi lasu na VALUE_EURO - liczone przy pierwszym cache_key(snap=True)
+        self._value_breakpoints = None
+        
+        # Tablica odpowiedzi (tylko silnik 'table')
+        self.answer_table = model_data.get('answer_table') if backend == 'table' else None
+        if backend == 'table' and self.answer_table is None:
+            print("⚠️ Brak tablicy odpowiedzi - predykcja przez CompiledForest")
+        
+        # Klasy CPV do dekodowania bez label_encoder.inverse_transform
+        if model_data.get('classes') is not None:
+            self.classes = np.asarray(model_data['classes'])
+        else:
+            self.classes = np.asarray(self.label_encoder.classes_)
+        
+        # Kodowanie cech - słowniki, przesunięcia kolumn i normalizacja z modelu
+        self.pipeline = FeaturePipeline.from_model_data(model_data)
+        self.num_features = self.pipeline.num_features
     
     def prepare_features(self, offer_data):
         """
@@ -42,43 +95,259 @@ class CPVPredictor:
         Returns:
         --------
         np.array
-            Wektor cech gotowy do predykcji
+            Wektor cech (1, num_features) gotowy do predykcji
+        """
+        return self.pipeline.transform([offer_data])
+    
+    def prepare_features_batch(self, offers):
+        """
+        Przygotowuje macierz cech dla wielu ofert naraz.
+        
+        Małe partie (pojedyncze predykcje) są kodowane do bufora wątku
+        FeaturePipeline - bez alokacji macierzy na każde żądanie; wynik
+        jest ważny do następnego wywołania w tym samym wątku.
+        
+        Parameters:
+        -----------
+        offers : list of dict
+            Zwalidowane oferty (VALUE_EURO, CAE_NAME, NUTS, TYPE_OF_CONTRACT)
+            
+        Returns:
+        --------
+        np.array
+            Macierz cech float32 o wymiarach (len(offers), num_features)
+        """
+        with metrics.stage('features'):
+            X, values = self.pipeline.encode(offers, out=self.pipeline.buffer(len(offers)))
+        
+        # Cecha numeryczna: VALUE_EURO (znormalizowana)
+        with metrics.stage('scale'):
+            self.pipeline.scale_column(X, values)
+        
+        return X
+    
+    def validate_offer(self, offer_data):
+        """
+        Sprawdza pojedynczą ofertę.
+        
+        Returns:
+        --------
+        str lub None
+            Komunikat błędu lub None jeśli oferta jest poprawna
+        """
+        if not isinstance(offer_data, dict):
+            return 'Oferta musi być obiektem JSON'
+        for field in REQUIRED_FIELDS:
+            if field not in offer_data:
+                return f'Brakuje pola: {field}'
+        try:
+            value = float(offer_data['VALUE_EURO'])
+        except (TypeError, ValueError):
+            return 'Nieprawidłowa wartość VALUE_EURO'
+        if not np.isfinite(value):
+            return 'Nieprawidłowa wartość VALUE_EURO'
+        # Kategorie trafiają do słowników mapowań - tylko tekst (lub brak)
+        for field in CATEGORICAL_FIELDS:
+            if offer_data[field] is not None and not isinstance(offer_data[field], str):
+                return f'Nieprawidłowa wartość {field}'
+        return None
+    
+    @staticmethod
+    def top_n_indices(probabilities, top_n):
+        """
+        Wyznacza top N klas dla każdego wiersza macierzy prawdopodobieństw.
+        
+        argpartition wybiera N kandydatów, sortowane jest tylko N kolumn
+        (malejąco po prawdopodobieństwie, remisy - niższy indeks klasy),
+        więc pierwsza kolumna to zawsze np.argmax - jak w model.predict.
+        
+        Parameters:
+        -----------
+        probabilities : np.array
+            Prawdopodobieństwa (n_samples, n_classes)
+        top_n : int
+            Liczba klas do zwrócenia
+            
+        Returns:
+        --------
+        tuple
+            (top_indices, top_probs) - obie tablice (n_samples, k)
+        """
+        n_samples, n_classes = probabilities.shape
+        k = max(1, min(int(top_n), n_classes))
+        if k < n_classes:
+            top_indices = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+        else:
+            top_indices = np.tile(np.arange(n_classes), (n_samples, 1))
+        top_probs = np.take_along_axis(probabilities, top_indices, axis=1)
+        order = np.lexsort((top_indices, -top_probs), axis=-1)
+        top_indices = np.take_along_axis(top_indices, order, axis=1)
+        top_probs = np.take_along_axis(top_probs, order, axis=1)
+        return top_indices, top_probs
+    
+    def scale_value(self, value):
+        """Normalizacja VALUE_EURO - to samo co scaler.transform dla jednej liczby."""
+        return self.pipeline.scale_value(value)
+    
+    def cache_key(self, offer_data, snap=False):
+        """
+        Klucz cache dla oferty.
+        
+        Parameters:
+        -----------
+        offer_data : dict
+            Dane oferty
+        snap : bool
+            Zamiast dokładnej wartości użyj numeru przedziału między progami
+            podziału lasu na VALUE_EURO - wszystkie wartości z jednego
+            przedziału dają identyczny wynik, więc dzielą jeden wpis
+            
+        Returns:
+        --------
+        tuple
+            (CAE_NAME, NUTS, TYPE_OF_CONTRACT, wartość lub numer przedziału)
         """
-        # Cecha numeryczna: VALUE_EURO
         value = float(offer_data['VALUE_EURO'])
+        if snap:
+            if self._value_breakpoints is None:
+                self._value_breakpoints = split_breakpoints(self.engine, feature=0)
+            value = int(np.searchsorted(self._value_breakpoints,
+                                        np.float32(self.scale_value(value)), side='left'))
+        return (offer_data['CAE_NAME'], offer_data['NUTS'],
+                offer_data['TYPE_OF_CONTRACT'], value)
+    
+    def _score(self, offers, top_n):
+        """
+        Top N klas dla listy zwalidowanych ofert.
         
-        # Cechy kategoryczne: one-hot encoding
-        cae_idx = self.cae_map.get(offer_data['CAE_NAME'], 0)
-        nuts_idx = self.nuts_map.get(offer_data['NUTS'], 0)
-        contract_idx = self.contract_map.get(offer_data['TYPE_OF_CONTRACT'], 0)
+        Oferty znane tablicy odpowiedzi są obsługiwane bez lasu; pozostałe
+        trafiają do jednego wywołania predict_proba silnika.
         
-        # Tworzenie wektora cech
-        features = [value]
+        Returns:
+        --------
+        tuple
+            (top_indices, top_probs) - tablice (len(offers), k); kolumna 0
+            to klasa o najwyższym prawdopodobieństwie (jak model.predict)
+        """
+        n = len(offers)
+        k = max(1, min(int(top_n), len(self.classes)))
+        missing = list(range(n))
+        metrics.inc('cpv_predictions_total', n, backend=self.backend,
+                    model_version=self.model_version or 'unknown')
         
-        # One-hot encoding dla CAE_NAME
-        cae_onehot = [0] * len(self.cae_names)
-        if cae_idx < len(self.cae_names):
-            cae_onehot[cae_idx] = 1
-        features.extend(cae_onehot)
+        if self.answer_table is not None and k <= self.answer_table.top_k:
+            with metrics.stage('table'):
+                top_indices, top_probs, missing = self._table_lookup(offers, k)
+            if not missing:
+                return top_indices, top_probs
         
-        # One-hot encoding dla NUTS
-        nuts_onehot = [0] * len(self.nuts_codes)
-        if nuts_idx < len(self.nuts_codes):
-            nuts_onehot[nuts_idx] = 1
-        features.extend(nuts_onehot)
+        X = self.prepare_features_batch([offers[i] for i in missing])
+        with metrics.stage('forest'):
+            probabilities = self.engine.predict_proba(X)
+        with metrics.stage('topk'):
+            forest_indices, forest_probs = self.top_n_indices(probabilities, k)
         
-        # One-hot encoding dla TYPE_OF_CONTRACT
-        contract_onehot = [0] * len(self.contract_types)
-        if contract_idx < len(self.contract_types):
-            contract_onehot[contract_idx] = 1
-        features.extend(contract_onehot)
+        if len(missing) == n:
+            return forest_indices, forest_probs
+        top_indices[missing] = forest_indices
+        top_probs[missing] = forest_probs
+        return top_indices, top_probs
+    
+    def _table_lookup(self, offers, k):
+        """Top k z tablicy odpowiedzi; zwraca też pozycje ofert spoza tablicy."""
+        n = len(offers)
+        top_indices = np.zeros((n, k), dtype=np.intp)
+        top_probs = np.zeros((n, k))
+        missing = []
+        for i, offer in enumerate(offers):
+            hit = self.answer_table.lookup(
+                offer['CAE_NAME'], offer['NUTS'], offer['TYPE_OF_CONTRACT'],
+                self.scale_value(float(offer['VALUE_EURO']))
+            )
+            if hit is None:
+                missing.append(i)
+            else:
+                top_indices[i] = hit[0][:k]
+                top_probs[i] = hit[1][:k]
+        return top_indices, top_probs, missing
+    
+    def _format_result(self, top_indices, top_probs):
+        """Buduje słownik wyniku z jednego wiersza top N."""
+        return {
+            'cpv': int(self.classes[top_indices[0]]),
+            'confidence': float(top_probs[0]),
+            'top5': [
+                {
+                    'cpv': int(self.classes[idx]),
+                    'probability': float(p)
+                }
+                for idx, p in zip(top_indices, top_probs)
+            ]
+        }
+    
+    def predict_batch(self, offers, top_n=5):
+        """
+        Wykonuje predykcję kodów CPV dla listy ofert.
         
-        X = np.array(features).reshape(1, -1)
+        Wszystkie poprawne oferty są kodowane do jednej macierzy cech,
+        las jest wywoływany jeden raz (predict_proba), a top N wyznaczane
+        jest przez argpartition dla całej partii. Błędne oferty nie
+        przerywają partii - dostają własny komunikat błędu.
         
-        # Normalizacja VALUE_EURO
-        X[:, 0:1] = self.scaler.transform(X[:, 0:1])
+        Parameters:
+        -----------
+        offers : list of dict
+            Lista ofert
+        top_n : int
+            Liczba top predykcji do zwrócenia dla każdej oferty
+            
+        Returns:
+        --------
+        list of dict
+            Dla każdej oferty (w tej samej kolejności):
+            {'success': True, 'result': {...}} lub {'success': False, 'error': str}
+        """
+        results = [None] * len(offers)
+        valid_positions = []
+        valid_offers = []
         
-        return X
+        for i, offer in enumerate(offers):
+            error = self.validate_offer(offer)
+            if error is not None:
+                results[i] = {'success': False, 'error': error}
+            else:
+                valid_positions.append(i)
+                valid_offers.append(offer)
+        
+        if not valid_offers:
+            return results
+        
+        metrics.observe('cpv_batch_size', len(valid_offers), buckets=SIZE_BUCKETS)
+        top_indices, top_probs = self._score(valid_offers, top_n)
+        
+        with metrics.stage('decode'):
+            for row, position in enumerate(valid_positions):
+                results[position] = {
+                    'success': True,
+                    'result': self._format_result(top_indices[row], top_probs[row])
+                }
+        
+        return results
+    
+    def predict_top_n(self, offers, top_n=5):
+        """
+        Top N kodów CPV jako tablice - bez budowania słowników wyników.
+        
+        Do ocen masowych (src/score_offline.py); oferty muszą być już
+        zwalidowane (validate_offer).
+        
+        Returns:
+        --------
+        tuple
+            (kody CPV, prawdopodobieństwa) - tablice (len(offers), k)
+        """
+        top_indices, top_probs = self._score(offers, top_n)
+        return self.classes[top_indices], top_probs
     
     def predict(self, offer_data, top_n=5):
         """
@@ -95,49 +364,28 @@ class CPVPredictor:
         --------
         dict
             Słownik z predykcją: cpv, confidence, top_n
+            
+        Raises:
+        -------
+        ValueError
+            Gdy oferta nie przechodzi validate_offer (ten sam komunikat co
+            błąd wiersza w predict_batch)
         """
-        # Przygotowanie cech
-        X = self.prepare_features(offer_data)
-        
-        # Predykcja
-        y_pred_encoded = self.model.predict(X)[0]
-        y_pred = self.label_encoder.inverse_transform([y_pred_encoded])[0]
-        
-        # Prawdopodobieństwa dla wszystkich klas
-        probabilities = self.model.predict_proba(X)[0]
-        
-        # Top N predykcji
-        top_indices = np.argsort(probabilities)[::-1][:top_n]
-        top_predictions = [
-            {
-                'cpv': int(self.label_encoder.inverse_transform([idx])[0]),
-                'probability': float(probabilities[idx])
-            }
-            for idx in top_indices
-        ]
-        
-        # Poziom pewności (maksymalne prawdopodobieństwo)
-        confidence = float(probabilities.max())
-        
-        return {
-            'cpv': int(y_pred),
-            'confidence': confidence,
-            'top5': top_predictions
-        }
+        error = self.validate_offer(offer_data)
+        if error is not None:
+            raise ValueError(error)
+        top_indices, top_probs = self._score([offer_data], top_n)
+        with metrics.stage('decode'):
+            return self._format_result(top_indices[0], top_probs[0])
     
     def get_model_info(self):
-        """Zwraca informacje o modelu."""
-        cpv_codes = [str(int(c)) for c in self.label_encoder.classes_]
-        
-        return {
-            'model_name': 'CPVClassifier',
-            'algorithm': 'Random Forest',
-            'version': '1.0',
-            'num_categories': len(cpv_codes),
-            'num_features': 40,
-            'cpv_codes': cpv_codes,
-            'cae_names': self.cae_names,
-            'nuts_codes': self.nuts_codes,
-            'contract_types': self.contract_types
-        }
-
+        """Zwraca informacje o modelu (liczone raz dla instancji predyktora)."""
+        if self._model_info is None:
+            # Liczba cech z modelu (sklearn / manifest artefaktu), nie ze stałej
+            num_features = getattr(self.model, 'n_features_in_', None) \
+                or self.model_data.get('num_features') or self.num_features
+            self._model_info = build_model_info(
+                self.classes, self.cae_names, self.nuts_codes, self.contract_types,
+                num_features, model_version=self.model_version
+            )
+        return self._model_info
@@ -0,0 +1,243 @@
+"""
+Profilowanie żądań predykcji na działającym serwisie
+Model: CPVClassifier v1.0
+
+Dwa tryby:
+- 'sample' - wątek próbkujący co interval_ms stosy wątków obsługujących
+  profilowane żądania (sys._current_frames); wynik w formacie collapsed
+  stacks ("a;b;c liczba") dla flamegraph.pl / speedscope,
+- 'cprofile' - deterministyczny cProfile; wynik .pstats
+  (python -m pstats, snakeviz, flameprof).
+
+Profilowanie obejmuje jedno żądanie (nagłówek X-Profile) albo następne
+N żądań (RequestProfiler.arm) zebrane w jeden plik. Gdy nic nie jest
+uzbrojone, koszt dla żądania to jedno sprawdzenie atrybutu.
+"""
+
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+MODES = ('sample', 'cprofile')
+
+def collapse_stack(frame):
+    """Stos ramki w formacie collapsed (od korzenia): plik:funkcja;plik:funkcja."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class StackSampler:
+    """Próbkowanie stosów wybranych wątków w wątku w tle."""
+
+    def __init__(self, interval_ms=1.0):
+        self.interval = interval_ms / 1000.0
+        self.stacks = Counter()
+        self.samples = 0
+        self._threads = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def add_thread(self, thread_id):
+        with self._lock:
+            self._threads.add(thread_id)
+
+    def remove_thread(self, thread_id):
+        with self._lock:
+            self._threads.discard(thread_id)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                threads = list(self._threads)
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            for thread_id in threads:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[collapse_stack(frame)] += 1
+                    self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+class ProfileSession:
+    """Jeden przebieg profilowania: N żądań zebranych w jeden plik wynikowy."""
+
+    def __init__(self, mode, requests, interval_ms=1.0):
+        if mode not in MODES:
+            raise ValueError(f"Nieznany tryb profilowania: {mode}")
+        self.mode = mode
+        self.remaining = int(requests)
+        self.active = 0
+        self.profiled = 0
+        self.started_at = time.time()
+        if mode == 'sample':
+            self.sampler = StackSampler(interval_ms)
+        else:
+            self.profile = cProfile.Profile()
+            self._cprofile_lock = threading.Lock()
+
+    def enter(self):
+        """Początek profilowanego żądania w bieżącym wątku; False = nie da się profilować."""
+        if self.mode == 'sample':
+            self.sampler.add_thread(threading.get_ident())
+            return True
+        # cProfile - jedno żądanie naraz w procesie
+        if not self._cprofile_lock.acquire(blocking=False):
+            return False
+        try:
+            self.profile.enable()
+        except ValueError:
+            # Inny profiler jest już aktywny
+            self._cprofile_lock.release()
+            return False
+        return True
+
+    def exit(self):
+        """Koniec profilowanego żądania w bieżącym wątku."""
+        if self.mode == 'sample':
+            self.sampler.remove_thread(threading.get_ident())
+        else:
+            self.profile.disable()
+            self._cprofile_lock.release()
+        self.profiled += 1
+
+    def write(self, path_base):
+        """
+        Zapisuje wynik.
+
+        Returns:
+        --------
+        Path
+            Plik .collapsed (tryb 'sample') lub .pstats (tryb 'cprofile')
+        """
+        if self.mode == 'sample':
+            self.sampler.stop()
+            path = path_base.with_suffix('.collapsed')
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in self.sampler.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        else:
+            path = path_base.with_suffix('.pstats')
+            self.profile.dump_stats(str(path))
+        return path
+
+class RequestProfiler:
+    """Profilowanie pojedynczych żądań lub następnych N żądań procesu."""
+
+    def __init__(self, out_dir, interval_ms=1.0):
+        """
+        Inicjalizacja.
+
+        Parameters:
+        -----------
+        out_dir : str lub Path
+            Katalog na pliki wynikowe
+        interval_ms : float
+            Odstęp próbkowania w trybie 'sample'
+        """
+        self.out_dir = Path(out_dir)
+        self.interval_ms = float(interval_ms)
+        self.armed = None
+        self.outputs = []
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def arm(self, mode='sample', requests=100):
+        """Profiluje następne N żądań (zastępuje nieukończony przebieg)."""
+        session = ProfileSession(mode, requests, self.interval_ms)
+        with self._lock:
+            old, self.armed = self.armed, session
+        if old is not None and old.mode == 'sample':
+            old.sampler.stop()
+        return self.status()
+
+    def begin(self, mode=None):
+        """
+        Początek żądania.
+
+        Parameters:
+        -----------
+        mode : str lub None
+            Tryb profilowania tylko tego żądania (nagłówek X-Profile);
+            None - żądanie wchodzi do uzbrojonego przebiegu, jeśli jest
+
+        Returns:
+        --------
+        ProfileSession lub None
+            Sesja do przekazania do end(); None - żądanie nie jest profilowane
+        """
+        if mode is not None:
+            session = ProfileSession(mode, 1, self.interval_ms)
+            if session.enter():
+                session.remaining = 0
+                session.active = 1
+                return session
+            if mode == 'sample':
+                session.sampler.stop()
+            return None
+
+        if self.armed is None:
+            return None
+        with self._lock:
+            session = self.armed
+            if session is None or session.remaining <= 0:
+                return None
+            session.remaining -= 1
+            session.active += 1
+        if session.enter():
+            return session
+        with self._lock:
+            session.remaining += 1
+            session.active -= 1
+        return None
+
+    def end(self, session):
+        """
+        Koniec żądania; po ostatnim żądaniu przebiegu zapisuje plik.
+
+        Returns:
+        --------
+        Path lub None
+            Plik wynikowy, jeśli przebieg właśnie się zakończył
+        """
+        session.exit()
+        with self._lock:
+            session.active -= 1
+            finished = session.remaining <= 0 and session.active == 0
+            if finished and self.armed is session:
+                self.armed = None
+            self._counter += 1
+            number = self._counter
+        if not finished:
+            return None
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = session.write(self.out_dir / f"profile-{stamp}-{os.getpid()}-{number}-{session.mode}")
+        with self._lock:
+            self.outputs.append(str(path))
+            del self.outputs[:-20]
+        return path
+
+    def status(self):
+        """Stan profilera: uzbrojony przebieg i ostatnie pliki wynikowe."""
+        session = self.armed
+        return {
+            'armed': session is not None,
+            'mode': session.mode if session else None,
+            'remaining': session.remaining if session else 0,
+            'profiled': session.profiled if session else 0,
+            'out_dir': str(self.out_dir),
+            'outputs': list(self.outputs)
+        }
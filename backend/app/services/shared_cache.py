@@ -0,0 +1,184 @@
+"""
+Współdzielony cache predykcji (SQLite)
+Model: CPVClassifier v1.0
+
+Wspólny dla wszystkich procesów WSGI na jednym hoście - plik SQLite
+w trybie WAL. Klucze zawierają wersję modelu (patrz api.routes.cached_predict),
+więc proces z nowym modelem nigdy nie odczyta wyników starego i odwrotnie -
+na tej przestrzeni nazw kluczy opiera się unieważnianie (invalidate niczego
+nie kasuje). Liczba wpisów jest utrzymywana przez wyzwalacze INSERT/DELETE
+w tabeli predictions_size, więc stats i przycinanie nie skanują tabeli.
+Interfejs jak PredictionCache: get / set / clear / invalidate / stats.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+class SQLitePredictionCache:
+    """Cache predykcji w pliku SQLite współdzielonym między procesami."""
+
+    # Co ile zapisów sprawdzać limit rozmiaru
+    PRUNE_EVERY = 256
+
+    def __init__(self, path, maxsize=100000, ttl=None):
+        """
+        Inicjalizacja cache.
+
+        Parameters:
+        -----------
+        path : str lub Path
+            Ścieżka do pliku bazy (tworzony, jeśli nie istnieje)
+        maxsize : int
+            Przybliżony limit wpisów - przy przekroczeniu usuwane są
+            najstarsze zapisy (kolejność wstawiania, nie odczytu)
+        ttl : float lub None
+            Czas życia wpisu w sekundach (None lub 0 = bez limitu)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.maxsize = int(maxsize)
+        self.ttl = ttl or None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        # Schemat w jednej transakcji - licznik startuje od stanu tabeli,
+        # zanim inny proces zdąży coś zapisać
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS predictions ('
+                ' key TEXT PRIMARY KEY,'
+                ' value TEXT NOT NULL,'
+                ' created_at REAL NOT NULL,'
+                ' expires_at REAL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS predictions_created ON predictions (created_at)')
+            conn.execute('CREATE TABLE IF NOT EXISTS predictions_size ('
+                         ' id INTEGER PRIMARY KEY CHECK (id = 1),'
+                         ' n INTEGER NOT NULL)')
+            # Jednorazowe policzenie wpisów bazy sprzed licznika
+            conn.execute('INSERT OR IGNORE INTO predictions_size (id, n) '
+                         'SELECT 1, COUNT(*) FROM predictions')
+            conn.execute('CREATE TRIGGER IF NOT EXISTS predictions_inserted AFTER INSERT ON predictions '
+                         'BEGIN UPDATE predictions_size SET n = n + 1 WHERE id = 1; END')
+            conn.execute('CREATE TRIGGER IF NOT EXISTS predictions_deleted AFTER DELETE ON predictions '
+                         'BEGIN UPDATE predictions_size SET n = n - 1 WHERE id = 1; END')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _connection(self):
+        """Osobne połączenie dla każdego wątku (i procesu - po fork nowe)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=5.0,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            # Wyzwalacz DELETE także dla wierszy zastąpionych przez INSERT OR REPLACE
+            conn.execute('PRAGMA recursive_triggers=ON')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _encode_key(key):
+        return json.dumps(list(key), ensure_ascii=False, separators=(',', ':'))
+
+    def get(self, key):
+        """Zwraca zapisany wynik lub None."""
+        row = self._connection().execute(
+            'SELECT value, expires_at FROM predictions WHERE key = ?',
+            (self._encode_key(key),)
+        ).fetchone()
+        with self._lock:
+            if row is None or (row[1] is not None and row[1] <= time.time()):
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """Zapisuje wynik (nadpisuje istniejący wpis)."""
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO predictions (key, value, created_at, expires_at) '
+            'VALUES (?, ?, ?, ?)',
+            (self._encode_key(key), json.dumps(value, separators=(',', ':')), now, expires_at)
+        )
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_EVERY == 0
+        if prune:
+            self._prune(conn, now)
+
+    def _prune(self, conn, now):
+        """Usuwa wygasłe wpisy i najstarsze zapisy ponad limit rozmiaru."""
+        removed = conn.execute(
+            'DELETE FROM predictions WHERE expires_at IS NOT NULL AND expires_at <= ?', (now,)
+        ).rowcount
+        excess = self._size(conn) - self.maxsize
+        if excess > 0:
+            removed += conn.execute(
+                'DELETE FROM predictions WHERE key IN '
+                '(SELECT key FROM predictions ORDER BY created_at LIMIT ?)', (excess,)
+            ).rowcount
+        with self._lock:
+            self.evictions += removed
+
+    @staticmethod
+    def _size(conn):
+        """Liczba wpisów z licznika utrzymywanego przez wyzwalacze (bez skanu tabeli)."""
+        row = conn.execute('SELECT n FROM predictions_size WHERE id = 1').fetchone()
+        return row[0] if row is not None else 0
+
+    def clear(self):
+        """Usuwa wszystkie wpisy (dla wszystkich procesów)."""
+        self._connection().execute('DELETE FROM predictions')
+
+    def invalidate(self):
+        """
+        Unieważnienie po przeładowaniu modelu.
+
+        Klucze zawierają wersję modelu, więc wpisy starego modelu są
+        nieosiągalne dla nowego bez kasowania bazy, z której mogą jeszcze
+        korzystać inne procesy - wypadną przy przycinaniu do maxsize.
+        """
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self):
+        """
+        Zwraca liczniki tego procesu i rozmiar wspólnej bazy.
+
+        size obejmuje też wpisy poprzednich wersji modelu (invalidate ich
+        nie kasuje) i wygasłe wpisy czekające na przycięcie.
+        """
+        size = self._size(self._connection())
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'sqlite',
+                'path': str(self.path),
+                'size': size,
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,211 @@
+"""
+Strumieniowa predykcja dużych plików (CSV / NDJSON)
+Model: CPVClassifier v1.0
+
+Ciało żądania jest czytane przyrostowo, oferty są grupowane w partie
+po chunk_size wierszy, każda partia przechodzi przez jedno
+CPVPredictor.predict_batch, a wynik partii jest od razu wysyłany
+do klienta. W pamięci jest najwyżej jedna partia wejścia i wyjścia.
+Generator odpowiedzi jest pobierany przez serwer WSGI dopiero po
+wysłaniu poprzedniego fragmentu - wolny klient spowalnia czytanie
+wejścia (backpressure), zamiast zapełniać pamięć wynikami.
+"""
+
+import codecs
+import csv
+import io
+import json
+from itertools import islice
+
+from app.services.predictor import REQUIRED_FIELDS
+
+# Rozmiar pojedynczego odczytu ciała żądania (bajty)
+READ_SIZE = 64 * 1024
+
+INPUT_MIMETYPES = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+
+OUTPUT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Najdłuższa linia wejścia (znaki) - dłuższa jest błędem wiersza, nie jest buforowana
+MAX_LINE_LENGTH = 64 * 1024
+
+class RowError:
+    """Wiersz wejścia odrzucony przed predykcją (np. za długa linia)."""
+
+    def __init__(self, message):
+        self.message = message
+
+def iter_lines(stream, read_size=READ_SIZE, max_length=MAX_LINE_LENGTH):
+    """
+    Linie tekstu (z końcami linii) ze strumienia bajtów UTF-8.
+
+    Czyta po read_size bajtów - nie wczytuje całego ciała żądania.
+    Linie są dzielone tylko na '\n' (U+2028 itp. wewnątrz napisów JSON
+    nie rozbijają rekordu). Linia dłuższa niż max_length znaków jest
+    pomijana bez buforowania i zastępowana przez RowError.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    too_long = RowError(f'Wiersz dłuższy niż {max_length} znaków')
+    pending = []
+    pending_length = 0
+    overflow = False
+    final = False
+    while not final:
+        data = stream.read(read_size)
+        final = not data
+        parts = decoder.decode(data, final=final).split('\n')
+        for part in parts[:-1]:
+            if overflow or pending_length + len(part) > max_length:
+                yield too_long
+            else:
+                yield ''.join(pending) + part + '\n'
+            pending, pending_length, overflow = [], 0, False
+        tail = parts[-1]
+        if overflow or pending_length + len(tail) > max_length:
+            pending, pending_length, overflow = [], 0, True
+        elif tail:
+            pending.append(tail)
+            pending_length += len(tail)
+    if overflow:
+        yield too_long
+    elif pending:
+        yield ''.join(pending)
+
+def read_csv_header(lines):
+    """
+    Nagłówek CSV (lista kolumn) - czytany przed rozpoczęciem odpowiedzi.
+
+    Returns:
+    --------
+    tuple
+        (kolumny lub None, komunikat błędu lub None)
+    """
+    first = next(lines, None)
+    if isinstance(first, RowError):
+        return None, f'Nagłówek CSV: {first.message}'
+    header = next(csv.reader([first]), None) if first is not None else None
+    if not header:
+        return None, 'Pusty plik CSV'
+    missing = [field for field in REQUIRED_FIELDS if field not in header]
+    if missing:
+        return None, f"Brakuje kolumn: {', '.join(missing)}"
+    return header, None
+
+def iter_csv_offers(lines, header):
+    """Oferty z wierszy CSV (pomija puste wiersze; za długa linia daje RowError)."""
+    errors = []
+
+    def text_lines():
+        for line in lines:
+            if isinstance(line, RowError):
+                # Pusta linia dla csv - błąd trafia do wyniku w miejscu wiersza
+                errors.append(line)
+                yield '\n'
+            else:
+                yield line
+
+    for row in csv.DictReader(text_lines(), fieldnames=header):
+        yield from errors
+        errors.clear()
+        if any(row.values()):
+            yield row
+    yield from errors
+
+def iter_ndjson_offers(lines):
+    """Oferty z linii NDJSON; niepoprawna linia daje None (błąd wiersza, nie całego pliku)."""
+    for line in lines:
+        if isinstance(line, RowError):
+            yield line
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+def score_chunks(predictor, offers, chunk_size=1000, top_n=5):
+    """
+    Predykcja partiami.
+
+    Błąd predykcji partii nie przerywa odpowiedzi (nagłówki są już
+    wysłane) - każdy wiersz tej partii dostaje rekord błędu, a kolejne
+    partie są oceniane dalej. Wiersze RowError dostają swój komunikat
+    bez predykcji.
+
+    Yields:
+    -------
+    list
+        Dla każdej partii: lista (nr wiersza, oferta, wynik predict_batch)
+    """
+    row = 0
+    offers = iter(offers)
+    while True:
+        chunk = list(islice(offers, chunk_size))
+        if not chunk:
+            return
+        results = [{'success': False, 'error': offer.message} if isinstance(offer, RowError)
+                   else None for offer in chunk]
+        positions = [i for i, result in enumerate(results) if result is None]
+        if positions:
+            try:
+                scored = predictor.predict_batch([chunk[i] for i in positions], top_n=top_n)
+            except Exception as e:
+                scored = [{'success': False, 'error': f'Błąd predykcji partii: {e}'}] * len(positions)
+            for i, result in zip(positions, scored):
+                results[i] = result
+        yield [(row + i, offer, result) for i, (offer, result) in enumerate(zip(chunk, results))]
+        row += len(chunk)
+
+def _row_id(offer, id_field):
+    if id_field is None or not isinstance(offer, dict):
+        return None
+    return offer.get(id_field)
+
+def format_ndjson(chunks, dumps, id_field=None):
+    """Partie wyników jako NDJSON - jeden fragment odpowiedzi na partię."""
+    for chunk in chunks:
+        lines = []
+        for row, offer, result in chunk:
+            item = {'row': row}
+            if id_field is not None:
+                item['id'] = _row_id(offer, id_field)
+            item.update(result)
+            lines.append(dumps(item))
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+def format_csv(chunks, id_field=None):
+    """
+    Partie wyników jako CSV.
+
+    Kolumny: row, [id], cpv, confidence, top (cpv:prawdopodobieństwo
+    rozdzielone ';'), error.
+    """
+    columns = ['row'] + (['id'] if id_field is not None else []) + ['cpv', 'confidence', 'top', 'error']
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(columns)
+    for chunk in chunks:
+        for row, offer, result in chunk:
+            values = [row] + ([_row_id(offer, id_field)] if id_field is not None else [])
+            if result['success']:
+                r = result['result']
+                top = ';'.join(f"{t['cpv']}:{t['probability']:.6g}" for t in r['top5'])
+                values += [r['cpv'], f"{r['confidence']:.6g}", top, '']
+            else:
+                values += ['', '', '', result['error']]
+            writer.writerow(values)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
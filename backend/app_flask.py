@@ -10,8 +10,17 @@ import numpy as np
 from pathlib import Path
 import os
 from flask_cors import CORS
+from app.services.forest_engine import CompiledForest, CompactForest
+from app.services.answer_table import AnswerTable
+from app.models.model_loader import model_version
+from app.models.artifact import load_artifact
+from app.json_provider import FastJSONProvider
+from app.services.model_info import build_model_info, EncodedPayload
+from app.services.feature_pipeline import FeaturePipeline
+from app.services.predictor import BACKENDS
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
 # CORS configuration for production
 cors_origins = os.getenv('CORS_ORIGINS', '*').split(',')
@@ -19,7 +28,20 @@ CORS(app, origins=cors_origins, supports_credentials=True)
 
 # Ścieżki
 BASE_DIR = Path(__file__).parent
-MODEL_PATH = BASE_DIR / 'models' / 'model.pkl'
+MODEL_PATH = Path(os.getenv('MODEL_PATH', BASE_DIR / 'models' / 'model.pkl'))
+ANSWER_TABLE_PATH = BASE_DIR / 'models' / 'answer_table.pkl'
+
+# Format modelu: 'pickle' (model.pkl) lub 'mmap' (artefakt z run_training.py)
+MODEL_FORMAT = os.getenv('MODEL_FORMAT', 'pickle')
+MODEL_ARTIFACT_PATH = Path(os.getenv('MODEL_ARTIFACT_PATH', BASE_DIR / 'models' / 'model_mmap'))
+
+# Silnik inferencji: 'sklearn', 'compiled' (płaskie tablice NumPy),
+# 'compact' (rzadkie rozkłady w liściach, src/compact_model.py)
+# lub 'table' (tablica odpowiedzi z src/compile_answer_table.py)
+PREDICTION_BACKEND = os.getenv('PREDICTION_BACKEND', 'sklearn')
+if PREDICTION_BACKEND not in BACKENDS:
+    raise ValueError(f"Nieznany silnik inferencji PREDICTION_BACKEND={PREDICTION_BACKEND} "
+                     f"(dostępne: {', '.join(BACKENDS)})")
 
 # Globalna zmienna dla modelu (wczytywana raz przy starcie)
 model_data = None
@@ -29,90 +51,90 @@ def load_model():
     global model_data
     if model_data is None:
         try:
-            with open(MODEL_PATH, 'rb') as f:
-                data = pickle.load(f)
+            if MODEL_FORMAT == 'mmap':
+                # Artefakt mmap - las jako CompiledForest, bez importu sklearn
+                model_data = load_artifact(MODEL_ARTIFACT_PATH)
+            else:
+                model_data = load_pickle_model()
             
-            model_data = {
-                'model': data['model'],
-                'label_encoder': data['label_encoder'],
-                'scaler': data['scaler'],
-                'cae_names': data['cae_names'],
-                'nuts_codes': data['nuts_codes'],
-                'contract_types': data['contract_types']
-            }
+            # Kodowanie cech - słowniki i normalizacja liczone raz
+            model_data['pipeline'] = FeaturePipeline.from_model_data(model_data)
+            
+            if PREDICTION_BACKEND == 'table':
+                model_data['answer_table'] = AnswerTable.load(
+                    ANSWER_TABLE_PATH, model_data['model_version']
+                )
             print("✅ Model wczytany pomyślnie!")
         except Exception as e:
             print(f"❌ Błąd podczas wczytywania modelu: {e}")
             model_data = None
     return model_data
 
-def prepare_features(offer_data, scaler, cae_names, nuts_codes, contract_types):
-    """Przygotowuje cechy dla oferty."""
-    # Mapowanie do indeksów
-    cae_map = {name: i for i, name in enumerate(cae_names)}
-    nuts_map = {code: i for i, code in enumerate(nuts_codes)}
-    contract_map = {ct: i for i, ct in enumerate(contract_types)}
-    
-    # Cecha numeryczna: VALUE_EURO
-    value = float(offer_data['VALUE_EURO'])
-    
-    # Cechy kategoryczne: one-hot encoding
-    cae_idx = cae_map.get(offer_data['CAE_NAME'], 0)
-    nuts_idx = nuts_map.get(offer_data['NUTS'], 0)
-    contract_idx = contract_map.get(offer_data['TYPE_OF_CONTRACT'], 0)
-    
-    # Tworzenie wektora cech
-    features = [value]
-    
-    # One-hot encoding dla CAE_NAME
-    cae_onehot = [0] * len(cae_names)
-    if cae_idx < len(cae_names):
-        cae_onehot[cae_idx] = 1
-    features.extend(cae_onehot)
-    
-    # One-hot encoding dla NUTS
-    nuts_onehot = [0] * len(nuts_codes)
-    if nuts_idx < len(nuts_codes):
-        nuts_onehot[nuts_idx] = 1
-    features.extend(nuts_onehot)
-    
-    # One-hot encoding dla TYPE_OF_CONTRACT
-    contract_onehot = [0] * len(contract_types)
-    if contract_idx < len(contract_types):
-        contract_onehot[contract_idx] = 1
-    features.extend(contract_onehot)
-    
-    X = np.array(features).reshape(1, -1)
-    
-    # Normalizacja VALUE_EURO
-    X[:, 0:1] = scaler.transform(X[:, 0:1])
+def load_pickle_model():
+    """Wczytuje model z pliku pickle i buduje wybrany silnik inferencji."""
+    with open(MODEL_PATH, 'rb') as f:
+        raw = f.read()
+    data = pickle.loads(raw)
+    
+    loaded = {
+        'model': data['model'],
+        'label_encoder': data['label_encoder'],
+        'scaler': data['scaler'],
+        'cae_names': data['cae_names'],
+        'nuts_codes': data['nuts_codes'],
+        'contract_types': data['contract_types'],
+        'feature_pipeline': data.get('feature_pipeline'),
+        # Klasy CPV do dekodowania bez inverse_transform
+        'classes': np.asarray(data['label_encoder'].classes_),
+        'model_version': model_version(raw)
+    }
     
-    return X
+    # Silnik inferencji budowany raz przy wczytaniu modelu
+    if PREDICTION_BACKEND in ('compiled', 'table'):
+        loaded['engine'] = CompiledForest.from_sklearn(data['model'])
+    elif PREDICTION_BACKEND == 'compact':
+        loaded['engine'] = CompactForest.from_sklearn(data['model'])
+    else:
+        loaded['engine'] = data['model']
+    return loaded
 
 def predict_cpv(offer_data):
     """Wykonuje predykcję kodu CPV."""
-    model = model_data['model']
-    label_encoder = model_data['label_encoder']
-    scaler = model_data['scaler']
-    cae_names = model_data['cae_names']
-    nuts_codes = model_data['nuts_codes']
-    contract_types = model_data['contract_types']
+    engine = model_data['engine']
+    classes = model_data['classes']
+    pipeline = model_data['pipeline']
+    
+    # Tablica odpowiedzi - bez przechodzenia lasu dla znanych kategorii
+    answer_table = model_data.get('answer_table')
+    if answer_table is not None:
+        scaled_value = pipeline.scale_value(float(offer_data['VALUE_EURO']))
+        hit = answer_table.lookup(offer_data['CAE_NAME'], offer_data['NUTS'],
+                                  offer_data['TYPE_OF_CONTRACT'], scaled_value)
+        if hit is not None:
+            top_indices, top_probs = hit
+            return {
+                'cpv': int(classes[top_indices[0]]),
+                'confidence': float(top_probs[0]),
+                'top5': [
+                    {'cpv': int(classes[idx]), 'probability': float(p)}
+                    for idx, p in zip(top_indices[:5], top_probs[:5])
+                ]
+            }
     
-    # Przygotowanie cech
-    X = prepare_features(offer_data, scaler, cae_names, nuts_codes, contract_types)
+    # Przygotowanie cech (bufor wątku - bez alokacji na żądanie)
+    X = pipeline.transform([offer_data], out=pipeline.buffer(1))
     
-    # Predykcja
-    y_pred_encoded = model.predict(X)[0]
-    y_pred = label_encoder.inverse_transform([y_pred_encoded])[0]
+    # Prawdopodobieństwa dla wszystkich klas (jedno przejście lasu)
+    probabilities = engine.predict_proba(X)[0]
     
-    # Prawdopodobieństwa dla wszystkich klas
-    probabilities = model.predict_proba(X)[0]
+    # Predykcja - klasa o najwyższym prawdopodobieństwie, jak model.predict
+    y_pred = classes[np.argmax(probabilities)]
     
     # Top 5 predykcji
     top5_indices = np.argsort(probabilities)[::-1][:5]
     top5 = [
         {
-            'cpv': int(label_encoder.inverse_transform([idx])[0]),
+            'cpv': int(classes[idx]),
             'probability': float(probabilities[idx])
         }
         for idx in top5_indices
@@ -167,19 +189,26 @@ def api_model_info():
     if model_data is None:
         return jsonify({'error': 'Model nie został wczytany'}), 500
     
-    cpv_codes = [str(int(c)) for c in model_data['label_encoder'].classes_]
-    
-    return jsonify({
-        'model_name': 'CPVClassifier',
-        'algorithm': 'Random Forest',
-        'version': '1.0',
-        'num_categories': len(cpv_codes),
-        'num_features': 40,
-        'cpv_codes': cpv_codes,
-        'cae_names': model_data['cae_names'],
-        'nuts_codes': model_data['nuts_codes'],
-        'contract_types': model_data['contract_types']
-    })
+    return model_info_payload().response(request, app.response_class)
+
+# Zserializowana odpowiedź /api/model-info: (model_data, EncodedPayload)
+_model_info_payload = (None, None)
+
+def model_info_payload():
+    """Odpowiedź /api/model-info serializowana raz dla wczytanego modelu."""
+    global _model_info_payload
+    owner, payload = _model_info_payload
+    if owner is not model_data:
+        # Liczba cech z modelu sklearn albo z manifestu artefaktu mmap
+        num_features = getattr(model_data.get('model'), 'n_features_in_', None) \
+            or model_data.get('num_features')
+        info = build_model_info(
+            model_data['classes'], model_data['cae_names'], model_data['nuts_codes'],
+            model_data['contract_types'], num_features, model_version=model_data.get('model_version')
+        )
+        payload = EncodedPayload(app.json.dumps(info).encode('utf-8'))
+        _model_info_payload = (model_data, payload)
+    return payload
 
 # Wczytaj model przy imporcie modułu
 load_model()
@@ -0,0 +1,226 @@
+"""
+Benchmark budowy macierzy cech treningu
+Model: CPVClassifier (Random Forest Classifier)
+
+Porównuje budowę cech z src/run_training.py na syntetycznych danych:
+- loop   - dawna pętla po wierszach (lista list -> np.array float64),
+- dense  - FeaturePipeline.transform_codes: partie, jedna macierz float32,
+- sparse - FeaturePipeline.transform_codes: CSR (4 niezerowe na wiersz).
+
+Każda metoda działa w osobnym procesie. Mierzony jest tylko etap cech:
+szczytowe RSS jest zerowane (/proc/self/clear_refs) po przygotowaniu
+wejścia - dla loop lista słowników jak z csv.DictReader, dla dense/sparse
+kolumny jak z src/columnar.py. Przekroczenie limitu czasu / pamięci jest
+zapisywane jako wynik.
+
+Uruchomienie (z katalogu backend/):
+    python benchmarks/bench_features.py --rows 1000000 10000000 --output features_bench
+"""
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+RANDOM_STATE = 42
+METHODS = ('loop', 'dense', 'sparse')
+
+def synthetic_columns(rows, classes, cae, nuts):
+    """Dane jak z src/columnar.py (rozkład jak bench_training.generate_csv)."""
+    from src.columnar import ColumnarData
+
+    rng = np.random.default_rng(RANDOM_STATE)
+    c = rng.integers(cae, size=rows).astype(np.int32)
+    u = rng.integers(nuts, size=rows).astype(np.int32)
+    t = rng.integers(3, size=rows).astype(np.int32)
+    values = np.round(rng.lognormal(10, 1.5, size=rows), 2)
+    label = (c * 7 + u * 3 + t + (values > 22026) + rng.integers(3, size=rows)) % classes
+    vocabularies = ([f'Zamawiajacy {i:06d}' for i in range(cae)],
+                    [f'PL{i:04d}' for i in range(nuts)],
+                    ['SERVICES', 'SUPPLIES', 'WORKS'])
+    return ColumnarData(values, label.astype(np.int64) * 10000 + 30000000, (c, u, t), vocabularies)
+
+def as_rows(data):
+    """Wiersze jak z csv.DictReader (dawne wejście prepare_features)."""
+    cae_names, nuts_codes, contract_types = data.vocabularies
+    c, u, t = data.codes
+    return [
+        {'CPV': str(cpv), 'VALUE_EURO': repr(value), 'CAE_NAME': cae_names[ci],
+         'NUTS': nuts_codes[ui], 'TYPE_OF_CONTRACT': contract_types[ti]}
+        for cpv, value, ci, ui, ti in zip(data.cpv.tolist(), data.values.tolist(),
+                                          c.tolist(), u.tolist(), t.tolist())
+    ]
+
+def legacy_prepare_features(data):
+    """Dawna src/run_training.prepare_features (pętla po wierszach) - punkt odniesienia."""
+    from sklearn.preprocessing import StandardScaler
+
+    cae_names = sorted(set(row['CAE_NAME'] for row in data))
+    nuts_codes = sorted(set(row['NUTS'] for row in data))
+    contract_types = sorted(set(row['TYPE_OF_CONTRACT'] for row in data))
+    cae_map = {name: i for i, name in enumerate(cae_names)}
+    nuts_map = {code: i for i, code in enumerate(nuts_codes)}
+    contract_map = {ct: i for i, ct in enumerate(contract_types)}
+
+    X = []
+    y = []
+    for row in data:
+        features = [float(row['VALUE_EURO'])]
+        cae_onehot = [0] * len(cae_names)
+        cae_onehot[cae_map[row['CAE_NAME']]] = 1
+        features.extend(cae_onehot)
+        nuts_onehot = [0] * len(nuts_codes)
+        nuts_onehot[nuts_map[row['NUTS']]] = 1
+        features.extend(nuts_onehot)
+        contract_onehot = [0] * len(contract_types)
+        contract_onehot[contract_map[row['TYPE_OF_CONTRACT']]] = 1
+        features.extend(contract_onehot)
+        X.append(features)
+        y.append(int(row['CPV']))
+
+    X = np.array(X)
+    y = np.array(y)
+    scaler = StandardScaler()
+    X[:, 0:1] = scaler.fit_transform(X[:, 0:1])
+    return X, y
+
+def proc_status_mb(pid, key):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith(key + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+def matrix_mb(X):
+    if hasattr(X, 'indptr'):
+        return (X.data.nbytes + X.indices.nbytes + X.indptr.nbytes) / 1e6
+    return X.nbytes / 1e6
+
+def child(method, rows, classes, cae, nuts):
+    """Proces potomny: przygotowanie wejścia i pomiar etapu cech (linia JSON na stdout)."""
+    from src.run_training import prepare_features
+
+    data = synthetic_columns(rows, classes, cae, nuts)
+    if method == 'loop':
+        data = as_rows(data)
+    input_rss_mb = proc_status_mb('self', 'VmRSS')
+    # Od teraz VmHWM = szczyt etapu cech
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+    print(json.dumps({'status': 'input', 'input_rss_mb': input_rss_mb}), flush=True)
+
+    start = time.perf_counter()
+    try:
+        if method == 'loop':
+            X, _ = legacy_prepare_features(data)
+        else:
+            X = prepare_features(data, sparse=method == 'sparse')[0]
+    except MemoryError:
+        print(json.dumps({'status': 'oom (features)', 'input_rss_mb': input_rss_mb,
+                          'time_s': time.perf_counter() - start}), flush=True)
+        return
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'status': 'ok',
+        'input_rss_mb': input_rss_mb,
+        'time_s': elapsed,
+        'peak_rss_mb': proc_status_mb('self', 'VmHWM'),
+        'peak_over_input_mb': proc_status_mb('self', 'VmHWM') - input_rss_mb,
+        'matrix_mb': matrix_mb(X),
+        'dtype': str(X.dtype),
+        'n_features': X.shape[1]
+    }), flush=True)
+
+def run_method(method, config, timeout, max_rss_mb):
+    """Uruchamia metodę w osobnym procesie z limitem czasu i RSS (sprawdzane co 0.2 s)."""
+    cmd = [sys.executable, __file__, '--child', method,
+           *(str(config[key]) for key in ('rows', 'classes', 'cae', 'nuts'))]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                            cwd=BASE_DIR)
+    started = time.perf_counter()
+    failure = None
+    while proc.poll() is None:
+        if time.perf_counter() - started > timeout:
+            failure = 'timeout'
+        elif max_rss_mb and proc_status_mb(proc.pid, 'VmRSS') > max_rss_mb:
+            failure = 'oom'
+        if failure:
+            proc.kill()
+            break
+        time.sleep(0.2)
+    out, err = proc.communicate()
+    lines = [json.loads(line) for line in out.splitlines() if line.startswith('{')]
+    result = lines[-1] if lines else {'status': 'input'}
+    if result['status'] == 'input':
+        # Przerwany przed końcem etapu cech ('input' = już przy przygotowaniu wejścia)
+        stage = 'features' if lines else 'input'
+        if failure is None:
+            errors = err.strip().splitlines()
+            failure = errors[-1] if errors else f'exit {proc.returncode}'
+        result = dict(result, status=f'{failure} ({stage})')
+    return dict(config, method=method, **result)
+
+def default_max_rss_mb():
+    """80% pamięci maszyny - proces jest przerywany przed OOM killerem."""
+    with open('/proc/meminfo') as f:
+        for line in f:
+            if line.startswith('MemTotal:'):
+                return 0.8 * int(line.split()[1]) / 1024
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark budowy macierzy cech')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000, 10000000])
+    parser.add_argument('--classes', type=int, default=15)
+    parser.add_argument('--cae', type=int, nargs='+', default=[20],
+                        help='liczba zamawiajacych (rozmiar bloku one-hot CAE_NAME)')
+    parser.add_argument('--nuts', type=int, default=19)
+    parser.add_argument('--methods', nargs='+', default=list(METHODS), choices=METHODS)
+    parser.add_argument('--timeout', type=float, default=1800, help='limit czasu metody [s]')
+    parser.add_argument('--max-rss-mb', type=float, default=None,
+                        help='limit RSS procesu (domyslnie 80%% pamieci maszyny)')
+    parser.add_argument('--output', default='features_bench', help='prefiks plików .json/.csv')
+    args = parser.parse_args()
+    max_rss_mb = args.max_rss_mb or default_max_rss_mb()
+
+    results = []
+    for rows in args.rows:
+        for cae in args.cae:
+            config = {'rows': rows, 'classes': args.classes, 'cae': cae, 'nuts': args.nuts}
+            print(f"\n{config}")
+            for method in args.methods:
+                r = run_method(method, config, args.timeout, max_rss_mb)
+                print(f"   {method:7s} {r['status']:16.16s} {r.get('time_s', 0):8.2f}s  "
+                      f"szczyt {r.get('peak_rss_mb', 0):7.0f} MB "
+                      f"(+{r.get('peak_over_input_mb', 0):.0f} MB ponad wejscie)  "
+                      f"macierz {r.get('matrix_mb', 0):.0f} MB", flush=True)
+                results.append(r)
+
+    with open(f'{args.output}.json', 'w', encoding='utf-8') as f:
+        json.dump({'cpu_count': os.cpu_count(), 'max_rss_mb': max_rss_mb, 'results': results},
+                  f, indent=2)
+    columns = ['rows', 'classes', 'cae', 'nuts', 'method', 'status', 'time_s', 'input_rss_mb',
+               'peak_rss_mb', 'peak_over_input_mb', 'matrix_mb', 'dtype', 'n_features']
+    with open(f'{args.output}.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"\nWyniki zapisane do: {args.output}.json, {args.output}.csv")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(sys.argv[2], *(int(v) for v in sys.argv[3:7]))
+    else:
+        main()
@@ -0,0 +1,120 @@
+"""
+Benchmark czasu startu: model.pkl (pickle + sklearn) vs artefakt mmap
+Model: CPVClassifier (Random Forest Classifier)
+
+Każdy pomiar to świeży interpreter (jak nowy worker): czas wczytania
+modelu, czas pierwszej predykcji, RSS po predykcji oraz to, czy został
+zaimportowany sklearn.
+
+Uruchomienie (z katalogu backend/):
+    python benchmarks/bench_model_startup.py --repeats 5
+"""
+
+import argparse
+import json
+import pickle
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from app.models.artifact import export_artifact, read_manifest
+from app.models.model_loader import model_version
+
+MODEL_PATH = BASE_DIR / 'models' / 'model.pkl'
+ARTIFACT_PATH = BASE_DIR / 'models' / 'model_mmap'
+
+# Kod uruchamiany w procesie potomnym; wynik jako JSON na stdout
+CHILD = r'''
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {base_dir!r})
+fmt, path = {fmt!r}, {path!r}
+if fmt == 'pickle':
+    import pickle
+    with open(path, 'rb') as f:
+        model_data = pickle.load(f)
+    backend = 'sklearn'
+else:
+    from app.models.artifact import load_artifact
+    model_data = load_artifact(path)
+    backend = 'compiled'
+loaded = time.perf_counter()
+from app.services.predictor import CPVPredictor
+predictor = CPVPredictor(model_data, backend=backend)
+if getattr(predictor.model, 'n_jobs', None):
+    predictor.model.n_jobs = 1
+predictor.predict({{'VALUE_EURO': 100000.0, 'CAE_NAME': predictor.cae_names[0],
+                   'NUTS': predictor.nuts_codes[0], 'TYPE_OF_CONTRACT': predictor.contract_types[0]}})
+ready = time.perf_counter()
+rss = 0
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmRSS:'):
+            rss = int(line.split()[1]) / 1024
+print(json.dumps({{'load_s': loaded - start, 'ready_s': ready - start,
+                  'rss_mb': rss, 'sklearn_imported': 'sklearn' in sys.modules}}))
+'''
+
+def run_child(fmt, path):
+    """Uruchamia jeden pomiar w nowym interpreterze."""
+    code = CHILD.format(base_dir=str(BASE_DIR), fmt=fmt, path=str(path))
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                         check=True, cwd=str(BASE_DIR))
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def ensure_artifact(model_path, artifact_path, tmp_dir):
+    """Zwraca artefakt zgodny z model.pkl, w razie potrzeby eksportując go do katalogu tymczasowego."""
+    with open(model_path, 'rb') as f:
+        raw = f.read()
+    version = model_version(raw)
+    try:
+        if read_manifest(artifact_path)['model_version'] == version:
+            return artifact_path
+    except (OSError, ValueError):
+        pass
+    out = Path(tmp_dir) / 'model_mmap'
+    export_artifact(pickle.loads(raw), out, model_version=version)
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark czasu startu modelu')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--model-path', default=str(MODEL_PATH))
+    parser.add_argument('--artifact-path', default=str(ARTIFACT_PATH))
+    parser.add_argument('--output', help='plik JSON z wynikami')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact = ensure_artifact(Path(args.model_path), Path(args.artifact_path), tmp)
+        results = {}
+        for fmt, path in (('pickle', args.model_path), ('mmap', artifact)):
+            print(f"Pomiar: {fmt} ({args.repeats}x)...")
+            runs = [run_child(fmt, path) for _ in range(args.repeats)]
+            results[fmt] = {
+                'load_ms_median': float(np.median([r['load_s'] for r in runs]) * 1000),
+                'ready_ms_median': float(np.median([r['ready_s'] for r in runs]) * 1000),
+                'rss_mb_median': float(np.median([r['rss_mb'] for r in runs])),
+                'sklearn_imported': runs[0]['sklearn_imported']
+            }
+
+    print("\n" + "=" * 60)
+    print("CZAS STARTU WORKERA (mediana)")
+    print("=" * 60)
+    print(f"{'':10s}{'load [ms]':>12s}{'ready [ms]':>12s}{'RSS [MB]':>12s}{'sklearn':>10s}")
+    for fmt, r in results.items():
+        print(f"{fmt:10s}{r['load_ms_median']:12.1f}{r['ready_ms_median']:12.1f}"
+              f"{r['rss_mb_median']:12.1f}{str(r['sklearn_imported']):>10s}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWyniki zapisane do: {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark współdzielonego cache predykcji
+Model: CPVClassifier (Random Forest Classifier)
+
+Proces A wylicza predykcje i zapisuje je do SQLitePredictionCache,
+proces B (osobny interpreter) odczytuje te same klucze. Porównywane są
+opóźnienia: trafienie w cache innego procesu vs ponowne przeliczenie
+predykcji (CPVPredictor.predict) vs trafienie w cache w pamięci procesu.
+
+Uruchomienie (z katalogu backend/):
+    python benchmarks/bench_shared_cache.py --n 2000 --backend compiled
+"""
+
+import argparse
+import json
+import multiprocessing
+import pickle
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from app.models.model_loader import model_version
+from app.services.predictor import CPVPredictor
+from app.services.prediction_cache import PredictionCache
+from app.services.shared_cache import SQLitePredictionCache
+
+RANDOM_STATE = 42
+MODEL_PATH = BASE_DIR / 'models' / 'model.pkl'
+
+def load_predictor(model_path, backend):
+    """Wczytuje model i tworzy predyktor."""
+    with open(model_path, 'rb') as f:
+        raw = f.read()
+    data = pickle.loads(raw)
+    data['model_version'] = model_version(raw)
+    if hasattr(data['model'], 'n_jobs'):
+        data['model'].n_jobs = 1
+    return CPVPredictor(data, backend=backend)
+
+def make_offers(predictor, n):
+    """Losowe oferty z kategoriami ze słowników modelu."""
+    rng = np.random.default_rng(RANDOM_STATE)
+    return [
+        {
+            'VALUE_EURO': float(round(rng.lognormal(10, 1.5), -2)),
+            'CAE_NAME': str(rng.choice(predictor.cae_names)),
+            'NUTS': str(rng.choice(predictor.nuts_codes)),
+            'TYPE_OF_CONTRACT': str(rng.choice(predictor.contract_types))
+        }
+        for _ in range(n)
+    ]
+
+def cache_key(predictor, offer):
+    return (predictor.model_version,) + predictor.cache_key(offer)
+
+def timed(fn, items):
+    """Czasy pojedynczych wywołań w mikrosekundach."""
+    times = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        times.append((time.perf_counter() - start) * 1e6)
+    return np.array(times)
+
+def summary(times):
+    return {
+        'mean_us': float(times.mean()),
+        'p50_us': float(np.percentile(times, 50)),
+        'p99_us': float(np.percentile(times, 99))
+    }
+
+def writer(model_path, backend, cache_path, n):
+    """Proces A: liczy predykcje i zapisuje je do wspólnego cache."""
+    predictor = load_predictor(model_path, backend)
+    cache = SQLitePredictionCache(cache_path, maxsize=10 * n)
+    for offer in make_offers(predictor, n):
+        cache.set(cache_key(predictor, offer), predictor.predict(offer))
+
+def reader(model_path, backend, cache_path, n, queue):
+    """Proces B: mierzy trafienia w cache zapisany przez proces A."""
+    predictor = load_predictor(model_path, backend)
+    offers = make_offers(predictor, n)
+    shared = SQLitePredictionCache(cache_path, maxsize=10 * n)
+    memory = PredictionCache(maxsize=10 * n)
+    for offer in offers:
+        memory.set(cache_key(predictor, offer), predictor.predict(offer))
+
+    results = {
+        'shared_hit': summary(timed(lambda o: shared.get(cache_key(predictor, o)), offers)),
+        'memory_hit': summary(timed(lambda o: memory.get(cache_key(predictor, o)), offers)),
+        'recompute': summary(timed(predictor.predict, offers)),
+        'shared_hit_rate': shared.stats()['hit_rate']
+    }
+    queue.put(results)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark wspoldzielonego cache predykcji')
+    parser.add_argument('--n', type=int, default=2000, help='liczba ofert')
+    parser.add_argument('--backend', default='sklearn', help='silnik inferencji')
+    parser.add_argument('--model-path', default=str(MODEL_PATH))
+    parser.add_argument('--output', help='plik JSON z wynikami')
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = Path(tmp) / 'cache.sqlite3'
+
+        print(f"1. Proces A zapisuje {args.n} predykcji...")
+        proc = ctx.Process(target=writer, args=(args.model_path, args.backend, cache_path, args.n))
+        proc.start()
+        proc.join()
+
+        print("2. Proces B odczytuje predykcje procesu A...")
+        queue = ctx.Queue()
+        proc = ctx.Process(target=reader,
+                           args=(args.model_path, args.backend, cache_path, args.n, queue))
+        proc.start()
+        results = queue.get()
+        proc.join()
+
+    print("\n" + "=" * 60)
+    print(f"WYNIKI (backend={args.backend}, n={args.n})")
+    print("=" * 60)
+    print(f"{'':24s}{'mean [us]':>12s}{'p50 [us]':>12s}{'p99 [us]':>12s}")
+    for name in ('shared_hit', 'memory_hit', 'recompute'):
+        r = results[name]
+        print(f"{name:24s}{r['mean_us']:12.1f}{r['p50_us']:12.1f}{r['p99_us']:12.1f}")
+    print(f"\nTrafienia w cache procesu A: {results['shared_hit_rate'] * 100:.1f}%")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(dict(results, backend=args.backend, n=args.n), f, indent=2)
+        print(f"Wyniki zapisane do: {args.output}")
+
+if __name__ == '__main__':
+    main()
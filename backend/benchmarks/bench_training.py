@@ -0,0 +1,272 @@
+"""
+Benchmark skalowalności treningu
+Model: CPVClassifier (Random Forest Classifier)
+
+Dla każdej konfiguracji (liczba wierszy, klas CPV, zamawiających, NUTS,
+drzew) generowany jest syntetyczny CSV w formacie data/ted_sample.csv,
+a etapy src/run_training.py (wczytanie, cechy, podział, trening,
+ewaluacja, zapis) są wykonywane w osobnym procesie. Dla każdego etapu
+zapisywany jest czas, RSS po etapie, szczytowe RSS procesu i rozmiar
+artefaktów (model.pkl oraz artefakt mmap). Przekroczenie limitu
+czasu / pamięci lub błąd jest zapisywany jako wynik konfiguracji - to
+właśnie punkt, w którym pipeline przestaje działać.
+
+Domyślny przegląd zmienia jeden wymiar naraz wokół konfiguracji bazowej.
+
+Uruchomienie (z katalogu backend/):
+    python benchmarks/bench_training.py --rows 10000 100000 1000000 --output training_scaling
+"""
+
+import argparse
+import csv
+import json
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+RANDOM_STATE = 42
+
+# Konfiguracja bazowa - jak data/ted_sample.csv i run_training.py
+BASE_CONFIG = {'rows': 10000, 'classes': 15, 'cae': 20, 'nuts': 19, 'trees': 100}
+
+STAGES = ('load', 'features', 'split', 'fit', 'evaluate', 'save')
+
+def generate_csv(path, rows, classes, cae, nuts, chunk=1000000):
+    """Syntetyczny CSV (CPV, VALUE_EURO, CAE_NAME, NUTS, TYPE_OF_CONTRACT) zapisywany partiami."""
+    rng = np.random.default_rng(RANDOM_STATE)
+    cpv_codes = np.arange(classes) * 10000 + 30000000
+    cae_names = np.array([f'Zamawiajacy {i:06d}' for i in range(cae)])
+    nuts_codes = np.array([f'PL{i:04d}' for i in range(nuts)])
+    contract_types = np.array(['SERVICES', 'SUPPLIES', 'WORKS'])
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['CPV', 'VALUE_EURO', 'CAE_NAME', 'NUTS', 'TYPE_OF_CONTRACT'])
+        for start in range(0, rows, chunk):
+            n = min(chunk, rows - start)
+            c = rng.integers(cae, size=n)
+            u = rng.integers(nuts, size=n)
+            t = rng.integers(3, size=n)
+            values = np.round(rng.lognormal(10, 1.5, size=n), 2)
+            # Kod CPV zależny od cech (z szumem) - drzewa mają co dzielić
+            label = (c * 7 + u * 3 + t + (values > 22026) + rng.integers(3, size=n)) % classes
+            writer.writerows(zip(cpv_codes[label], values, cae_names[c], nuts_codes[u],
+                                 contract_types[t]))
+
+def current_rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def directory_size(path):
+    return sum(p.stat().st_size for p in Path(path).rglob('*') if p.is_file())
+
+def run_stages(config, data_path, work_dir):
+    """
+    Etapy run_training.py dla jednej konfiguracji (w procesie potomnym).
+
+    Returns:
+    --------
+    list of dict
+        Wynik każdego wykonanego etapu; przy błędzie ostatni ma status != 'ok'
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, f1_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import LabelEncoder
+    from src.run_training import load_data, prepare_features, TEST_SIZE
+    from app.models.artifact import export_artifact
+
+    results = []
+    state = {}
+
+    def load():
+        state['data'] = load_data(data_path)
+
+    def features():
+        (state['X'], state['y'], state['scaler'], state['cae_names'],
+         state['nuts_codes'], state['contract_types']) = prepare_features(state.pop('data'))
+
+    def split():
+        state['label_encoder'] = LabelEncoder()
+        y = state['label_encoder'].fit_transform(state.pop('y'))
+        (state['X_train'], state['X_test'],
+         state['y_train'], state['y_test']) = train_test_split(
+            state.pop('X'), y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
+        )
+
+    def fit():
+        state['model'] = RandomForestClassifier(
+            n_estimators=config['trees'], max_depth=None, min_samples_split=2,
+            min_samples_leaf=1, random_state=RANDOM_STATE, n_jobs=-1
+        ).fit(state.pop('X_train'), state.pop('y_train'))
+
+    def evaluate():
+        y_pred = state['model'].predict(state.pop('X_test'))
+        y_test = state.pop('y_test')
+        state['accuracy'] = accuracy_score(y_test, y_pred)
+        state['f1_macro'] = f1_score(y_test, y_pred, average='macro')
+
+    def save():
+        model_data = {key: state[key] for key in ('model', 'label_encoder', 'scaler', 'cae_names',
+                                                  'nuts_codes', 'contract_types')}
+        with open(work_dir / 'model.pkl', 'wb') as f:
+            pickle.dump(model_data, f)
+        export_artifact(model_data, work_dir / 'model_mmap')
+        state['pickle_mb'] = (work_dir / 'model.pkl').stat().st_size / 1e6
+        state['artifact_mb'] = directory_size(work_dir / 'model_mmap') / 1e6
+
+    for name, stage in zip(STAGES, (load, features, split, fit, evaluate, save)):
+        start = time.perf_counter()
+        try:
+            stage()
+            status = 'ok'
+        except MemoryError:
+            status = 'oom'
+        except Exception as e:
+            status = f'error: {type(e).__name__}: {e}'
+        result = {
+            'stage': name,
+            'status': status,
+            'time_s': time.perf_counter() - start,
+            'rss_mb': current_rss_mb(),
+            'peak_rss_mb': peak_rss_mb()
+        }
+        for key in ('accuracy', 'f1_macro', 'pickle_mb', 'artifact_mb'):
+            if key in state and name in ('evaluate', 'save'):
+                result[key] = state[key]
+        results.append(result)
+        print(json.dumps(result), flush=True)
+        if status != 'ok':
+            break
+    return results
+
+def child(config_json, data_path, work_dir):
+    """Proces potomny: wykonanie etapów, wyniki jako linie JSON na stdout."""
+    run_stages(json.loads(config_json), data_path, Path(work_dir))
+
+def process_rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+def run_config(config, timeout, max_rss_mb, tmp):
+    """
+    Generuje dane i uruchamia etapy w osobnym procesie.
+
+    Proces jest przerywany po przekroczeniu limitu czasu albo RSS
+    (sprawdzane co 0.2 s) - etap w toku dostaje status 'timeout' / 'oom'.
+
+    Returns:
+    --------
+    list of dict
+        Wiersze wyników (konfiguracja + etap)
+    """
+    data_path = Path(tmp) / 'data.csv'
+    work_dir = Path(tmp) / 'model'
+    work_dir.mkdir(exist_ok=True)
+    start = time.perf_counter()
+    generate_csv(data_path, config['rows'], config['classes'], config['cae'], config['nuts'])
+    generate_s = time.perf_counter() - start
+    csv_mb = data_path.stat().st_size / 1e6
+
+    cmd = [sys.executable, __file__, '--child', json.dumps(config), str(data_path), str(work_dir)]
+    out_path = Path(tmp) / 'stdout.txt'
+    failure = None
+    with open(out_path, 'w') as out, open(Path(tmp) / 'stderr.txt', 'w+') as err:
+        proc = subprocess.Popen(cmd, stdout=out, stderr=err, cwd=BASE_DIR)
+        started = time.perf_counter()
+        while proc.poll() is None:
+            if time.perf_counter() - started > timeout:
+                failure = 'timeout'
+            elif max_rss_mb and process_rss_mb(proc.pid) > max_rss_mb:
+                failure = 'oom'
+            if failure:
+                proc.kill()
+                proc.wait()
+                break
+            time.sleep(0.2)
+        if failure is None and proc.returncode != 0:
+            # Ostatnia linia stderr (np. MemoryError poza etapem) lub kod wyjścia / sygnał
+            err.seek(0)
+            errors = err.read().strip().splitlines()
+            failure = errors[-1] if errors else f'exit {proc.returncode}'
+
+    stages = [json.loads(line) for line in out_path.read_text().splitlines() if line.startswith('{')]
+    if failure and (not stages or stages[-1]['status'] == 'ok') and len(stages) < len(STAGES):
+        # Proces przerwany w trakcie etapu
+        elapsed = time.perf_counter() - started - sum(stage['time_s'] for stage in stages)
+        stages.append({'stage': STAGES[len(stages)], 'status': failure, 'time_s': elapsed})
+    data_path.unlink()
+    return [dict(config, csv_mb=csv_mb, generate_s=generate_s, **stage) for stage in stages]
+
+def sweep(args):
+    """Konfiguracje: jeden wymiar naraz wokół konfiguracji bazowej."""
+    configs = [dict(BASE_CONFIG)]
+    for key, values in (('rows', args.rows), ('classes', args.classes), ('cae', args.cae),
+                        ('nuts', args.nuts), ('trees', args.trees)):
+        for value in values or []:
+            config = dict(BASE_CONFIG, **{key: value})
+            if config not in configs:
+                configs.append(config)
+    return configs
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark skalowalnosci treningu')
+    parser.add_argument('--rows', type=int, nargs='*', default=[100000, 1000000, 10000000])
+    parser.add_argument('--classes', type=int, nargs='*', default=[150, 1500, 9000])
+    parser.add_argument('--cae', type=int, nargs='*', default=[200, 2000, 20000])
+    parser.add_argument('--nuts', type=int, nargs='*', default=[100, 1000])
+    parser.add_argument('--trees', type=int, nargs='*', default=[10, 300])
+    parser.add_argument('--timeout', type=float, default=1800, help='limit czasu konfiguracji [s]')
+    parser.add_argument('--max-rss-mb', type=float, default=None,
+                        help='limit RSS procesu treningu - po przekroczeniu status oom')
+    parser.add_argument('--output', default='training_scaling', help='prefiks plików .json/.csv')
+    args = parser.parse_args()
+
+    configs = sweep(args)
+    print(f"Konfiguracji: {len(configs)}")
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, config in enumerate(configs, 1):
+            print(f"\n[{i}/{len(configs)}] {config}")
+            result = run_config(config, args.timeout, args.max_rss_mb, tmp)
+            for r in result:
+                print(f"   {r['stage']:9s} {r['status']:8.8s} {r.get('time_s', 0):9.2f}s "
+                      f"RSS {r.get('rss_mb', 0):8.0f} MB (szczyt {r.get('peak_rss_mb', 0):.0f} MB)")
+            rows += result
+
+    with open(f'{args.output}.json', 'w', encoding='utf-8') as f:
+        json.dump({'base': BASE_CONFIG, 'cpu_count': os.cpu_count(), 'results': rows}, f, indent=2)
+    columns = ['rows', 'classes', 'cae', 'nuts', 'trees', 'csv_mb', 'generate_s', 'stage', 'status',
+               'time_s', 'rss_mb', 'peak_rss_mb', 'accuracy', 'f1_macro', 'pickle_mb', 'artifact_mb']
+    with open(f'{args.output}.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\nWyniki zapisane do: {args.output}.json, {args.output}.csv")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(*sys.argv[2:5])
+    else:
+        main()
@@ -0,0 +1,385 @@
+"""
+Test obciążeniowy serwisu predykcji (HTTP)
+Model: CPVClassifier (Random Forest Classifier)
+
+Buduje syntetyczny model o zadanym rozmiarze (liczba drzew, głębokość,
+słowniki CAE/NUTS, liczba klas), uruchamia aplikację (fabryka create_app
+albo app_flask; serwer werkzeug lub gunicorn) na wolnym porcie, a potem
+przez zadany czas wysyła żądania /api/predict, /api/model-info
+i /api/predict/batch z ustaloną współbieżnością i proporcjami.
+Wynik: przepustowość i opóźnienia p50/p95/p99 na endpoint w pliku JSON
+(z commitem i parametrami) - do porównań między commitami (--compare).
+
+Wszystko działa lokalnie, bez sieci. Uruchomienie (z katalogu backend/):
+    python benchmarks/loadtest.py --concurrency 8 --duration 20 --output results.json
+    python benchmarks/loadtest.py --env PREDICTION_BACKEND=compiled --compare results.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import pickle
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+RANDOM_STATE = 42
+
+ENDPOINTS = {
+    'predict': ('POST', '/api/predict'),
+    'model-info': ('GET', '/api/model-info'),
+    'batch': ('POST', '/api/predict/batch'),
+}
+
+def build_synthetic_model(out_path, n_rows=5000, n_cae=200, n_nuts=50, n_contract=3,
+                          n_classes=45, n_estimators=100, max_depth=None):
+    """
+    Trenuje las na syntetycznych danych i zapisuje go w formacie models/model.pkl.
+
+    Returns:
+    --------
+    dict
+        Słowniki modelu (do generowania ofert)
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    rng = np.random.default_rng(RANDOM_STATE)
+    cae_names = sorted(f'Zamawiajacy {i:05d}' for i in range(n_cae))
+    nuts_codes = sorted(f'PL{i:03d}' for i in range(n_nuts))
+    contract_types = ['SERVICES', 'SUPPLIES', 'WORKS', 'MIXED'][:n_contract]
+    cpv_codes = np.arange(n_classes) * 100000 + 30000000
+
+    cae = rng.integers(n_cae, size=n_rows)
+    nuts = rng.integers(n_nuts, size=n_rows)
+    contract = rng.integers(n_contract, size=n_rows)
+    values = rng.lognormal(10, 1.5, size=n_rows)
+    # Klasa zależna od kategorii i wartości - las ma co dzielić
+    y = cpv_codes[(cae * 7 + nuts * 3 + contract + (np.log(values) > 10)) % n_classes]
+
+    n_features = 1 + n_cae + n_nuts + n_contract
+    X = np.zeros((n_rows, n_features))
+    rows = np.arange(n_rows)
+    X[rows, 1 + cae] = 1
+    X[rows, 1 + n_cae + nuts] = 1
+    X[rows, 1 + n_cae + n_nuts + contract] = 1
+    scaler = StandardScaler()
+    X[:, 0:1] = scaler.fit_transform(values.reshape(-1, 1))
+
+    label_encoder = LabelEncoder()
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth,
+                                   random_state=RANDOM_STATE, n_jobs=-1)
+    model.fit(X, label_encoder.fit_transform(y))
+
+    model_data = {
+        'model': model,
+        'label_encoder': label_encoder,
+        'scaler': scaler,
+        'cae_names': cae_names,
+        'nuts_codes': nuts_codes,
+        'contract_types': contract_types
+    }
+    with open(out_path, 'wb') as f:
+        pickle.dump(model_data, f)
+    return model_data
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def server_command(app_kind, server, port, workers):
+    """Polecenie uruchamiające aplikację na 127.0.0.1:port."""
+    if server == 'gunicorn':
+        target = 'wsgi:app' if app_kind == 'factory' else 'app_flask:app'
+        return ['gunicorn', '-c', 'gunicorn.conf.py', '-b', f'127.0.0.1:{port}',
+                '--workers', str(workers), target]
+    if app_kind == 'factory':
+        code = ("from app import create_app; "
+                f"create_app('production').run(host='127.0.0.1', port={port}, threaded=True)")
+    else:
+        code = f"import app_flask; app_flask.app.run(host='127.0.0.1', port={port}, threaded=True)"
+    return [sys.executable, '-c', code]
+
+def wait_ready(port, app_kind, timeout=120.0):
+    """Czeka, aż serwer odpowie gotowością (/readyz lub /api/model-info)."""
+    path = '/readyz' if app_kind == 'factory' else '/api/model-info'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', path)
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+def process_rss_mb(pid):
+    """RSS procesu i jego dzieci (workery gunicorn) w MB."""
+    total = 0
+    pids = [pid]
+    try:
+        children = Path(f'/proc/{pid}/task/{pid}/children').read_text().split()
+        pids += [int(c) for c in children]
+    except OSError:
+        pass
+    for p in pids:
+        try:
+            for line in Path(f'/proc/{p}/status').read_text().splitlines():
+                if line.startswith('VmRSS:'):
+                    total += int(line.split()[1])
+        except OSError:
+            pass
+    return total / 1024
+
+def make_offers(model_data, n, seed=RANDOM_STATE):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'VALUE_EURO': float(round(rng.lognormal(10, 1.5), -2)),
+            'CAE_NAME': str(rng.choice(model_data['cae_names'])),
+            'NUTS': str(rng.choice(model_data['nuts_codes'])),
+            'TYPE_OF_CONTRACT': str(rng.choice(model_data['contract_types']))
+        }
+        for _ in range(n)
+    ]
+
+def parse_mix(text):
+    """'predict=90,model-info=10' -> {'predict': 0.9, 'model-info': 0.1}"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ENDPOINTS:
+            raise ValueError(f"Nieznany endpoint w --mix: {name}")
+        mix[name] = float(weight or 1)
+    total = sum(mix.values())
+    return {name: w / total for name, w in mix.items() if w > 0}
+
+class Client(threading.Thread):
+    """Wątek wysyłający żądania jedno po drugim (pętla zamknięta) po jednym połączeniu."""
+
+    def __init__(self, port, mix, offers, batch_size, stop_at, record_from, seed):
+        super().__init__(daemon=True)
+        self.port = port
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.offers = offers
+        self.batch_size = batch_size
+        self.stop_at = stop_at
+        self.record_from = record_from
+        self.rng = random.Random(seed)
+        self.samples = {name: [] for name in ENDPOINTS}
+        self.errors = {name: 0 for name in ENDPOINTS}
+        self.conn = None
+
+    def body(self, name):
+        if name == 'predict':
+            return json.dumps(self.rng.choice(self.offers))
+        if name == 'batch':
+            return json.dumps({'offers': self.rng.sample(self.offers, self.batch_size)})
+        return None
+
+    def run(self):
+        headers = {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'}
+        while True:
+            now = time.perf_counter()
+            if now >= self.stop_at:
+                break
+            name = self.rng.choices(self.names, self.weights)[0]
+            method, path = ENDPOINTS[name]
+            body = self.body(name)
+            start = time.perf_counter()
+            try:
+                if self.conn is None:
+                    self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                response.read()
+                ok = response.status == 200
+                if response.getheader('Connection', '').lower() == 'close':
+                    self.conn.close()
+                    self.conn = None
+            except (OSError, http.client.HTTPException):
+                ok = False
+                self.conn = None
+            elapsed = time.perf_counter() - start
+            if start >= self.record_from:
+                if ok:
+                    self.samples[name].append(elapsed)
+                else:
+                    self.errors[name] += 1
+
+def summarize(samples, errors, duration):
+    times = np.array(samples) * 1000.0
+    result = {
+        'requests': int(len(times)),
+        'errors': int(errors),
+        'throughput_rps': len(times) / duration,
+    }
+    if len(times):
+        result.update({
+            'mean_ms': float(times.mean()),
+            'p50_ms': float(np.percentile(times, 50)),
+            'p95_ms': float(np.percentile(times, 95)),
+            'p99_ms': float(np.percentile(times, 99)),
+            'max_ms': float(times.max())
+        })
+    return result
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path):
+    """Porównanie z poprzednim plikiem wyników."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nPorownanie z {baseline_path} (commit {baseline.get('commit')}):")
+    print(f"{'endpoint':14s}{'rps':>10s}{'d rps':>9s}{'p50':>9s}{'d p50':>9s}{'p99':>9s}{'d p99':>9s}")
+    for name, r in results['endpoints'].items():
+        b = baseline.get('endpoints', {}).get(name)
+        if not b or 'p99_ms' not in r or 'p99_ms' not in b:
+            continue
+
+        def delta(key):
+            return (r[key] / b[key] - 1) * 100 if b[key] else 0.0
+
+        print(f"{name:14s}{r['throughput_rps']:10.1f}{delta('throughput_rps'):+8.1f}%"
+              f"{r['p50_ms']:9.2f}{delta('p50_ms'):+8.1f}%{r['p99_ms']:9.2f}{delta('p99_ms'):+8.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description='Test obciazeniowy serwisu predykcji CPV')
+    parser.add_argument('--app', choices=('factory', 'legacy'), default='factory',
+                        help='create_app (app/) lub app_flask.py')
+    parser.add_argument('--server', choices=('werkzeug', 'gunicorn'), default='werkzeug')
+    parser.add_argument('--workers', type=int, default=2, help='workery gunicorn')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20.0, help='czas pomiaru [s]')
+    parser.add_argument('--warmup', type=float, default=3.0, help='rozgrzewka bez pomiaru [s]')
+    parser.add_argument('--mix', default='predict=90,model-info=10')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--distinct', type=int, default=5000, help='liczba różnych ofert')
+    parser.add_argument('--model-path', default=None, help='istniejący model.pkl zamiast syntetycznego')
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--max-depth', type=int, default=None)
+    parser.add_argument('--n-rows', type=int, default=5000)
+    parser.add_argument('--n-cae', type=int, default=200)
+    parser.add_argument('--n-nuts', type=int, default=50)
+    parser.add_argument('--n-classes', type=int, default=45)
+    parser.add_argument('--env', action='append', default=[],
+                        help='zmienna środowiska serwera KEY=VALUE (można powtarzać)')
+    parser.add_argument('--output', help='plik JSON z wynikami')
+    parser.add_argument('--compare', help='poprzedni plik JSON do porównania')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model_path:
+            model_path = Path(args.model_path)
+            with open(model_path, 'rb') as f:
+                model_data = pickle.load(f)
+            print(f"1. Model: {model_path}")
+        else:
+            model_path = Path(tmp) / 'model.pkl'
+            print(f"1. Budowa modelu syntetycznego ({args.trees} drzew, {args.n_rows} wierszy, "
+                  f"{args.n_cae} CAE, {args.n_nuts} NUTS, {args.n_classes} klas)...")
+            model_data = build_synthetic_model(
+                model_path, n_rows=args.n_rows, n_cae=args.n_cae, n_nuts=args.n_nuts,
+                n_classes=args.n_classes, n_estimators=args.trees, max_depth=args.max_depth
+            )
+        offers = make_offers(model_data, args.distinct)
+
+        port = free_port()
+        env = dict(os.environ, MODEL_PATH=str(model_path), FLASK_DEBUG='False',
+                   SHARED_CACHE_PATH=str(Path(tmp) / 'cache.sqlite3'))
+        for item in args.env:
+            key, _, value = item.partition('=')
+            env[key] = value
+
+        print(f"2. Start serwera ({args.app}, {args.server}) na porcie {port}...")
+        start = time.perf_counter()
+        proc = subprocess.Popen(server_command(args.app, args.server, port, args.workers),
+                                cwd=BASE_DIR, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_ready(port, args.app):
+                print("BLAD: serwer nie zglosil gotowosci")
+                sys.exit(1)
+            startup_s = time.perf_counter() - start
+            print(f"   Gotowy po {startup_s:.2f}s")
+
+            print(f"3. Obciazenie: {args.concurrency} klientow, {args.warmup:.0f}s rozgrzewki "
+                  f"+ {args.duration:.0f}s pomiaru, mix {args.mix}...")
+            record_from = time.perf_counter() + args.warmup
+            stop_at = record_from + args.duration
+            clients = [Client(port, mix, offers, args.batch_size, stop_at, record_from, seed=i)
+                       for i in range(args.concurrency)]
+            for c in clients:
+                c.start()
+            for c in clients:
+                c.join()
+            rss_mb = process_rss_mb(proc.pid)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    endpoints = {}
+    all_samples = []
+    all_errors = 0
+    for name in mix:
+        samples = [t for c in clients for t in c.samples[name]]
+        errors = sum(c.errors[name] for c in clients)
+        endpoints[name] = summarize(samples, errors, args.duration)
+        all_samples += samples
+        all_errors += errors
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'params': dict(vars(args), mix=mix),
+        'startup_s': startup_s,
+        'server_rss_mb': rss_mb,
+        'total': summarize(all_samples, all_errors, args.duration),
+        'endpoints': endpoints
+    }
+
+    print("\n" + "=" * 60)
+    print(f"WYNIKI (commit {results['commit']}, RSS serwera {rss_mb:.0f} MB)")
+    print("=" * 60)
+    print(f"{'endpoint':14s}{'req':>8s}{'err':>6s}{'rps':>9s}{'p50':>9s}{'p95':>9s}{'p99':>9s}")
+    for name, r in list(endpoints.items()) + [('total', results['total'])]:
+        print(f"{name:14s}{r['requests']:8d}{r['errors']:6d}{r['throughput_rps']:9.1f}"
+              f"{r.get('p50_ms', 0):9.2f}{r.get('p95_ms', 0):9.2f}{r.get('p99_ms', 0):9.2f}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWyniki zapisane do: {args.output}")
+
+if __name__ == '__main__':
+    main()
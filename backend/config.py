@@ -16,8 +16,19 @@ class Config:
     DEBUG = os.environ.get('FLASK_DEBUG', 'True').lower() == 'true'
     
     # Model paths
-    MODEL_PATH = BASE_DIR / 'models' / 'model.pkl'
+    MODEL_PATH = Path(os.environ.get('MODEL_PATH', BASE_DIR / 'models' / 'model.pkl'))
     METRICS_PATH = BASE_DIR / 'models' / 'metrics.txt'
+    # Format modelu: 'pickle' (model.pkl) lub 'mmap' (artefakt z run_training.py)
+    MODEL_FORMAT = os.environ.get('MODEL_FORMAT', 'pickle')
+    MODEL_ARTIFACT_PATH = Path(os.environ.get('MODEL_ARTIFACT_PATH',
+                                              BASE_DIR / 'models' / 'model_mmap'))
+    ANSWER_TABLE_PATH = BASE_DIR / 'models' / 'answer_table.pkl'
+    # Wczytanie i rozgrzewka modelu w tle przy create_app (gotowość: /readyz)
+    MODEL_PRELOAD = os.environ.get('MODEL_PRELOAD', 'True').lower() == 'true'
+    # Przeładowanie modelu: co ile sekund sprawdzać plik modelu (0 = wyłączone)
+    MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+    # Token dla endpointów /api/admin/* (pusty = endpointy wyłączone)
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
     
     # Data paths
     DATA_PATH = BASE_DIR / 'data' / 'ted_sample.csv'
@@ -26,6 +37,57 @@ class Config:
     MODEL_NAME = 'CPVClassifier'
     MODEL_VERSION = '1.0'
     MODEL_ALGORITHM = 'Random Forest'
+    
+    # Silnik inferencji: 'sklearn', 'compiled' (płaskie tablice NumPy),
+    # 'compact' (rzadkie rozkłady w liściach, src/compact_model.py)
+    # lub 'table' (tablica odpowiedzi z src/compile_answer_table.py)
+    PREDICTION_BACKEND = os.environ.get('PREDICTION_BACKEND', 'sklearn')
+    
+    # Cache predykcji (rozmiar 0 = wyłączony - domyślnie, TTL 0 = bez limitu czasu)
+    PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 0))
+    PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', 0))
+    # Backend cache: 'memory' (w procesie) lub 'sqlite' (wspólny dla workerów)
+    PREDICTION_CACHE_BACKEND = os.environ.get('PREDICTION_CACHE_BACKEND', 'memory')
+    SHARED_CACHE_PATH = Path(os.environ.get('SHARED_CACHE_PATH',
+                                            BASE_DIR / 'instance' / 'prediction_cache.sqlite3'))
+    # Klucz po przedziale progów lasu zamiast dokładnej wartości VALUE_EURO
+    PREDICTION_CACHE_SNAP = os.environ.get('PREDICTION_CACHE_SNAP', 'False').lower() == 'true'
+    
+    # Mikro-batchowanie współbieżnych żądań /api/predict
+    MICRO_BATCH_ENABLED = os.environ.get('MICRO_BATCH_ENABLED', 'False').lower() == 'true'
+    MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get('MICRO_BATCH_MAX_WAIT_MS', 2.0))
+    MICRO_BATCH_MAX_SIZE = int(os.environ.get('MICRO_BATCH_MAX_SIZE', 64))
+    MICRO_BATCH_MAX_QUEUE = int(os.environ.get('MICRO_BATCH_MAX_QUEUE', 1024))
+    MICRO_BATCH_TIMEOUT = float(os.environ.get('MICRO_BATCH_TIMEOUT', 5.0))
+    
+    # Kontrola przyjęć /api/predict i /api/predict/batch (per worker, 0 = wyłączona):
+    # ponad limit żądania czekają w kolejce, przy przeciążeniu 503 + Retry-After
+    ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', 0))
+    ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 16))
+    ADMISSION_QUEUE_TIMEOUT_MS = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT_MS', 100))
+    ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', 1))
+    
+    # Metryki: /metrics (Prometheus) i nagłówek Server-Timing w odpowiedziach API
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'False').lower() == 'true'
+    
+    # Profilowanie żądań: X-Profile (z X-Admin-Token) lub POST /api/admin/profile
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() == 'true'
+    PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', BASE_DIR / 'instance' / 'profiles'))
+    PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 1.0))
+    # Profilowanie następnych N żądań od startu procesu (0 = tylko na żądanie)
+    PROFILE_MODE = os.environ.get('PROFILE_MODE', 'sample')
+    PROFILE_REQUESTS = int(os.environ.get('PROFILE_REQUESTS', 0))
+    
+    # Cache-Control max-age dla /api/model-info (rewalidacja przez ETag)
+    MODEL_INFO_MAX_AGE = int(os.environ.get('MODEL_INFO_MAX_AGE', 300))
+    
+    # Predykcja wsadowa
+    MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 1000))
+    # Predykcja strumieniowa (/api/predict/stream) - wierszy w partii
+    STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 1000))
+    # Najdłuższa linia CSV / NDJSON (znaki) - dłuższa jest błędem wiersza
+    STREAM_MAX_LINE_LENGTH = int(os.environ.get('STREAM_MAX_LINE_LENGTH', 65536))
 
 class DevelopmentConfig(Config):
     """Konfiguracja deweloperska."""
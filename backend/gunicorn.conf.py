@@ -0,0 +1,120 @@
+"""
+Konfiguracja gunicorn dla ProcureAI CPV Predictor
+Model: CPVClassifier v1.0
+
+- preload_app: model wczytany raz w masterze, współdzielony przez workery (copy-on-write)
+- liczba workerów / wątków dobierana automatycznie do CPU i dostępnej pamięci
+  (nadpisywana przez WEB_CONCURRENCY / GUNICORN_THREADS)
+- raport RSS / PSS każdego workera po starcie
+
+Uruchomienie (z katalogu backend/):
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+MODEL_PATH = Path(os.getenv('MODEL_PATH', BASE_DIR / 'models' / 'model.pkl'))
+
+# Szacunkowa pamięć prywatna workera ponad współdzielony model (MB)
+WORKER_PRIVATE_MB = int(os.getenv('WORKER_PRIVATE_MB', 96))
+
+def read_memory(pid='self'):
+    """
+    Zwraca pamięć procesu w MB: rss, pss (RSS z proporcjonalnym udziałem
+    stron współdzielonych), shared i private. Linux - /proc/<pid>/smaps_rollup.
+    """
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    except OSError:
+        return {}
+    return {
+        'rss': fields.get('Rss', 0.0),
+        'pss': fields.get('Pss', 0.0),
+        'shared': fields.get('Shared_Clean', 0.0) + fields.get('Shared_Dirty', 0.0),
+        'private': fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0)
+    }
+
+def available_memory_mb():
+    """Dostępna pamięć: limit cgroup (kontener) lub MemAvailable hosta."""
+    try:
+        with open('/sys/fs/cgroup/memory.max') as f:
+            limit = f.read().strip()
+        if limit != 'max':
+            return int(limit) / 1024 / 1024
+    except OSError:
+        pass
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def autotune_workers():
+    """
+    Liczba workerów: jeden na rdzeń (predykcja lasu jest CPU-bound),
+    ograniczona pamięcią - model liczony raz (współdzielony), każdy
+    worker dokłada WORKER_PRIVATE_MB.
+    """
+    if os.getenv('WEB_CONCURRENCY'):
+        return int(os.getenv('WEB_CONCURRENCY'))
+    by_cpu = os.cpu_count() or 1
+    available = available_memory_mb()
+    if available is None:
+        return by_cpu
+    model_mb = MODEL_PATH.stat().st_size / 1024 / 1024 if MODEL_PATH.exists() else 0
+    by_memory = int((available * 0.8 - model_mb) // WORKER_PRIVATE_MB)
+    return max(1, min(by_cpu, by_memory))
+
+def autotune_threads():
+    """Wątki na workera: więcej przy mikro-batchowaniu, które zbiera współbieżne żądania."""
+    if os.getenv('GUNICORN_THREADS'):
+        return int(os.getenv('GUNICORN_THREADS'))
+    if os.getenv('MICRO_BATCH_ENABLED', 'False').lower() == 'true':
+        return 8
+    return 2
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 5000)}"
+preload_app = True
+workers = autotune_workers()
+threads = autotune_threads()
+worker_class = 'gthread'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = 5
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+def when_ready(server):
+    """Master po wczytaniu modelu (przed utworzeniem workerów)."""
+    mem = read_memory()
+    server.log.info(
+        f"🚀 ProcureAI CPV Predictor: {workers} workerów x {threads} wątków, "
+        f"master RSS {mem.get('rss', 0):.0f} MB"
+    )
+
+def post_worker_init(worker):
+    """Raport pamięci workera - większość RSS powinna być współdzielona z masterem."""
+    mem = read_memory()
+    worker.log.info(
+        f"👷 Worker {worker.pid}: RSS {mem.get('rss', 0):.0f} MB, "
+        f"PSS {mem.get('pss', 0):.0f} MB, współdzielone {mem.get('shared', 0):.0f} MB, "
+        f"prywatne {mem.get('private', 0):.0f} MB"
+    )
+
+def worker_exit(server, worker):
+    """Raport pamięci workera przy zakończeniu (np. po max_requests)."""
+    mem = read_memory(worker.pid)
+    if mem:
+        server.log.info(
+            f"👋 Worker {worker.pid} kończy: RSS {mem['rss']:.0f} MB, "
+            f"prywatne {mem['private']:.0f} MB"
+        )
@@ -0,0 +1,207 @@
+"""
+Kolumnowe wczytywanie danych treningowych
+Model: CPVClassifier (Random Forest Classifier)
+Projekt: BidInsight - Automatyczna kategoryzacja ofert przetargowych
+
+Plik (CSV partiami przez pandas, Parquet / Arrow przez pyarrow - opcjonalny)
+jest czytany bez słowników na wiersz: VALUE_EURO i CPV trafiają do
+typowanych tablic, a CAE_NAME / NUTS / TYPE_OF_CONTRACT do kodów
+słownikowych int32. Słowniki są scalane między partiami i na końcu
+sortowane (kolejność kolumn one-hot jak dotąd w run_training.py), więc kody
+można podać wprost do FeaturePipeline.encode_codes.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.services.feature_pipeline import CATEGORICAL_FIELDS
+
+# Konfiguracja
+CHUNK_ROWS = 500000
+COLUMNS = ['CPV', 'VALUE_EURO', *CATEGORICAL_FIELDS]
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+ARROW_SUFFIXES = ('.arrow', '.feather', '.ipc')
+
+class DictionaryBuilder:
+    """Słownik kategorii budowany partiami (kody w kolejności pierwszego wystąpienia)."""
+
+    def __init__(self, keep_codes=True):
+        """
+        Parameters:
+        -----------
+        keep_codes : bool
+            Czy zachować kody partii (False = tylko słownik, np. pierwszy
+            przebieg treningu out-of-core)
+        """
+        self.keep_codes = keep_codes
+        self.index = {}
+        self.chunks = []
+
+    def add(self, codes, uniques):
+        """
+        Dodaje partię zakodowaną lokalnie (np. pd.factorize, Arrow dictionary).
+
+        Parameters:
+        -----------
+        codes : np.array
+            Indeksy w uniques
+        uniques : sequence
+            Lokalny słownik partii
+        """
+        remap = np.fromiter((self.index.setdefault(u, len(self.index)) for u in uniques),
+                            dtype=np.int32, count=len(uniques))
+        if self.keep_codes:
+            self.chunks.append(remap[codes])
+
+    def finish(self):
+        """
+        Posortowany słownik i kody w nim.
+
+        Returns:
+        --------
+        tuple
+            (kody int32, lista kategorii w kolejności sortowania)
+        """
+        vocabulary = list(self.index)
+        order = sorted(range(len(vocabulary)), key=vocabulary.__getitem__)
+        rank = np.empty(len(vocabulary), dtype=np.int32)
+        rank[order] = np.arange(len(vocabulary), dtype=np.int32)
+        codes = np.concatenate(self.chunks) if self.chunks else np.empty(0, dtype=np.int32)
+        self.chunks = []
+        return rank[codes], [vocabulary[i] for i in order]
+
+class ColumnarData:
+    """Dane treningowe w kolumnach: tablice typowane i kody słownikowe."""
+
+    def __init__(self, values, cpv, codes, vocabularies):
+        """
+        Parameters:
+        -----------
+        values : np.array
+            VALUE_EURO (float64)
+        cpv : np.array
+            Kody CPV (int64)
+        codes : tuple of np.array
+            Kody int32 pól CATEGORICAL_FIELDS
+        vocabularies : tuple of list
+            Posortowane słowniki pól CATEGORICAL_FIELDS
+        """
+        self.values = values
+        self.cpv = cpv
+        self.codes = tuple(codes)
+        self.vocabularies = tuple(vocabularies)
+
+    def __len__(self):
+        return len(self.values)
+
+    def nbytes(self):
+        """Rozmiar tablic (bez słowników)."""
+        return self.values.nbytes + self.cpv.nbytes + sum(c.nbytes for c in self.codes)
+
+def _arrow_batches(path, chunk_rows):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Odczyt Parquet / Arrow wymaga pyarrow (pip install pyarrow)")
+    if path.suffix.lower() in PARQUET_SUFFIXES:
+        # Kolumny kategoryczne czytane od razu jako słownikowe
+        parquet = pq.ParquetFile(path, read_dictionary=list(CATEGORICAL_FIELDS))
+        yield from parquet.iter_batches(batch_size=chunk_rows, columns=COLUMNS)
+    else:
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).select(COLUMNS)
+
+def iter_chunks(path, chunk_rows=CHUNK_ROWS):
+    """
+    Partie pliku w postaci kolumnowej.
+
+    Parameters:
+    -----------
+    path : str or Path
+        CSV, Parquet (.parquet/.pq) lub Arrow IPC (.arrow/.feather/.ipc)
+    chunk_rows : int
+        Liczba wierszy partii
+
+    Yields:
+    -------
+    tuple
+        (values float64, cpv int64, [(kody lokalne, słownik lokalny) dla CATEGORICAL_FIELDS])
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix in PARQUET_SUFFIXES + ARROW_SUFFIXES:
+        for batch in _arrow_batches(path, chunk_rows):
+            categorical = []
+            for field in CATEGORICAL_FIELDS:
+                column = batch.column(field)
+                if not hasattr(column, 'indices'):
+                    column = column.dictionary_encode()
+                categorical.append((column.indices.to_numpy(zero_copy_only=False),
+                                    column.dictionary.to_pylist()))
+            yield (batch.column('VALUE_EURO').to_numpy(zero_copy_only=False).astype(np.float64, copy=False),
+                   batch.column('CPV').to_numpy(zero_copy_only=False).astype(np.int64, copy=False),
+                   categorical)
+    else:
+        reader = pd.read_csv(path, usecols=COLUMNS, chunksize=chunk_rows, keep_default_na=False,
+                             dtype={'CPV': np.int64, 'VALUE_EURO': np.float64,
+                                    **{field: str for field in CATEGORICAL_FIELDS}})
+        for chunk in reader:
+            yield (chunk['VALUE_EURO'].to_numpy(),
+                   chunk['CPV'].to_numpy(),
+                   [pd.factorize(chunk[field]) for field in CATEGORICAL_FIELDS])
+
+def fixed_codes(categorical, maps):
+    """
+    Kody partii w ustalonych słownikach (nieznana kategoria -> 0).
+
+    Parameters:
+    -----------
+    categorical : list of tuple
+        (kody lokalne, słownik lokalny) z iter_chunks
+    maps : sequence of dict
+        Kategoria -> indeks (np. FeaturePipeline.maps)
+
+    Returns:
+    --------
+    list of np.array
+        Kody int32 pól CATEGORICAL_FIELDS
+    """
+    return [
+        np.fromiter((mapping.get(u, 0) for u in uniques), dtype=np.int32, count=len(uniques))[codes]
+        for (codes, uniques), mapping in zip(categorical, maps)
+    ]
+
+def load_columns(path, chunk_rows=CHUNK_ROWS):
+    """
+    Wczytuje cały plik do ColumnarData (bez słowników na wiersz).
+
+    Parameters:
+    -----------
+    path : str or Path
+        Plik danych (patrz iter_chunks)
+    chunk_rows : int
+        Liczba wierszy partii przy czytaniu
+
+    Returns:
+    --------
+    ColumnarData
+        Kolumny z kodami w posortowanych słownikach
+    """
+    builders = [DictionaryBuilder() for _ in CATEGORICAL_FIELDS]
+    values, cpv = [], []
+    for chunk_values, chunk_cpv, categorical in iter_chunks(path, chunk_rows):
+        values.append(chunk_values)
+        cpv.append(chunk_cpv)
+        for builder, (codes, uniques) in zip(builders, categorical):
+            builder.add(codes, uniques)
+    codes, vocabularies = zip(*(builder.finish() for builder in builders))
+    return ColumnarData(
+        np.concatenate(values) if values else np.empty(0, dtype=np.float64),
+        np.concatenate(cpv) if cpv else np.empty(0, dtype=np.int64),
+        codes, vocabularies
+    )
@@ -0,0 +1,193 @@
+"""
+Kompaktowanie modelu CPVClassifier do zwartego artefaktu mmap
+Model: CPVClassifier (Random Forest Classifier)
+Projekt: BidInsight - Automatyczna kategoryzacja ofert przetargowych
+
+Uruchamiany po run_training.py. Las z models/model.pkl jest zapisywany
+jako CompactForest: tylko liście przechowują rozkłady, rzadko (klasy
+o niezerowym prawdopodobieństwie), progi w float32/float16, dzieci int32.
+Przy tysiącach kodów CPV tablica value sklearn (węzły x klasy, float64)
+jest dominującą częścią model.pkl i RSS workera.
+
+Serwowanie: MODEL_FORMAT=mmap, MODEL_ARTIFACT_PATH=models/model_compact.
+Raport pamięci (rozmiary tablic, plików i RSS procesu serwującego)
+trafia do memory_report.json w katalogu artefaktu.
+
+Uruchomienie (z katalogu backend/):
+    python src/compact_model.py --threshold-dtype float32 --max-leaf-classes 32
+"""
+
+import argparse
+import json
+import pickle
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from app.services.forest_engine import CompiledForest, CompactForest, forest_nbytes
+from app.services.predictor import CPVPredictor
+from app.models.artifact import export_artifact
+from app.models.model_loader import model_version
+
+# Konfiguracja
+RANDOM_STATE = 42
+MODEL_PATH = BASE_DIR / 'models' / 'model.pkl'
+COMPACT_PATH = BASE_DIR / 'models' / 'model_compact'
+N_CHECK = 2000
+
+# Proces potomny: wczytanie modelu, jedna predykcja, RSS (MB) na stdout
+RSS_CHILD = r'''
+import sys
+sys.path.insert(0, {base_dir!r})
+from app.models.model_loader import ModelLoader
+from app.services.predictor import CPVPredictor
+fmt, path, backend = {fmt!r}, {path!r}, {backend!r}
+model_data = ModelLoader.read({{'MODEL_PATH': path, 'MODEL_FORMAT': fmt, 'MODEL_ARTIFACT_PATH': path,
+                               'PREDICTION_BACKEND': backend, 'ANSWER_TABLE_PATH': None}})
+predictor = CPVPredictor(model_data, backend=backend)
+if getattr(predictor.model, 'n_jobs', None):
+    predictor.model.n_jobs = 1
+predictor.predict({{'VALUE_EURO': 100000.0, 'CAE_NAME': predictor.cae_names[0],
+                   'NUTS': predictor.nuts_codes[0], 'TYPE_OF_CONTRACT': predictor.contract_types[0]}})
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmRSS:'):
+            print(int(line.split()[1]) / 1024)
+'''
+
+def serving_rss_mb(fmt, path, backend):
+    """RSS świeżego procesu po wczytaniu modelu i pierwszej predykcji."""
+    code = RSS_CHILD.format(base_dir=str(BASE_DIR), fmt=fmt, path=str(path), backend=backend)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+def compare(reference, compact, model_data, n_check=N_CHECK):
+    """
+    Porównuje predykcje zwartego lasu z oryginałem na losowych ofertach.
+
+    Returns:
+    --------
+    dict
+        top1_agreement (ułamek zgodnych klas), max_abs_diff (prawdopodobieństwa)
+    """
+    rng = np.random.default_rng(RANDOM_STATE)
+    offers = [
+        {
+            'VALUE_EURO': float(rng.lognormal(10, 1.5)),
+            'CAE_NAME': rng.choice(model_data['cae_names']),
+            'NUTS': rng.choice(model_data['nuts_codes']),
+            'TYPE_OF_CONTRACT': rng.choice(model_data['contract_types'])
+        }
+        for _ in range(n_check)
+    ]
+    X = reference.prepare_features_batch(offers)
+    expected = reference.engine.predict_proba(X)
+    got = compact.engine.predict_proba(X)
+    return {
+        'top1_agreement': float((expected.argmax(axis=1) == got.argmax(axis=1)).mean()),
+        'max_abs_diff': float(np.abs(expected - got).max())
+    }
+
+def main():
+    """Kompaktuje zapisany model i zapisuje raport pamięci."""
+    parser = argparse.ArgumentParser(description='Kompaktowanie lasu do zwartego artefaktu mmap')
+    parser.add_argument('--model', default=str(MODEL_PATH), help='model.pkl z run_training.py')
+    parser.add_argument('--output', default=str(COMPACT_PATH), help='katalog artefaktu')
+    parser.add_argument('--threshold-dtype', default='float32', choices=['float32', 'float16'])
+    parser.add_argument('--prob-dtype', default='float32', choices=['float32', 'float16'])
+    parser.add_argument('--max-leaf-classes', type=int, default=None,
+                        help='najwyzej tyle klas na lisc (domyslnie wszystkie niezerowe)')
+    parser.add_argument('--no-rss', action='store_true', help='bez pomiaru RSS procesu serwujacego')
+    args = parser.parse_args()
+    model_path, output = Path(args.model), Path(args.output)
+
+    print("=" * 60)
+    print("KOMPAKTOWANIE MODELU - PROJEKT BIDINSIGHT")
+    print("=" * 60)
+
+    # 1. Wczytanie modelu
+    print("\n1. Wczytanie modelu...")
+    with open(model_path, 'rb') as f:
+        raw = f.read()
+    model_data = pickle.loads(raw)
+    version = model_version(raw)
+    model = model_data['model']
+    print(f"   Wersja modelu: {version}")
+    print(f"   Drzew: {len(model.estimators_)}, klas CPV: {len(model.classes_)}")
+
+    # 2. Kompaktowanie
+    print("\n2. Kompaktowanie lasu...")
+    start = time.perf_counter()
+    compact = CompactForest.from_sklearn(
+        model,
+        threshold_dtype=np.dtype(args.threshold_dtype),
+        prob_dtype=np.dtype(args.prob_dtype),
+        max_leaf_classes=args.max_leaf_classes
+    )
+    print(f"   Wezlow wewnetrznych: {len(compact.feature)}, lisci: {compact.n_leaves}, "
+          f"wpisow rozkladow: {len(compact.leaf_class)} "
+          f"(srednio {len(compact.leaf_class) / max(compact.n_leaves, 1):.2f} klas na lisc)")
+    print(f"   Czas: {time.perf_counter() - start:.1f} s")
+
+    # 3. Zgodność z oryginałem
+    print(f"\n3. Porownanie z oryginalnym lasem na {N_CHECK} losowych ofertach...")
+    reference = CPVPredictor(model_data, backend='sklearn')
+    if hasattr(reference.model, 'n_jobs'):
+        reference.model.n_jobs = 1
+    agreement = compare(reference, CPVPredictor(dict(model_data, engine=compact), backend='compact'),
+                        model_data)
+    print(f"   Zgodnosc top 1: {agreement['top1_agreement'] * 100:.2f}%, "
+          f"maks. roznica prawdopodobienstw: {agreement['max_abs_diff']:.2e}")
+    exact = (args.threshold_dtype == 'float32' and args.prob_dtype == 'float32'
+             and args.max_leaf_classes is None)
+    if exact and agreement['max_abs_diff'] > 1e-6:
+        print("   BLAD: bezstratne kompaktowanie zmienilo wyniki - artefakt nie zostal zapisany")
+        sys.exit(1)
+
+    # 4. Zapis artefaktu
+    print("\n4. Zapis artefaktu...")
+    export_artifact(model_data, output, model_version=version, engine=compact)
+    artifact_bytes = sum(p.stat().st_size for p in output.iterdir() if p.is_file())
+    print(f"   Artefakt zapisany do: {output}")
+
+    # 5. Raport pamięci
+    print("\n5. Raport pamieci...")
+    report = {
+        'model_version': version,
+        'n_trees': compact.n_trees,
+        'n_classes': compact.n_classes,
+        'options': {
+            'threshold_dtype': args.threshold_dtype,
+            'prob_dtype': args.prob_dtype,
+            'max_leaf_classes': args.max_leaf_classes
+        },
+        'agreement': agreement,
+        'bytes': {
+            'model_pkl': model_path.stat().st_size,
+            'sklearn_trees': forest_nbytes(model),
+            'compiled_forest': forest_nbytes(CompiledForest.from_sklearn(model)),
+            'compact_forest': forest_nbytes(compact),
+            'compact_artifact': artifact_bytes
+        }
+    }
+    for name, size in report['bytes'].items():
+        print(f"   {name:18s} {size / 1e6:10.2f} MB")
+    if not args.no_rss:
+        report['serving_rss_mb'] = {
+            'pickle_sklearn': serving_rss_mb('pickle', model_path, 'sklearn'),
+            'compact_mmap': serving_rss_mb('mmap', output, 'compact')
+        }
+        for name, rss in report['serving_rss_mb'].items():
+            print(f"   RSS {name:14s} {rss:10.1f} MB")
+    with open(output / 'memory_report.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"   Raport zapisany do: {output / 'memory_report.json'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Kompilator tablicy odpowiedzi CPVClassifier
+Model: CPVClassifier (Random Forest Classifier)
+Projekt: BidInsight - Automatyczna kategoryzacja ofert przetargowych
+
+Uruchamiany po run_training.py. Dla każdej kombinacji
+CAE_NAME x NUTS x TYPE_OF_CONTRACT zapisuje progi podziału lasu na
+VALUE_EURO oraz gotowe top N dla każdego przedziału wartości.
+Serwowanie: PREDICTION_BACKEND=table.
+"""
+
+import sys
+import time
+import pickle
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from app.services.forest_engine import CompiledForest
+from app.services.answer_table import AnswerTable
+from app.services.predictor import CPVPredictor
+from app.models.model_loader import model_version
+
+# Konfiguracja
+RANDOM_STATE = 42
+MODEL_PATH = BASE_DIR / 'models' / 'model.pkl'
+TABLE_PATH = BASE_DIR / 'models' / 'answer_table.pkl'
+TOP_K = 5
+N_CHECK = 2000
+
+def verify(table, predictor, model_data, n_check=N_CHECK):
+    """
+    Porównuje odpowiedzi tablicy z lasem na losowych ofertach.
+
+    Returns:
+    --------
+    int
+        Liczba ofert, dla których wynik się różni
+    """
+    rng = np.random.default_rng(RANDOM_STATE)
+    mismatches = 0
+    for _ in range(n_check):
+        offer = {
+            'VALUE_EURO': float(rng.lognormal(10, 1.5)),
+            'CAE_NAME': rng.choice(model_data['cae_names']),
+            'NUTS': rng.choice(model_data['nuts_codes']),
+            'TYPE_OF_CONTRACT': rng.choice(model_data['contract_types'])
+        }
+        expected = predictor.predict(offer, top_n=table.top_k)
+        top_indices, top_probs = table.lookup(
+            offer['CAE_NAME'], offer['NUTS'], offer['TYPE_OF_CONTRACT'],
+            predictor.scale_value(offer['VALUE_EURO'])
+        )
+        got = [int(predictor.classes[i]) for i in top_indices]
+        if got != [p['cpv'] for p in expected['top5']] or \
+                not np.allclose(top_probs, [p['probability'] for p in expected['top5']]):
+            mismatches += 1
+    return mismatches
+
+def main():
+    """Kompiluje tablicę odpowiedzi dla zapisanego modelu."""
+    print("=" * 60)
+    print("KOMPILACJA TABLICY ODPOWIEDZI - PROJEKT BIDINSIGHT")
+    print("=" * 60)
+
+    # 1. Wczytanie modelu
+    print("\n1. Wczytanie modelu...")
+    with open(MODEL_PATH, 'rb') as f:
+        raw = f.read()
+    model_data = pickle.loads(raw)
+    version = model_version(raw)
+    print(f"   Wersja modelu: {version}")
+
+    # 2. Kompilacja lasu
+    print("\n2. Kompilacja lasu do tablic NumPy...")
+    engine = CompiledForest.from_sklearn(model_data['model'])
+    print(f"   Drzew: {engine.n_trees}, wezlow: {len(engine.feature)}")
+
+    # 3. Budowa tablicy
+    n_combinations = (len(model_data['cae_names']) * len(model_data['nuts_codes']) *
+                      len(model_data['contract_types']))
+    print(f"\n3. Budowa tablicy dla {n_combinations} kombinacji kategorii...")
+    start = time.perf_counter()
+    table = AnswerTable.build(
+        engine,
+        model_data['cae_names'],
+        model_data['nuts_codes'],
+        model_data['contract_types'],
+        top_k=TOP_K,
+        model_version=version
+    )
+    n_intervals = sum(len(entry[1]) for entry in table.table.values())
+    print(f"   Przedzialow lacznie: {n_intervals} "
+          f"(srednio {n_intervals / max(len(table), 1):.1f} na kombinacje)")
+    print(f"   Czas: {time.perf_counter() - start:.1f} s")
+
+    # 4. Weryfikacja z lasem
+    print(f"\n4. Weryfikacja na {N_CHECK} losowych ofertach...")
+    predictor = CPVPredictor(dict(model_data, engine=engine), backend='compiled')
+    mismatches = verify(table, predictor, model_data)
+    if mismatches:
+        print(f"   BLAD: {mismatches} niezgodnych odpowiedzi - tablica nie zostala zapisana")
+        sys.exit(1)
+    print("   Wszystkie odpowiedzi zgodne z lasem")
+
+    # 5. Zapis
+    print("\n5. Zapis tablicy...")
+    table.save(TABLE_PATH)
+    print(f"   Tablica zapisana do: {TABLE_PATH}")
+    print(f"   Rozmiar: {TABLE_PATH.stat().st_size / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Wybór modelu w budżecie serwowania
+Model: CPVClassifier (Random Forest Classifier)
+Projekt: BidInsight - Automatyczna kategoryzacja ofert przetargowych
+
+Każdy kandydat (n_estimators, max_depth, min_samples_leaf) jest trenowany
+na części zbioru treningowego, oceniany na zbiorze walidacyjnym i mierzony
+na bieżącym sprzęcie tak, jak będzie serwowany (CPVPredictor, n_jobs=1):
+p99 czasu predykcji pojedynczej oferty, przepustowość predict_batch
+i rozmiar tablic lasu. Wybierany jest najdokładniejszy kandydat
+mieszczący się w budżecie; pełna krzywa jest zapisywana obok metrics.txt.
+"""
+
+import csv
+import itertools
+import json
+import os
+import platform
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+
+from app.services.forest_engine import forest_nbytes
+from app.services.model_reload import warmup_offers
+from app.services.predictor import CPVPredictor
+
+# Konfiguracja
+RANDOM_STATE = 42
+VALIDATION_SIZE = 0.2
+
+# Siatka kandydatów (od najtańszych do parametrów domyślnych run_training.py)
+DEFAULT_GRID = {
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [12, 20, None],
+    'min_samples_leaf': [1, 3]
+}
+
+# Pomiar kosztu serwowania
+N_SINGLE = 300
+BATCH_SIZE = 1000
+MIN_BATCH_TIME = 0.5
+
+class ServingBudget:
+    """Budżet serwowania; None = brak ograniczenia."""
+
+    def __init__(self, p99_ms=None, min_throughput=None, max_model_mb=None):
+        """
+        Parameters:
+        -----------
+        p99_ms : float
+            Maksymalny p99 czasu predykcji pojedynczej oferty [ms]
+        min_throughput : float
+            Minimalna przepustowość predict_batch [ofert/s]
+        max_model_mb : float
+            Maksymalny rozmiar tablic lasu [MB]
+        """
+        self.p99_ms = p99_ms
+        self.min_throughput = min_throughput
+        self.max_model_mb = max_model_mb
+
+    def violations(self, cost):
+        """Lista przekroczonych limitów dla zmierzonego kosztu kandydata."""
+        violated = []
+        if self.p99_ms is not None and cost['p99_ms'] > self.p99_ms:
+            violated.append('p99_ms')
+        if self.min_throughput is not None and cost['throughput'] < self.min_throughput:
+            violated.append('throughput')
+        if self.max_model_mb is not None and cost['model_mb'] > self.max_model_mb:
+            violated.append('model_mb')
+        return violated
+
+    def to_dict(self):
+        return {
+            'p99_ms': self.p99_ms,
+            'min_throughput': self.min_throughput,
+            'max_model_mb': self.max_model_mb
+        }
+
+def candidate_params(grid=None):
+    """Wszystkie kombinacje parametrów z siatki."""
+    grid = grid or DEFAULT_GRID
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+
+def measure_serving_cost(model_data, backend='sklearn', n_single=N_SINGLE, batch_size=BATCH_SIZE):
+    """
+    Koszt serwowania modelu na bieżącym sprzęcie.
+
+    Parameters:
+    -----------
+    model_data : dict
+        Dane modelu jak w models/model.pkl
+    backend : str
+        Silnik inferencji CPVPredictor
+    n_single : int
+        Liczba pomiarów predykcji pojedynczej oferty
+    batch_size : int
+        Rozmiar partii przy pomiarze przepustowości
+
+    Returns:
+    --------
+    dict
+        p50_ms, p99_ms (pojedyncza oferta), throughput (ofert/s w partii),
+        model_mb (tablice lasu silnika)
+    """
+    predictor = CPVPredictor(model_data, backend=backend)
+    # Jak w workerze: równoległość daje serwer, nie las
+    if hasattr(predictor.model, 'n_jobs'):
+        predictor.model.n_jobs = 1
+
+    offers = warmup_offers(predictor, n=max(n_single, batch_size), seed=1)
+    predictor.predict_batch(offers[:64])
+
+    latencies = []
+    for offer in offers[:n_single]:
+        start = time.perf_counter()
+        predictor.predict(offer)
+        latencies.append(time.perf_counter() - start)
+
+    batch = offers[:batch_size]
+    rows = 0
+    start = time.perf_counter()
+    while True:
+        predictor.predict_batch(batch)
+        rows += len(batch)
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_BATCH_TIME:
+            break
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'throughput': rows / elapsed,
+        'model_mb': forest_nbytes(predictor.engine) / 1e6
+    }
+
+def select_model(X_train, y_train, model_data, budget, backend='sklearn', grid=None):
+    """
+    Wybiera najdokładniejszego kandydata mieszczącego się w budżecie.
+
+    Parameters:
+    -----------
+    X_train, y_train : np.array
+        Zbiór treningowy (zakodowany target); VALIDATION_SIZE z niego
+        służy do oceny kandydatów
+    model_data : dict
+        Pozostałe dane modelu (label_encoder, scaler, słowniki kategorii)
+    budget : ServingBudget
+        Budżet serwowania
+    backend : str
+        Silnik inferencji, na którym model będzie serwowany
+    grid : dict
+        Siatka parametrów (None = DEFAULT_GRID)
+
+    Returns:
+    --------
+    tuple
+        (parametry wybranego kandydata lub None, krzywa - lista wyników)
+    """
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=VALIDATION_SIZE, random_state=RANDOM_STATE, stratify=y_train
+    )
+    curve = []
+    for params in candidate_params(grid):
+        start = time.perf_counter()
+        model = RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=-1, **params)
+        model.fit(X_fit, y_fit)
+        fit_s = time.perf_counter() - start
+
+        y_pred = model.predict(X_val)
+        cost = measure_serving_cost(dict(model_data, model=model), backend=backend)
+        violated = budget.violations(cost)
+        curve.append(dict(
+            params,
+            accuracy=accuracy_score(y_val, y_pred),
+            f1_macro=f1_score(y_val, y_pred, average='macro'),
+            fit_s=fit_s,
+            fits_budget=not violated,
+            violated=violated,
+            **cost
+        ))
+        point = curve[-1]
+        print(f"   {params}  acc={point['accuracy']:.4f}  p99={point['p99_ms']:.2f} ms  "
+              f"{point['throughput']:.0f} ofert/s  {point['model_mb']:.1f} MB"
+              f"{'' if not violated else '  poza budzetem: ' + ', '.join(violated)}")
+
+    fitting = [point for point in curve if point['fits_budget']]
+    if not fitting:
+        return None, curve
+    # Najdokładniejszy; przy remisie - najniższy p99
+    best = max(fitting, key=lambda point: (point['accuracy'], -point['p99_ms']))
+    best['chosen'] = True
+    return {key: best[key] for key in (grid or DEFAULT_GRID)}, curve
+
+def save_curve(curve, budget, backend, chosen, out_dir):
+    """
+    Zapisuje krzywą kompromisu obok metrics.txt.
+
+    Returns:
+    --------
+    tuple
+        Ścieżki (model_selection.json, model_selection.csv)
+    """
+    json_path = out_dir / 'model_selection.json'
+    csv_path = out_dir / 'model_selection.csv'
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'budget': budget.to_dict(),
+            'backend': backend,
+            'chosen': chosen,
+            'hardware': {
+                'cpu_count': os.cpu_count(),
+                'machine': platform.machine(),
+                'processor': platform.processor(),
+                'python': platform.python_version()
+            },
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'candidates': curve
+        }, f, indent=2)
+    columns = ['n_estimators', 'max_depth', 'min_samples_leaf', 'accuracy', 'f1_macro', 'p50_ms',
+               'p99_ms', 'throughput', 'model_mb', 'fit_s', 'fits_budget', 'chosen']
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        for point in curve:
+            writer.writerow(dict(point, chosen=point.get('chosen', False)))
+    return json_path, csv_path
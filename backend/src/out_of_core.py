@@ -0,0 +1,263 @@
+"""
+Trening poza pamięcią (out-of-core)
+Model: CPVClassifier (Random Forest Classifier)
+Projekt: BidInsight - Automatyczna kategoryzacja ofert przetargowych
+
+Plik danych jest czytany partiami (src/columnar.py) w trzech przebiegach:
+1. tani przebieg: słowniki kategorii, parametry normalizacji VALUE_EURO
+   (StandardScaler.partial_fit), zbiór kodów CPV i liczba wierszy,
+2. trening: każda partia (bez wierszy holdoutu) dostaje własne drzewa
+   (bootstrap z partii), dołączane do jednego lasu; przy większej liczbie
+   partii niż drzew partie są łączone w grupy (las ma zawsze najwyżej
+   n_estimators drzew),
+3. ewaluacja: predykcja wierszy holdoutu partiami.
+
+Holdout jest warstwowy i wyznaczany w strumieniu (StreamingHoldout) - ten
+sam w przebiegu 2 i 3 bez trzymania go w pamięci. Drzewa partii są
+rozszerzane do wszystkich klas z przebiegu 1 (partia nie musi zawierać
+każdego kodu CPV), więc las jest zwykłym RandomForestClassifier - eksport
+do artefaktu mmap / CompiledForest działa bez zmian. Pamięć zależy od
+rozmiaru partii (i rozmiaru lasu), a nie od rozmiaru pliku.
+"""
+
+import math
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.tree._tree import Tree
+
+from app.services.feature_pipeline import CATEGORICAL_FIELDS, FeaturePipeline
+from src.columnar import DictionaryBuilder, fixed_codes, iter_chunks
+
+# Konfiguracja
+RANDOM_STATE = 42
+TEST_SIZE = 0.2
+CHUNK_ROWS = 200000
+
+class StreamingHoldout:
+    """
+    Warstwowy podział train/test w strumieniu.
+
+    W każdej klasie co 1/test_size kolejny wiersz (z losowym przesunięciem
+    fazy dla klasy) trafia do testu - udział klasy w teście wynosi
+    test_size niezależnie od podziału na partie. Ta sama kolejność wierszy
+    i random_state dają ten sam podział w każdym przebiegu.
+    """
+
+    def __init__(self, n_classes, test_size=TEST_SIZE, random_state=RANDOM_STATE):
+        self.test_size = test_size
+        self.seen = np.zeros(n_classes, dtype=np.int64)
+        self.phase = np.random.default_rng(random_state).random(n_classes) / test_size
+
+    def mask(self, y):
+        """
+        Maska wierszy testowych kolejnej partii.
+
+        Parameters:
+        -----------
+        y : np.array
+            Zakodowane klasy partii (0..n_classes-1)
+
+        Returns:
+        --------
+        np.array
+            bool, True = wiersz holdoutu
+        """
+        order = np.argsort(y, kind='stable')
+        sorted_y = y[order]
+        starts = np.flatnonzero(np.r_[True, sorted_y[1:] != sorted_y[:-1]])
+        lengths = np.diff(np.r_[starts, len(y)])
+        # Pozycja wiersza wśród wierszy jego klasy (od początku strumienia)
+        rank = np.empty(len(y), dtype=np.int64)
+        rank[order] = np.arange(len(y)) - np.repeat(starts, lengths)
+        position = rank + self.seen[y] + self.phase[y]
+        self.seen += np.bincount(y, minlength=len(self.seen))
+        return np.floor((position + 1) * self.test_size) > np.floor(position * self.test_size)
+
+def scan(path, chunk_rows=CHUNK_ROWS):
+    """
+    Pierwszy przebieg: słowniki, normalizacja i klasy bez zatrzymywania wierszy.
+
+    Returns:
+    --------
+    tuple
+        (liczba wierszy, FeaturePipeline, StandardScaler VALUE_EURO,
+        LabelEncoder dopasowany do kodów CPV)
+    """
+    builders = [DictionaryBuilder(keep_codes=False) for _ in CATEGORICAL_FIELDS]
+    scaler = StandardScaler()
+    classes = np.empty(0, dtype=np.int64)
+    n_rows = 0
+    for values, cpv, categorical in iter_chunks(path, chunk_rows):
+        n_rows += len(values)
+        scaler.partial_fit(values.reshape(-1, 1))
+        classes = np.union1d(classes, cpv)
+        for builder, (codes, uniques) in zip(builders, categorical):
+            builder.add(codes, uniques)
+    vocabularies = [builder.finish()[1] for builder in builders]
+    pipeline = FeaturePipeline(*vocabularies, scaler.mean_[0], scaler.scale_[0])
+    return n_rows, pipeline, scaler, LabelEncoder().fit(classes)
+
+def iter_encoded(path, pipeline, label_encoder, chunk_rows=CHUNK_ROWS):
+    """Partie zakodowane ustalonymi słownikami: (values, kody, y zakodowane)."""
+    for values, cpv, categorical in iter_chunks(path, chunk_rows):
+        yield values, fixed_codes(categorical, pipeline.maps), label_encoder.transform(cpv)
+
+def select_rows(values, codes, y, rows):
+    return values[rows], [idx[rows] for idx in codes], y[rows]
+
+def widen_tree(tree, classes, n_classes):
+    """
+    Drzewo partii przepisane na wszystkie klasy (brakujące - zerowe).
+
+    Parameters:
+    -----------
+    tree : DecisionTreeClassifier
+        Drzewo lasu wytrenowanego na partii
+    classes : np.array
+        Zakodowane klasy obecne w partii (forest.classes_)
+    n_classes : int
+        Liczba wszystkich klas
+    """
+    if len(classes) == n_classes:
+        return tree
+    state = tree.tree_.__getstate__()
+    values = np.zeros((state['node_count'], 1, n_classes), dtype=state['values'].dtype)
+    values[:, :, classes] = state['values']
+    state['values'] = values
+    widened = Tree(tree.n_features_in_, np.array([n_classes], dtype=np.intp), 1)
+    widened.__setstate__(state)
+    tree.tree_ = widened
+    tree.classes_ = np.arange(n_classes)
+    tree.n_classes_ = n_classes
+    return tree
+
+def merge_trees(trees, n_classes, n_features, params):
+    """Las RandomForestClassifier z drzew wytrenowanych na partiach."""
+    forest = RandomForestClassifier(n_estimators=len(trees), random_state=RANDOM_STATE,
+                                    n_jobs=-1, **params)
+    forest.estimators_ = trees
+    forest.estimator_ = trees[0].__class__(**trees[0].get_params())
+    forest.classes_ = np.arange(n_classes)
+    forest.n_classes_ = n_classes
+    forest.n_outputs_ = 1
+    forest.n_features_in_ = n_features
+    return forest
+
+def concat_rows(parts):
+    """Scala wybrane wiersze kilku partii: (values, kody, y)."""
+    values, codes, y = zip(*parts)
+    return np.concatenate(values), [np.concatenate(c) for c in zip(*codes)], np.concatenate(y)
+
+def train(path, pipeline, label_encoder, n_rows, params, n_estimators=100, chunk_rows=CHUNK_ROWS,
+          sparse=False, test_size=TEST_SIZE):
+    """
+    Drugi przebieg: drzewa trenowane partiami na wierszach spoza holdoutu.
+
+    Las ma najwyżej n_estimators drzew niezależnie od rozmiaru pliku. Gdy
+    partii jest więcej niż drzew, kolejne partie są łączone w grupy
+    (najwyżej n_estimators grup) - z każdej partii grupy trafia losowe
+    1/rozmiar grupy wierszy, więc grupa ma około chunk_rows wierszy i
+    pamięć treningu się nie zmienia, a każda partia wnosi dane do lasu.
+
+    Parameters:
+    -----------
+    path : str or Path
+        Plik danych (CSV, Parquet, Arrow)
+    pipeline : FeaturePipeline
+        Kodowanie cech z przebiegu 1
+    label_encoder : LabelEncoder
+        Kodowanie klas z przebiegu 1
+    n_rows : int
+        Liczba wierszy pliku (z przebiegu 1) - wyznacza podział drzew na partie
+    params : dict
+        Parametry drzew (max_depth, min_samples_leaf, ...)
+    n_estimators : int
+        Liczba drzew lasu (rozdzielana po równo między grupy partii)
+    chunk_rows : int
+        Liczba wierszy partii - ogranicza pamięć treningu
+    sparse : bool
+        Macierz cech partii CSR zamiast gęstej
+    test_size : float
+        Udział holdoutu
+
+    Returns:
+    --------
+    tuple
+        (RandomForestClassifier, liczba partii, liczba wierszy treningowych)
+
+    Raises:
+    -------
+    ValueError
+        Gdy poza holdoutem nie ma żadnego wiersza
+    """
+    n_classes = len(label_encoder.classes_)
+    n_chunks = max(1, math.ceil(n_rows / chunk_rows))
+    group_size = math.ceil(n_chunks / n_estimators)
+    n_groups = math.ceil(n_chunks / group_size)
+    if group_size > 1:
+        print(f"   Uwaga: {n_chunks} partii > {n_estimators} drzew - partie laczone w grupy "
+              f"po {group_size} (z kazdej partii losowo 1/{group_size} wierszy)", flush=True)
+    holdout = StreamingHoldout(n_classes, test_size)
+    rng = np.random.default_rng(RANDOM_STATE)
+    trees = []
+    train_rows = 0
+    pending = []
+
+    def fit_group(group):
+        n_trees = min(n_estimators // n_groups + (group < n_estimators % n_groups),
+                      n_estimators - len(trees))
+        if not pending or n_trees < 1:
+            return []
+        values, codes, y = concat_rows(pending)
+        pending.clear()
+        X = pipeline.transform_codes(values, codes, sparse=sparse)
+        group_forest = RandomForestClassifier(n_estimators=n_trees,
+                                              random_state=RANDOM_STATE + group, n_jobs=-1, **params)
+        group_forest.fit(X, y)
+        return [widen_tree(tree, group_forest.classes_, n_classes)
+                for tree in group_forest.estimators_]
+
+    for i, (values, codes, y) in enumerate(iter_encoded(path, pipeline, label_encoder, chunk_rows)):
+        selected = ~holdout.mask(y)
+        if group_size > 1:
+            selected &= rng.random(len(y)) * group_size < 1
+        rows = np.flatnonzero(selected)
+        if len(rows):
+            pending.append(select_rows(values, codes, y, rows))
+            train_rows += len(rows)
+        if (i + 1) % group_size == 0:
+            trees += fit_group(i // group_size)
+        print(f"   Partia {i + 1}/{n_chunks}: {len(rows)} wierszy, drzew lacznie {len(trees)}",
+              flush=True)
+    if pending:
+        trees += fit_group(i // group_size)
+    if not trees:
+        raise ValueError("Trening out-of-core: brak wierszy treningowych "
+                         "(plik pusty albo wszystkie wiersze trafiły do holdoutu)")
+    return merge_trees(trees, n_classes, pipeline.num_features, params), n_chunks, train_rows
+
+def predict_holdout(path, model, pipeline, label_encoder, chunk_rows=CHUNK_ROWS, sparse=False,
+                    test_size=TEST_SIZE):
+    """
+    Trzeci przebieg: predykcja wierszy holdoutu (ten sam podział co w train).
+
+    Returns:
+    --------
+    tuple
+        (y_test, y_pred) - zakodowane klasy holdoutu i predykcje
+    """
+    holdout = StreamingHoldout(len(label_encoder.classes_), test_size)
+    y_test, y_pred = [], []
+    for values, codes, y in iter_encoded(path, pipeline, label_encoder, chunk_rows):
+        rows = np.flatnonzero(holdout.mask(y))
+        if len(rows) == 0:
+            continue
+        values, codes, y = select_rows(values, codes, y, rows)
+        y_test.append(y.astype(np.int32))
+        y_pred.append(model.predict(pipeline.transform_codes(values, codes, sparse=sparse))
+                      .astype(np.int32))
+    if not y_test:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+    return np.concatenate(y_test), np.concatenate(y_pred)
@@ -1,10 +1,18 @@
 """
 CPVClassifier Data Preprocessing Module
 Projekt: BidInsight - Automatyczna kategoryzacja ofert przetargowych
+
+Macierz cech jest rzadka (CSR, float32) od początku do końca: one-hot ze
+słownikami zapamiętanymi przy dopasowaniu, TF-IDF bez .toarray() i łączenie
+przez scipy.sparse.hstack. Po create_features(fit=True) preprocessor można
+zapisać (save) i w serwowaniu tylko transformować (transform).
 """
 
+import pickle
+
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 from sklearn.preprocessing import StandardScaler, MinMaxScaler, RobustScaler, LabelEncoder
 from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
 from sklearn.model_selection import train_test_split
@@ -21,6 +29,11 @@ class DataPreprocessor:
         self.tfidf_vectorizer = None
         self.feature_names = None
         
+        # Stan dopasowania create_features (używany przez transform)
+        self.value_col = None
+        self.categorical_vocabularies = None
+        self.text_vectorizers = {}
+        
     def fit_transform_numeric(self, X, method='standard'):
         """
         Standaryzuje/normalizuje cechy numeryczne.
@@ -123,25 +136,27 @@ class DataPreprocessor:
             
         Returns:
         --------
-        np.array
-            Macierz cech tekstowych
+        scipy.sparse.csr_matrix
+            Rzadka macierz cech tekstowych (float32)
         """
         if method == 'tfidf':
             self.tfidf_vectorizer = TfidfVectorizer(
                 max_features=max_features,
                 stop_words='english',
-                ngram_range=(1, 2)
+                ngram_range=(1, 2),
+                dtype=np.float32
             )
         elif method == 'count':
             self.tfidf_vectorizer = CountVectorizer(
                 max_features=max_features,
                 stop_words='english',
-                ngram_range=(1, 2)
+                ngram_range=(1, 2),
+                dtype=np.float32
             )
         else:
             raise ValueError(f"Nieznana metoda: {method}")
         
-        return self.tfidf_vectorizer.fit_transform(texts).toarray()
+        return self.tfidf_vectorizer.fit_transform(texts).tocsr()
     
     def transform_text(self, texts):
         """
@@ -154,34 +169,78 @@ class DataPreprocessor:
             
         Returns:
         --------
-        np.array
-            Macierz cech tekstowych
+        scipy.sparse.csr_matrix
+            Rzadka macierz cech tekstowych (float32)
         """
         if self.tfidf_vectorizer is None:
             raise ValueError("Najpierw wywołaj fit_transform_text()")
         
-        return self.tfidf_vectorizer.transform(texts).toarray()
+        return self.tfidf_vectorizer.transform(texts).tocsr()
     
-    def one_hot_encode(self, df, columns):
+    def one_hot_encode(self, df, columns=None, fit=True):
         """
-        Wykonuje one-hot encoding dla wybranych kolumn.
+        Wykonuje one-hot encoding dla wybranych kolumn (macierz rzadka).
+        
+        Słowniki kategorii (posortowane wartości z danych dopasowania, przy
+        typach mieszanych - w kolejności wystąpienia) są
+        zapamiętywane w categorical_vocabularies. Kategoria spoza słownika
+        i brak wartości dają wiersz zer w bloku kolumny (jak pd.get_dummies).
         
         Parameters:
         -----------
         df : pd.DataFrame
             DataFrame z danymi
         columns : list
-            Lista kolumn do zakodowania
+            Lista kolumn do zakodowania (przy fit=False - kolumny dopasowania)
+        fit : bool
+            Czy dopasować słowniki (True) czy tylko transformować (False)
             
         Returns:
         --------
-        pd.DataFrame
-            DataFrame z zakodowanymi kolumnami
+        scipy.sparse.csr_matrix
+            Macierz (len(df), suma rozmiarów słowników) float32
         """
-        return pd.get_dummies(df, columns=columns, prefix=columns)
+        if fit or self.categorical_vocabularies is None:
+            if columns is None:
+                raise ValueError("Podaj kolumny do dopasowania one-hot encodingu")
+            self.categorical_vocabularies = {
+                col: self._vocabulary(df[col]) for col in columns
+            }
+        
+        rows, cols = [], []
+        offset = 0
+        for col, vocabulary in self.categorical_vocabularies.items():
+            # -1 = kategoria spoza słownika lub brak wartości
+            codes = pd.Index(vocabulary, dtype=object).get_indexer(df[col].astype(object))
+            known = np.flatnonzero(codes >= 0)
+            rows.append(known)
+            cols.append(codes[known].astype(np.int64) + offset)
+            offset += len(vocabulary)
+        
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.int64)
+        return sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                             shape=(len(df), offset))
+    
+    @staticmethod
+    def _vocabulary(values):
+        """Słownik kolumny: posortowane wartości, dla typów mieszanych - kolejność wystąpienia."""
+        uniques = values.dropna().unique().tolist()
+        try:
+            return sorted(uniques)
+        except TypeError:
+            # Np. kody NUTS liczbowe i tekstowe w jednej kolumnie (jak pd.get_dummies)
+            return uniques
+    
+    def one_hot_feature_names(self):
+        """Nazwy kolumn one-hot (jak prefiksy pd.get_dummies)."""
+        if self.categorical_vocabularies is None:
+            return []
+        return [f"{col}_{value}" for col, vocabulary in self.categorical_vocabularies.items()
+                for value in vocabulary]
     
     def create_features(self, df, cpv_col='CPV', value_col=None, 
-                       categorical_cols=None, text_cols=None):
+                       categorical_cols=None, text_cols=None, fit=True):
         """
         Tworzy macierz cech z różnych typów danych.
         
@@ -197,45 +256,106 @@ class DataPreprocessor:
             Lista kolumn kategorycznych
         text_cols : list
             Lista kolumn tekstowych
+        fit : bool
+            Czy dopasować skaler, słowniki i vectorizery (True) czy tylko
+            transformować (False - kolumny i parametry z dopasowania)
             
         Returns:
         --------
         tuple
-            (X, y, feature_names) - cechy, target, nazwy cech
+            (X, y, feature_names) - cechy (scipy.sparse.csr_matrix float32),
+            target (None, gdy brak kolumny cpv_col), nazwy cech
         """
+        if not fit:
+            y = df[cpv_col].values if cpv_col in df.columns else None
+            return self.transform(df), y, self.feature_names
+        
         features_list = []
         feature_names = []
+        self.value_col = None
+        self.categorical_vocabularies = None
+        self.text_vectorizers = {}
         
         # Cechy numeryczne
         if value_col and value_col in df.columns:
             values = df[value_col].fillna(0).values.reshape(-1, 1)
             values_scaled = self.fit_transform_numeric(values, method='robust')
-            features_list.append(values_scaled)
+            features_list.append(sp.csr_matrix(values_scaled, dtype=np.float32))
             feature_names.append(value_col)
+            self.value_col = value_col
         
-        # Cechy kategoryczne (one-hot encoding)
+        # Cechy kategoryczne (one-hot encoding, słowniki zapamiętane)
         if categorical_cols:
-            df_encoded = self.one_hot_encode(df[categorical_cols], categorical_cols)
-            features_list.append(df_encoded.values)
-            feature_names.extend(df_encoded.columns.tolist())
+            features_list.append(self.one_hot_encode(df, categorical_cols, fit=True))
+            feature_names.extend(self.one_hot_feature_names())
         
-        # Cechy tekstowe (TF-IDF)
+        # Cechy tekstowe (TF-IDF, osobny vectorizer dla każdej kolumny)
         if text_cols:
             for text_col in text_cols:
                 if text_col in df.columns:
                     texts = df[text_col].fillna('').astype(str)
                     text_features = self.fit_transform_text(texts, method='tfidf')
+                    self.text_vectorizers[text_col] = self.tfidf_vectorizer
                     features_list.append(text_features)
                     feature_names.extend([f"{text_col}_{i}" for i in range(text_features.shape[1])])
         
         # Połączenie wszystkich cech
-        X = np.hstack(features_list) if features_list else np.array([])
+        X = self._stack(features_list, len(df))
         y = df[cpv_col].values
         
         self.feature_names = feature_names
         
         return X, y, feature_names
     
+    def transform(self, df):
+        """
+        Macierz cech dla nowych danych - tylko transformacja (serwowanie).
+        
+        Używa skalera, słowników one-hot i vectorizerów z
+        create_features(fit=True); niczego nie dopasowuje.
+        
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            DataFrame z kolumnami użytymi przy dopasowaniu
+            
+        Returns:
+        --------
+        scipy.sparse.csr_matrix
+            Macierz (len(df), len(feature_names)) float32
+        """
+        if self.feature_names is None:
+            raise ValueError("Najpierw wywołaj create_features() z fit=True")
+        
+        features_list = []
+        if self.value_col is not None:
+            values = df[self.value_col].fillna(0).values.reshape(-1, 1)
+            features_list.append(sp.csr_matrix(self.transform_numeric(values), dtype=np.float32))
+        if self.categorical_vocabularies:
+            features_list.append(self.one_hot_encode(df, fit=False))
+        for text_col, vectorizer in self.text_vectorizers.items():
+            texts = df[text_col].fillna('').astype(str)
+            features_list.append(vectorizer.transform(texts).tocsr())
+        
+        return self._stack(features_list, len(df))
+    
+    def _stack(self, features_list, n_rows):
+        """Łączy bloki cech w jedną macierz CSR float32 (bez zagęszczania)."""
+        if not features_list:
+            return sp.csr_matrix((n_rows, 0), dtype=np.float32)
+        return sp.hstack(features_list, format='csr', dtype=np.float32)
+    
+    def save(self, path):
+        """Zapisuje dopasowany preprocessor (skaler, słowniki, vectorizery)."""
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+    
+    @classmethod
+    def load(cls, path):
+        """Wczytuje preprocessor zapisany przez save()."""
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    
     def train_test_split_stratified(self, X, y, test_size=0.2, random_state=42):
         """
         Dzieli dane na zbiór treningowy i testowy z zachowaniem rozkładu klas.
@@ -280,6 +400,10 @@ def example_usage():
     #     text_cols=['TITLE']  # jeśli dostępne
     # )
     
+    # Zapis i transformacja nowych danych (serwowanie)
+    # preprocessor.save('models/preprocessor.pkl')
+    # X_new = DataPreprocessor.load('models/preprocessor.pkl').transform(df_new)
+    
     # Kodowanie targetu
     # y_encoded = preprocessor.encode_categorical(y, fit=True)
     
@@ -5,14 +5,14 @@ Projekt: BidInsight - Automatyczna kategoryzacja ofert przetargowych
 """
 
 import sys
+import argparse
 from pathlib import Path
-import csv
 import pickle
-from collections import Counter
 
 # Sprawdzenie zależności sklearn
 try:
     import numpy as np
+    from scipy.sparse import issparse
     from sklearn.ensemble import RandomForestClassifier
     from sklearn.preprocessing import LabelEncoder, StandardScaler
     from sklearn.model_selection import train_test_split
@@ -31,86 +31,198 @@ RANDOM_STATE = 42
 DATA_PATH = Path(__file__).parent.parent / 'data' / 'ted_sample.csv'
 BASE_DIR = Path(__file__).parent.parent
 MODEL_PATH = BASE_DIR / 'models' / 'model.pkl'
+ARTIFACT_PATH = BASE_DIR / 'models' / 'model_mmap'
+
+sys.path.insert(0, str(BASE_DIR))
+from app.models.artifact import export_artifact
+from app.models.model_loader import model_file_version
+from app.services.feature_pipeline import FeaturePipeline
+from src.columnar import load_columns
+from src import out_of_core
+from src.model_selection import ServingBudget, select_model, save_curve
 TEST_SIZE = 0.2
 
+# Powyżej tego rozmiaru gęstej macierzy cech (float32) cechy są budowane jako CSR
+DENSE_MAX_MB = 1024
+
+# Parametry lasu bez budżetu serwowania
+DEFAULT_PARAMS = {'n_estimators': 100, 'max_depth': None, 'min_samples_leaf': 1}
+
+# Trening out-of-core: las ma ok. n_estimators * chunk_rows / min_samples_leaf liści
+# niezależnie od rozmiaru pliku - min_samples_leaf ogranicza rozmiar modelu
+OUT_OF_CORE_PARAMS = dict(DEFAULT_PARAMS, min_samples_leaf=10)
+
 def load_data(file_path):
-    """Wczytuje dane z CSV."""
-    data = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            data.append(row)
-    return data
-
-def prepare_features(data):
-    """Przygotowuje cechy z danych."""
-    # Unikalne wartości dla kodowania
-    cae_names = sorted(set(row['CAE_NAME'] for row in data))
-    nuts_codes = sorted(set(row['NUTS'] for row in data))
-    contract_types = sorted(set(row['TYPE_OF_CONTRACT'] for row in data))
-    
-    # Mapowanie do indeksów
-    cae_map = {name: i for i, name in enumerate(cae_names)}
-    nuts_map = {code: i for i, code in enumerate(nuts_codes)}
-    contract_map = {ct: i for i, ct in enumerate(contract_types)}
-    
-    X = []
-    y = []
-    
-    for row in data:
-        # Cecha numeryczna: VALUE_EURO (znormalizowana)
-        value = float(row['VALUE_EURO'])
-        
-        # Cechy kategoryczne: one-hot encoding
-        cae_idx = cae_map[row['CAE_NAME']]
-        nuts_idx = nuts_map[row['NUTS']]
-        contract_idx = contract_map[row['TYPE_OF_CONTRACT']]
-        
-        # Tworzenie wektora cech
-        features = [value]
-        
-        # One-hot encoding dla CAE_NAME
-        cae_onehot = [0] * len(cae_names)
-        cae_onehot[cae_idx] = 1
-        features.extend(cae_onehot)
-        
-        # One-hot encoding dla NUTS
-        nuts_onehot = [0] * len(nuts_codes)
-        nuts_onehot[nuts_idx] = 1
-        features.extend(nuts_onehot)
-        
-        # One-hot encoding dla TYPE_OF_CONTRACT
-        contract_onehot = [0] * len(contract_types)
-        contract_onehot[contract_idx] = 1
-        features.extend(contract_onehot)
-        
-        X.append(features)
-        y.append(int(row['CPV']))
-    
-    X = np.array(X)
-    y = np.array(y)
+    """
+    Wczytuje dane kolumnowo (CSV partiami, Parquet / Arrow przez pyarrow).
+    
+    Kategorie są kodami słownikowymi, VALUE_EURO i CPV - tablicami
+    typowanymi; wiersze nie są zamieniane na słowniki.
+    """
+    return load_columns(file_path)
+
+def prepare_features(data, sparse=None):
+    """
+    Przygotowuje cechy z danych.
+    
+    Słowniki kategorii pochodzą z wczytania (ColumnarData), normalizacja
+    VALUE_EURO jest dopasowywana tutaj, a kodowanie wykonuje
+    FeaturePipeline - ten sam, który serwuje model. Macierz jest budowana
+    partiami bez pętli po wierszach.
+    
+    Parameters:
+    -----------
+    data : ColumnarData
+        Dane z load_data
+    sparse : bool
+        True = CSR, False = gęsta float32, None = CSR, gdy gęsta macierz
+        przekroczyłaby DENSE_MAX_MB
+    """
+    cae_names, nuts_codes, contract_types = data.vocabularies
     
     # Normalizacja VALUE_EURO
-    scaler = StandardScaler()
-    X[:, 0:1] = scaler.fit_transform(X[:, 0:1])
+    scaler = StandardScaler().fit(data.values.reshape(-1, 1))
+    
+    pipeline = FeaturePipeline(cae_names, nuts_codes, contract_types,
+                               scaler.mean_[0], scaler.scale_[0])
+    if sparse is None:
+        sparse = len(data) * pipeline.num_features * 4 > DENSE_MAX_MB * 1e6
+    X = pipeline.transform_codes(data.values, data.codes, sparse=sparse)
+    y = data.cpv
     
     return X, y, scaler, cae_names, nuts_codes, contract_types
 
-def main():
-    """Główna funkcja treningu modelu."""
+def evaluate(y_test, y_pred, label_encoder):
+    """
+    Metryki na zbiorze testowym (wypisywane razem z classification report).
+    
+    Returns:
+    --------
+    dict
+        accuracy, f1/precision/recall (macro i weighted)
+    """
+    metrics = {
+        'accuracy': accuracy_score(y_test, y_pred),
+        'f1_macro': f1_score(y_test, y_pred, average='macro'),
+        'f1_weighted': f1_score(y_test, y_pred, average='weighted'),
+        'precision_macro': precision_score(y_test, y_pred, average='macro'),
+        'precision_weighted': precision_score(y_test, y_pred, average='weighted'),
+        'recall_macro': recall_score(y_test, y_pred, average='macro'),
+        'recall_weighted': recall_score(y_test, y_pred, average='weighted')
+    }
+    
+    print("\n" + "=" * 60)
+    print("EWALUACJA MODELU")
+    print("=" * 60)
+    print(format_metrics(metrics), end='')
+    
+    # Classification report
+    print("\nClassification Report:")
+    print(classification_report(y_test, y_pred, 
+                                target_names=[str(c) for c in label_encoder.classes_]))
+    return metrics
+
+def format_metrics(metrics):
+    """Metryki w formacie konsoli i metrics.txt."""
+    accuracy = metrics['accuracy']
+    return (f"\nAccuracy:           {accuracy:.4f} ({accuracy*100:.2f}%)\n"
+            f"F1-Score (macro):    {metrics['f1_macro']:.4f}\n"
+            f"F1-Score (weighted): {metrics['f1_weighted']:.4f}\n"
+            f"Precision (macro):   {metrics['precision_macro']:.4f}\n"
+            f"Precision (weighted): {metrics['precision_weighted']:.4f}\n"
+            f"Recall (macro):      {metrics['recall_macro']:.4f}\n"
+            f"Recall (weighted):   {metrics['recall_weighted']:.4f}\n")
+
+def save_model(model_data):
+    """
+    Zapisuje model.pkl (z parametrami FeaturePipeline) i artefakt mmap.
+    
+    Returns:
+    --------
+    str
+        Wersja modelu (skrót model.pkl)
+    """
+    MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
+    # Parametry kodowania cech (te same listy - pickle zapisuje je raz)
+    model_data['feature_pipeline'] = FeaturePipeline.from_model_data(model_data).to_dict()
+    
+    with open(MODEL_PATH, 'wb') as f:
+        pickle.dump(model_data, f)
+    
+    print(f"   Model zapisany do: {MODEL_PATH}")
+    
+    # Artefakt mmap (serwowanie bez sklearn: MODEL_FORMAT=mmap)
+    version = model_file_version(MODEL_PATH)
+    export_artifact(model_data, ARTIFACT_PATH, model_version=version)
+    print(f"   Artefakt mmap zapisany do: {ARTIFACT_PATH} (wersja {version})")
+    return version
+
+def write_metrics(metrics, y_test, y_pred, label_encoder, params, notes=()):
+    """
+    Zapisuje metrics.txt obok modelu.
+    
+    Parameters:
+    -----------
+    notes : list of str
+        Dodatkowe linie pod parametrami (budżet, tryb treningu)
+    
+    Returns:
+    --------
+    Path
+        Ścieżka pliku metryk
+    """
+    metrics_file = MODEL_PATH.parent / 'metrics.txt'
+    with open(metrics_file, 'w', encoding='utf-8') as f:
+        f.write("METRYKI MODELU RANDOM FOREST\n")
+        f.write("=" * 60 + "\n")
+        f.write(format_metrics(metrics))
+        f.write(f"\nParametry: {', '.join(f'{k}={v}' for k, v in params.items())}\n")
+        for note in notes:
+            f.write(note + "\n")
+        f.write("\n" + "=" * 60 + "\n")
+        f.write("CLASSIFICATION REPORT\n")
+        f.write("=" * 60 + "\n\n")
+        f.write(classification_report(y_test, y_pred,
+                                     target_names=[str(c) for c in label_encoder.classes_]))
+    
+    print(f"   Metryki zapisane do: {metrics_file}")
+    return metrics_file
+
+def main(budget=None, backend='sklearn', data_path=None, sparse=None, params=None):
+    """
+    Główna funkcja treningu modelu.
+    
+    Parameters:
+    -----------
+    budget : ServingBudget
+        Budżet serwowania (None = parametry DEFAULT_PARAMS); kandydaci
+        z src/model_selection.py są mierzeni na silniku backend
+    backend : str
+        Silnik inferencji, na którym model będzie serwowany
+    data_path : str or Path
+        Plik danych - CSV, Parquet lub Arrow (None = DATA_PATH)
+    sparse : bool
+        Macierz cech CSR / gęsta (None = wg rozmiaru, patrz prepare_features)
+    params : dict
+        Parametry lasu nadpisujące DEFAULT_PARAMS (bez budżetu serwowania)
+    """
     print("=" * 60)
     print("TRENING MODELU RANDOM FOREST - PROJEKT BIDINSIGHT")
     print("=" * 60)
     
     # 1. Wczytanie danych
     print("\n1. Wczytanie danych...")
-    data = load_data(DATA_PATH)
-    print(f"   Wczytano {len(data)} rekordow")
+    data = load_data(data_path or DATA_PATH)
+    print(f"   Wczytano {len(data)} rekordow ({data.nbytes() / 1e6:.1f} MB kolumn)")
     
     # 2. Przygotowanie cech
     print("\n2. Przygotowanie cech...")
-    X, y, scaler, cae_names, nuts_codes, contract_types = prepare_features(data)
-    print(f"   Liczba cech: {X.shape[1]}")
+    X, y, scaler, cae_names, nuts_codes, contract_types = prepare_features(data, sparse=sparse)
+    del data
+    if issparse(X):
+        print(f"   Liczba cech: {X.shape[1]} (macierz CSR, {X.nnz} niezerowych)")
+    else:
+        print(f"   Liczba cech: {X.shape[1]} (macierz gesta, {X.nbytes / 1e6:.1f} MB)")
     print(f"   Liczba kategorii CPV: {len(np.unique(y))}")
     
     # 3. Kodowanie targetu
@@ -131,17 +243,34 @@ def main():
     print(f"   Zbior testowy: {X_test.shape[0]} rekordow")
     
     # 5. Trening modelu
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    curve = None
+    if budget is not None:
+        print(f"\n5a. Wybor modelu w budzecie serwowania (backend={backend})...")
+        print(f"   Budzet: {budget.to_dict()}")
+        chosen, curve = select_model(X_train, y_train, {
+            'label_encoder': label_encoder,
+            'scaler': scaler,
+            'cae_names': cae_names,
+            'nuts_codes': nuts_codes,
+            'contract_types': contract_types
+        }, budget, backend=backend)
+        if chosen is None:
+            json_path, _ = save_curve(curve, budget, backend, None, MODEL_PATH.parent)
+            print("   BLAD: zaden kandydat nie miesci sie w budzecie - model nie zostal zapisany")
+            print(f"   Krzywa zapisana do: {json_path}")
+            sys.exit(1)
+        params = chosen
+    
     print("\n5. Trening modelu Random Forest...")
-    print("   Parametry: n_estimators=100, max_depth=None")
+    print(f"   Parametry: {', '.join(f'{k}={v}' for k, v in params.items())}")
     
     model = RandomForestClassifier(
-        n_estimators=100,
-        max_depth=None,
         min_samples_split=2,
-        min_samples_leaf=1,
         random_state=RANDOM_STATE,
         n_jobs=-1,
-        verbose=0
+        verbose=0,
+        **params
     )
     
     model.fit(X_train, y_train)
@@ -150,68 +279,29 @@ def main():
     # 6. Ewaluacja modelu
     print("\n6. Ewaluacja modelu...")
     y_pred = model.predict(X_test)
-    
-    accuracy = accuracy_score(y_test, y_pred)
-    f1_macro = f1_score(y_test, y_pred, average='macro')
-    f1_weighted = f1_score(y_test, y_pred, average='weighted')
-    precision_macro = precision_score(y_test, y_pred, average='macro')
-    precision_weighted = precision_score(y_test, y_pred, average='weighted')
-    recall_macro = recall_score(y_test, y_pred, average='macro')
-    recall_weighted = recall_score(y_test, y_pred, average='weighted')
-    
-    print("\n" + "=" * 60)
-    print("EWALUACJA MODELU")
-    print("=" * 60)
-    print(f"\nAccuracy:           {accuracy:.4f} ({accuracy*100:.2f}%)")
-    print(f"F1-Score (macro):    {f1_macro:.4f}")
-    print(f"F1-Score (weighted): {f1_weighted:.4f}")
-    print(f"Precision (macro):   {precision_macro:.4f}")
-    print(f"Precision (weighted): {precision_weighted:.4f}")
-    print(f"Recall (macro):      {recall_macro:.4f}")
-    print(f"Recall (weighted):   {recall_weighted:.4f}")
-    
-    # Classification report
-    print("\nClassification Report:")
-    print(classification_report(y_test, y_pred, 
-                                target_names=[str(c) for c in label_encoder.classes_]))
+    metrics = evaluate(y_test, y_pred, label_encoder)
     
     # 7. Zapis modelu
     print("\n7. Zapis modelu...")
-    MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
-    
-    model_data = {
+    save_model({
         'model': model,
         'label_encoder': label_encoder,
         'scaler': scaler,
         'cae_names': cae_names,
         'nuts_codes': nuts_codes,
         'contract_types': contract_types
-    }
-    
-    with open(MODEL_PATH, 'wb') as f:
-        pickle.dump(model_data, f)
-    
-    print(f"   Model zapisany do: {MODEL_PATH}")
+    })
     
     # 8. Zapis metryk
-    metrics_file = MODEL_PATH.parent / 'metrics.txt'
-    with open(metrics_file, 'w', encoding='utf-8') as f:
-        f.write("METRYKI MODELU RANDOM FOREST\n")
-        f.write("=" * 60 + "\n\n")
-        f.write(f"Accuracy:           {accuracy:.4f} ({accuracy*100:.2f}%)\n")
-        f.write(f"F1-Score (macro):    {f1_macro:.4f}\n")
-        f.write(f"F1-Score (weighted): {f1_weighted:.4f}\n")
-        f.write(f"Precision (macro):   {precision_macro:.4f}\n")
-        f.write(f"Precision (weighted): {precision_weighted:.4f}\n")
-        f.write(f"Recall (macro):      {recall_macro:.4f}\n")
-        f.write(f"Recall (weighted):   {recall_weighted:.4f}\n")
-        f.write("\n" + "=" * 60 + "\n")
-        f.write("CLASSIFICATION REPORT\n")
-        f.write("=" * 60 + "\n\n")
-        f.write(classification_report(y_test, y_pred,
-                                     target_names=[str(c) for c in label_encoder.classes_]))
+    notes = []
+    if budget is not None:
+        notes.append(f"Budzet serwowania ({backend}): {budget.to_dict()} - "
+                     f"krzywa w model_selection.json/.csv")
+    metrics_file = write_metrics(metrics, y_test, y_pred, label_encoder, params, notes)
     
-    print(f"   Metryki zapisane do: {metrics_file}")
+    if curve is not None:
+        json_path, csv_path = save_curve(curve, budget, backend, params, MODEL_PATH.parent)
+        print(f"   Krzywa kompromisu zapisana do: {json_path}, {csv_path}")
     
     # 9. Waznosc cech
     print("\n8. Analiza waznosci cech...")
@@ -233,21 +323,132 @@ def main():
     print(f"\nModel zapisany w: {MODEL_PATH}")
     print(f"Metryki zapisane w: {metrics_file}")
     
-    return {
+    return dict(
+        metrics,
+        model=model,
+        label_encoder=label_encoder,
+        classification_report=classification_report(y_test, y_pred,
+                                                     target_names=[str(c) for c in label_encoder.classes_],
+                                                     output_dict=True)
+    )
+
+def peak_rss_mb():
+    """Szczytowe RSS procesu w MB (None, gdy moduł resource niedostępny - Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss: kilobajty na Linuksie, bajty na macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def main_out_of_core(data_path=None, chunk_rows=out_of_core.CHUNK_ROWS, sparse=None, params=None):
+    """
+    Trening poza pamięcią (src/out_of_core.py) - dla plików większych niż RAM.
+    
+    Parameters:
+    -----------
+    data_path : str or Path
+        Plik danych - CSV, Parquet lub Arrow (None = DATA_PATH)
+    chunk_rows : int
+        Liczba wierszy partii; ogranicza pamięć treningu
+    sparse : bool
+        Macierz cech partii CSR / gęsta (None = wg rozmiaru partii)
+    params : dict
+        Parametry lasu nadpisujące OUT_OF_CORE_PARAMS
+    """
+    data_path = data_path or DATA_PATH
+    params = dict(OUT_OF_CORE_PARAMS, **(params or {}))
+    n_estimators = params.pop('n_estimators')
+    
+    print("=" * 60)
+    print("TRENING OUT-OF-CORE - PROJEKT BIDINSIGHT")
+    print("=" * 60)
+    
+    # 1. Pierwszy przebieg: słowniki, normalizacja, klasy
+    print(f"\n1. Pierwszy przebieg (partie po {chunk_rows} wierszy)...")
+    n_rows, pipeline, scaler, label_encoder = out_of_core.scan(data_path, chunk_rows)
+    cae_names, nuts_codes, contract_types = pipeline.vocabularies
+    print(f"   Wierszy: {n_rows}, cech: {pipeline.num_features}, "
+          f"kategorii CPV: {len(label_encoder.classes_)}")
+    if sparse is None:
+        sparse = min(chunk_rows, n_rows) * pipeline.num_features * 4 > DENSE_MAX_MB * 1e6
+    
+    # 2. Trening partiami (holdout warstwowy w strumieniu)
+    print("\n2. Trening partiami...")
+    model, n_chunks, train_rows = out_of_core.train(
+        data_path, pipeline, label_encoder, n_rows, params, n_estimators=n_estimators,
+        chunk_rows=chunk_rows, sparse=sparse, test_size=TEST_SIZE
+    )
+    print(f"   Trening zakonczony: {len(model.estimators_)} drzew, {train_rows} wierszy treningowych")
+    
+    # 3. Ewaluacja na holdoucie
+    print("\n3. Ewaluacja modelu (holdout)...")
+    y_test, y_pred = out_of_core.predict_holdout(data_path, model, pipeline, label_encoder,
+                                                 chunk_rows=chunk_rows, sparse=sparse,
+                                                 test_size=TEST_SIZE)
+    print(f"   Zbior testowy: {len(y_test)} rekordow")
+    metrics = evaluate(y_test, y_pred, label_encoder)
+    
+    # 4. Zapis modelu i metryk
+    print("\n4. Zapis modelu...")
+    save_model({
         'model': model,
         'label_encoder': label_encoder,
-        'accuracy': accuracy,
-        'f1_macro': f1_macro,
-        'f1_weighted': f1_weighted,
-        'precision_macro': precision_macro,
-        'precision_weighted': precision_weighted,
-        'recall_macro': recall_macro,
-        'recall_weighted': recall_weighted,
-        'classification_report': classification_report(y_test, y_pred,
-                                                       target_names=[str(c) for c in label_encoder.classes_],
-                                                       output_dict=True)
-    }
+        'scaler': scaler,
+        'cae_names': cae_names,
+        'nuts_codes': nuts_codes,
+        'contract_types': contract_types
+    })
+    params = dict(params, n_estimators=len(model.estimators_))
+    write_metrics(metrics, y_test, y_pred, label_encoder, params, [
+        f"Trening out-of-core: {n_chunks} partii po {chunk_rows} wierszy, "
+        f"{train_rows} wierszy treningowych"
+    ])
+    
+    peak_mb = peak_rss_mb()
+    peak = f"{peak_mb:.0f} MB" if peak_mb is not None else "niedostepne"
+    print("\n" + "=" * 60)
+    print(f"TRENING ZAKONCZONY POMYSLNIE! (szczytowe RSS {peak})")
+    print("=" * 60)
+    
+    return dict(metrics, model=model, label_encoder=label_encoder)
 
 if __name__ == "__main__":
-    results = main()
+    parser = argparse.ArgumentParser(description='Trening modelu CPVClassifier')
+    parser.add_argument('--data', default=None,
+                        help='plik danych: CSV, Parquet (.parquet) lub Arrow (.arrow/.feather)')
+    parser.add_argument('--features', default='auto', choices=['auto', 'dense', 'sparse'],
+                        help=f'macierz cech: gesta / CSR / auto (CSR powyzej {DENSE_MAX_MB} MB)')
+    parser.add_argument('--out-of-core', action='store_true',
+                        help='trening partiami - pamiec zalezy od --chunk-rows, nie od rozmiaru pliku')
+    parser.add_argument('--chunk-rows', type=int, default=out_of_core.CHUNK_ROWS,
+                        help='liczba wierszy partii w trybie --out-of-core')
+    parser.add_argument('--n-estimators', type=int, default=None, help='liczba drzew')
+    parser.add_argument('--max-depth', type=int, default=None, help='maks. glebokosc drzew')
+    parser.add_argument('--min-samples-leaf', type=int, default=None,
+                        help='min. liczba wierszy w lisciu (out-of-core: domyslnie 10)')
+    parser.add_argument('--p99-ms', type=float, default=None,
+                        help='budzet: maks. p99 predykcji pojedynczej oferty [ms]')
+    parser.add_argument('--min-throughput', type=float, default=None,
+                        help='budzet: min. przepustowosc predict_batch [ofert/s]')
+    parser.add_argument('--max-model-mb', type=float, default=None,
+                        help='budzet: maks. rozmiar tablic lasu [MB]')
+    parser.add_argument('--backend', default='sklearn', choices=['sklearn', 'compiled', 'compact'],
+                        help='silnik inferencji, na ktorym mierzony jest koszt')
+    args = parser.parse_args()
+    sparse = {'auto': None, 'dense': False, 'sparse': True}[args.features]
+    params = {key: getattr(args, key) for key in ('n_estimators', 'max_depth', 'min_samples_leaf')
+              if getattr(args, key) is not None}
+    budget = None
+    if args.p99_ms is not None or args.min_throughput is not None or args.max_model_mb is not None:
+        budget = ServingBudget(args.p99_ms, args.min_throughput, args.max_model_mb)
+    if args.out_of_core:
+        if budget is not None:
+            parser.error('--out-of-core nie obsluguje budzetu serwowania (--p99-ms itd.)')
+        results = main_out_of_core(data_path=args.data, chunk_rows=args.chunk_rows, sparse=sparse,
+                                   params=params)
+    else:
+        results = main(budget=budget, backend=args.backend, data_path=args.data, sparse=sparse,
+                       params=params)
 
@@ -0,0 +1,212 @@
+"""
+Masowa predykcja CPV dla archiwum przetargów (offline)
+Model: CPVClassifier (Random Forest Classifier)
+Projekt: BidInsight - Automatyczna kategoryzacja ofert przetargowych
+
+Plik wejściowy (CSV lub Parquet, kolumny jak w data/ted_sample.csv) jest
+czytany partiami, partie są oceniane równolegle w puli procesów (każdy
+proces wczytuje model raz - artefakt mmap dzielą przez page cache),
+a wyniki są dopisywane do pliku wyjściowego w kolejności wejścia.
+Kodowanie cech i top N - te same co CPVPredictor w API.
+
+Uruchomienie (z katalogu backend/):
+    python src/score_offline.py --input archive.csv --output predictions.csv --workers 8
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from app.models.model_loader import ModelLoader
+from app.services.predictor import CPVPredictor, REQUIRED_FIELDS
+
+# Konfiguracja
+MODEL_PATH = BASE_DIR / 'models' / 'model.pkl'
+ARTIFACT_PATH = BASE_DIR / 'models' / 'model_mmap'
+CHUNK_SIZE = 50000
+TOP_N = 5
+
+# Predyktor procesu roboczego (ustawiany przez init_worker)
+_predictor = None
+
+def default_model_path():
+    """Artefakt mmap, jeśli istnieje (szybszy start procesów), w przeciwnym razie model.pkl."""
+    return ARTIFACT_PATH if (ARTIFACT_PATH / 'manifest.json').exists() else MODEL_PATH
+
+def load_predictor(model_path, backend):
+    """Wczytuje model (katalog = artefakt mmap, plik = pickle) i tworzy predyktor."""
+    model_path = Path(model_path)
+    model_format = 'mmap' if model_path.is_dir() else 'pickle'
+    model_data = ModelLoader.read({
+        'MODEL_PATH': model_path,
+        'MODEL_FORMAT': model_format,
+        'MODEL_ARTIFACT_PATH': model_path,
+        'PREDICTION_BACKEND': backend,
+        'ANSWER_TABLE_PATH': None
+    })
+    predictor = CPVPredictor(model_data, backend=backend)
+    # Równoległość daje pula procesów
+    if hasattr(predictor.model, 'n_jobs'):
+        predictor.model.n_jobs = 1
+    return predictor
+
+def init_worker(model_path, backend):
+    """Inicjalizacja procesu roboczego - model wczytywany raz na proces."""
+    global _predictor
+    _predictor = load_predictor(model_path, backend)
+
+def score_chunk(chunk, top_n, id_column=None):
+    """
+    Ocena jednej partii w procesie roboczym.
+
+    Parameters:
+    -----------
+    chunk : pd.DataFrame
+        Partia wejścia (kolumny REQUIRED_FIELDS, opcjonalnie id_column)
+    top_n : int
+        Liczba najlepszych kodów CPV w wyniku
+
+    Returns:
+    --------
+    pd.DataFrame
+        Wiersze wyniku w kolejności wejścia
+    """
+    n = len(chunk)
+    values = pd.to_numeric(chunk['VALUE_EURO'], errors='coerce').to_numpy(dtype=float)
+    valid = np.isfinite(values) & chunk[REQUIRED_FIELDS].notna().all(axis=1).to_numpy()
+
+    out = pd.DataFrame(index=chunk.index)
+    if id_column is not None:
+        out[id_column] = chunk[id_column].to_numpy()
+    k = max(1, min(top_n, len(_predictor.classes)))
+    codes = np.zeros((n, k), dtype=np.int64)
+    probs = np.full((n, k), np.nan)
+
+    if valid.any():
+        offers = chunk.loc[valid, REQUIRED_FIELDS].assign(VALUE_EURO=values[valid]).to_dict('records')
+        codes[valid], probs[valid] = _predictor.predict_top_n(offers, top_n=k)
+
+    def cpv_column(j):
+        return pd.Series(codes[:, j], index=chunk.index, dtype='Int64').where(valid)
+
+    out['cpv'] = cpv_column(0)
+    out['confidence'] = probs[:, 0]
+    for j in range(k):
+        out[f'cpv_{j + 1}'] = cpv_column(j)
+        out[f'probability_{j + 1}'] = probs[:, j]
+    out['error'] = np.where(valid, '', 'Nieprawidłowa lub brakująca wartość')
+    return out
+
+def read_chunks(path, chunk_size, columns):
+    """Partie wejścia: CSV przez pandas, Parquet przez pyarrow (opcjonalny)."""
+    path = Path(path)
+    if path.suffix.lower() in ('.parquet', '.pq'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("BLAD: odczyt Parquet wymaga pyarrow (pip install pyarrow)")
+            sys.exit(1)
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size, dtype={
+            'CAE_NAME': str, 'NUTS': str, 'TYPE_OF_CONTRACT': str
+        })
+
+class OutputWriter:
+    """Zapis wyników partiami: CSV (dopisywanie) lub Parquet (pyarrow)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.parquet = self.path.suffix.lower() in ('.parquet', '.pq')
+        self._writer = None
+        self._first = True
+        if self.parquet:
+            import pyarrow  # noqa: F401 - błąd od razu, a nie po pierwszej partii
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def write(self, frame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Masowa predykcja CPV (offline, wiele procesow)')
+    parser.add_argument('--input', required=True, help='plik CSV lub Parquet z ofertami')
+    parser.add_argument('--output', required=True, help='plik wynikowy (.csv lub .parquet)')
+    parser.add_argument('--model', default=None,
+                        help='artefakt mmap (katalog) lub model.pkl (domyslnie: artefakt, jesli istnieje)')
+    # sklearn jest szybszy dla dużych partii; artefakt mmap (bez sklearn) używa CompiledForest
+    parser.add_argument('--backend', default='sklearn', help='silnik inferencji: sklearn | compiled')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--top-n', type=int, default=TOP_N)
+    parser.add_argument('--id-column', default=None, help='kolumna przepisywana do wyniku')
+    args = parser.parse_args()
+
+    model_path = Path(args.model) if args.model else default_model_path()
+    columns = REQUIRED_FIELDS + ([args.id_column] if args.id_column else [])
+
+    print("=" * 60)
+    print("MASOWA PREDYKCJA CPV")
+    print("=" * 60)
+    print(f"Model: {model_path} (backend={args.backend})")
+    print(f"Wejscie: {args.input}")
+    print(f"Procesy: {args.workers}, partia: {args.chunk_size} wierszy")
+
+    writer = OutputWriter(args.output)
+    start = time.perf_counter()
+    rows = 0
+    invalid = 0
+    # Ograniczona liczba partii w toku - pamięć nie rośnie z rozmiarem pliku
+    max_pending = 2 * args.workers
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(str(model_path), args.backend)) as pool:
+        pending = deque()
+
+        def drain(limit):
+            nonlocal rows, invalid
+            while len(pending) > limit:
+                result = pending.popleft().result()
+                writer.write(result)
+                rows += len(result)
+                invalid += int((result['error'] != '').sum())
+                elapsed = time.perf_counter() - start
+                print(f"  {rows:>10} wierszy  {rows / elapsed:>10.0f} wierszy/s")
+
+        for chunk in read_chunks(args.input, args.chunk_size, columns):
+            pending.append(pool.submit(score_chunk, chunk, args.top_n, args.id_column))
+            drain(max_pending)
+        drain(0)
+
+    writer.close()
+    elapsed = time.perf_counter() - start
+    print("\n" + "=" * 60)
+    print(f"Gotowe: {rows} wierszy w {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} wierszy/s)")
+    print(f"Bledne wiersze: {invalid}")
+    print(f"Wyniki zapisane do: {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Wspólne fixture testów: mały syntetyczny model i aplikacja Flask na nim.
+"""
+
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+CAE_NAMES = ['Gmina A', 'Gmina B', 'Szpital C']
+NUTS_CODES = ['PL21', 'PL41', 'PL91']
+CONTRACT_TYPES = ['SERVICES', 'SUPPLIES', 'WORKS']
+
+def valid_offer(i=0):
+    """Poprawna oferta ze słowników modelu testowego."""
+    return {
+        'VALUE_EURO': 1000.0 * (i + 1),
+        'CAE_NAME': CAE_NAMES[i % len(CAE_NAMES)],
+        'NUTS': NUTS_CODES[i % len(NUTS_CODES)],
+        'TYPE_OF_CONTRACT': CONTRACT_TYPES[i % len(CONTRACT_TYPES)]
+    }
+
+def write_model(path, seed=0, cae_names=CAE_NAMES, n_features=None):
+    """
+    Zapisuje model.pkl w formacie src/run_training.py (las na losowych cechach).
+
+    n_features różne od liczby cech ze słowników daje model niepasujący
+    do słowników (odrzucany przy przeładowaniu).
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    rng = np.random.default_rng(seed)
+    if n_features is None:
+        n_features = 1 + len(cae_names) + len(NUTS_CODES) + len(CONTRACT_TYPES)
+    X = rng.random((60, n_features))
+    cpv = rng.choice([45000000, 33000000, 79000000], size=60)
+    label_encoder = LabelEncoder().fit(cpv)
+    scaler = StandardScaler().fit(rng.lognormal(8, 1, size=(60, 1)))
+    model = RandomForestClassifier(n_estimators=5, random_state=seed)
+    model.fit(X, label_encoder.transform(cpv))
+
+    with open(path, 'wb') as f:
+        pickle.dump({
+            'model': model,
+            'label_encoder': label_encoder,
+            'scaler': scaler,
+            'cae_names': list(cae_names),
+            'nuts_codes': NUTS_CODES,
+            'contract_types': CONTRACT_TYPES
+        }, f)
+    return path
+
+@pytest.fixture(scope='session')
+def model_path(tmp_path_factory):
+    """model.pkl wspólny dla testów (tylko do odczytu)."""
+    return write_model(tmp_path_factory.mktemp('models') / 'model.pkl')
+
+@pytest.fixture
+def app(model_path):
+    """Aplikacja z modelem testowym (bez wczytywania w tle i bez cache)."""
+    from app import create_app
+    from app.api import routes
+    from app.models.model_loader import ModelLoader
+
+    application = create_app('default', preload=False)
+    application.config.update(TESTING=True, MODEL_PATH=model_path, PREDICTION_CACHE_SIZE=0,
+                              MICRO_BATCH_ENABLED=False, MODEL_WATCH_INTERVAL=0)
+    # Stan modułu routes jest globalny dla procesu - każdy test wczytuje model od nowa
+    ModelLoader._model_data = None
+    routes.predictor_handle.swap(None)
+    routes.prediction_cache = None
+    routes.micro_batcher = None
+    routes.model_reloader = None
+    routes.admission = None
+    return application
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
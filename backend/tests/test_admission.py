@@ -0,0 +1,106 @@
+"""
+Testy kontroli przyjęć - termin klienta i odrzucanie nadmiaru.
+"""
+
+import time
+
+import pytest
+
+from conftest import valid_offer
+from app.services.metrics import metrics
+
+DEADLINE_SHED = ('cpv_admission_total', (('decision', 'shed'), ('reason', 'deadline')))
+
+def shed_count(key=DEADLINE_SHED):
+    return metrics._counters.get(key, 0)
+
+@pytest.fixture
+def admission(app):
+    """Kontrola przyjęć z jednym miejscem (zajmowanym ręcznie w testach)."""
+    from app.api import routes
+
+    app.config.update(ADMISSION_MAX_IN_FLIGHT=1, ADMISSION_MAX_QUEUE=1,
+                      ADMISSION_QUEUE_TIMEOUT_MS=20, ADMISSION_RETRY_AFTER=3)
+    return routes.init_admission(app.config)
+
+@pytest.fixture
+def counting_predictor(client, monkeypatch):
+    """Liczy wywołania lasu przez predykcję wsadową i pojedynczą."""
+    from app.services.predictor import CPVPredictor
+
+    calls = []
+    original = CPVPredictor._score
+    monkeypatch.setattr(CPVPredictor, '_score',
+                        lambda self, *args, **kwargs: calls.append(1) or original(self, *args, **kwargs))
+    return calls
+
+@pytest.mark.parametrize('endpoint, body', [('/api/predict', valid_offer(0)),
+                                            ('/api/predict/batch', {'offers': [valid_offer(0)]})])
+def test_expired_deadline_without_admission_is_not_evaluated(client, counting_predictor,
+                                                             endpoint, body):
+    before = shed_count()
+
+    response = client.post(endpoint, json=body, headers={'X-Request-Timeout-Ms': '-1'})
+
+    assert response.status_code == 504
+    assert counting_predictor == []
+    assert shed_count() == before + 1
+
+def test_expired_deadline_with_admission_is_not_evaluated(client, admission, counting_predictor):
+    before = shed_count()
+
+    response = client.post('/api/predict', json=valid_offer(0),
+                           headers={'X-Request-Deadline': str(time.time() - 1)})
+
+    assert response.status_code == 504
+    assert counting_predictor == []
+    assert shed_count() == before + 1
+    assert admission.stats()['shed']['deadline'] == 1
+
+def test_deadline_passing_after_admission_is_rechecked(client, app, admission, counting_predictor,
+                                                       monkeypatch):
+    from app.api import routes
+
+    get_predictor = routes.get_predictor
+
+    def slow_get_predictor():
+        time.sleep(0.1)
+        return get_predictor()
+
+    monkeypatch.setattr(routes, 'get_predictor', slow_get_predictor)
+
+    response = client.post('/api/predict', json=valid_offer(0),
+                           headers={'X-Request-Timeout-Ms': '50'})
+
+    assert response.status_code == 504
+    assert counting_predictor == []
+    assert admission.stats()['shed']['deadline'] == 1
+    # Miejsce zwolnione mimo odrzucenia
+    assert admission.stats()['in_flight'] == 0
+
+def test_queue_full_sheds_with_retry_after(client, admission):
+    admission.in_flight = 1
+    admission.waiting = 1
+
+    response = client.post('/api/predict', json=valid_offer(0))
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3'
+    assert admission.stats()['shed']['queue_full'] == 1
+
+def test_queue_timeout_sheds_with_retry_after(client, admission):
+    admission.in_flight = 1
+
+    response = client.post('/api/predict/batch', json={'offers': [valid_offer(0)]})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3'
+    assert admission.stats()['shed']['queue_timeout'] == 1
+
+def test_admitted_request_is_evaluated(client, admission, counting_predictor):
+    response = client.post('/api/predict', json=valid_offer(0),
+                           headers={'X-Request-Timeout-Ms': '5000'})
+
+    assert response.status_code == 200
+    assert counting_predictor == [1]
+    assert admission.stats()['admitted'] == 1
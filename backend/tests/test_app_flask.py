@@ -0,0 +1,36 @@
+"""
+Testy app_flask.py - wybór silnika inferencji z PREDICTION_BACKEND.
+"""
+
+import importlib
+import sys
+
+import pytest
+
+from conftest import valid_offer
+
+def import_app_flask(monkeypatch, model_path, backend):
+    monkeypatch.setenv('MODEL_PATH', str(model_path))
+    monkeypatch.setenv('PREDICTION_BACKEND', backend)
+    monkeypatch.delitem(sys.modules, 'app_flask', raising=False)
+    return importlib.import_module('app_flask')
+
+@pytest.mark.parametrize('backend, engine', [('sklearn', 'RandomForestClassifier'),
+                                             ('compiled', 'CompiledForest'),
+                                             ('compact', 'CompactForest')])
+def test_backends_predict_the_same(monkeypatch, model_path, backend, engine):
+    reference = import_app_flask(monkeypatch, model_path, 'sklearn')
+    expected = reference.predict_cpv(valid_offer(1))
+
+    module = import_app_flask(monkeypatch, model_path, backend)
+    assert type(module.model_data['engine']).__name__ == engine
+    response = module.app.test_client().post('/api/predict', json=valid_offer(1))
+
+    assert response.status_code == 200
+    result = response.get_json()['result']
+    assert result['cpv'] == expected['cpv']
+    assert result['confidence'] == pytest.approx(expected['confidence'], abs=1e-6)
+
+def test_unknown_backend_fails_at_startup(monkeypatch, model_path):
+    with pytest.raises(ValueError, match='PREDICTION_BACKEND=fast'):
+        import_app_flask(monkeypatch, model_path, 'fast')
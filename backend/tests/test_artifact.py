@@ -0,0 +1,43 @@
+"""
+Testy artefaktu mmap - podmiana eksportu bez chwili bez kompletnego artefaktu.
+"""
+
+import json
+
+import pytest
+
+from conftest import valid_offer
+from app.models.artifact import export_artifact, load_artifact
+from app.models.model_loader import ModelLoader
+from app.services.predictor import CPVPredictor
+
+def manifest_files(path):
+    with open(path / 'manifest.json', encoding='utf-8') as f:
+        return {spec['file'] for spec in json.load(f)['arrays'].values()}
+
+def test_reexport_replaces_manifest_last_and_keeps_previous_arrays(tmp_path, model_path):
+    model_data = ModelLoader._load_pickle(model_path)
+    out = tmp_path / 'model_mmap'
+
+    export_artifact(model_data, out, model_version='v1')
+    first = manifest_files(out)
+    old = load_artifact(out)
+    export_artifact(model_data, out, model_version='v2')
+    second = manifest_files(out)
+
+    assert first.isdisjoint(second)
+    # Czytelnik starego manifestu nadal znajdzie jego tablice
+    assert {p.name for p in out.glob('*.npy')} == first | second
+    assert load_artifact(out)['model_version'] == 'v2'
+
+    export_artifact(model_data, out, model_version='v3')
+    third = manifest_files(out)
+    assert {p.name for p in out.glob('*.npy')} == second | third
+    assert not list(out.glob('*.tmp'))
+
+    # Tablice zmapowane przed podmianą pozostają czytelne
+    offer = valid_offer(0)
+    expected = CPVPredictor(model_data).predict(offer)
+    assert CPVPredictor(old).predict(offer)['cpv'] == expected['cpv']
+    assert CPVPredictor(load_artifact(out)).predict(offer)['confidence'] == \
+        pytest.approx(expected['confidence'])
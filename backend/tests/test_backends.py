@@ -0,0 +1,86 @@
+"""
+Testy silników inferencji - zgodność z sklearn predict_proba.
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from conftest import CAE_NAMES, NUTS_CODES, CONTRACT_TYPES
+from app.models.artifact import export_artifact, load_artifact
+from app.models.model_loader import ModelLoader
+from app.services.answer_table import AnswerTable
+from app.services.forest_engine import CompactForest, CompiledForest
+from app.services.predictor import BACKENDS, CPVPredictor
+
+VALUES = [0.0, 15.0, 900.0, 2980.0, 3000.0, 25000.0, 1e7]
+
+def offers():
+    """Wszystkie kombinacje kategorii (także nieznane) i wartości po obu stronach progów."""
+    combos = itertools.product(CAE_NAMES + ['Nieznany'], NUTS_CODES, CONTRACT_TYPES, VALUES)
+    return [{'VALUE_EURO': value, 'CAE_NAME': cae, 'NUTS': nuts, 'TYPE_OF_CONTRACT': contract}
+            for cae, nuts, contract, value in combos]
+
+@pytest.fixture(scope='module')
+def model_data(model_path):
+    data = ModelLoader._load_pickle(model_path)
+    data['answer_table'] = AnswerTable.build(
+        CompiledForest.from_sklearn(data['model']), data['cae_names'], data['nuts_codes'],
+        data['contract_types'], top_k=5, model_version=data['model_version']
+    )
+    return data
+
+@pytest.fixture(scope='module')
+def expected(model_data):
+    """Top 3 z sklearn predict_proba na tych samych cechach."""
+    reference = CPVPredictor(model_data, backend='sklearn')
+    X = reference.pipeline.transform(offers())
+    probabilities = model_data['model'].predict_proba(X)
+    return CPVPredictor.top_n_indices(probabilities, 3), reference.classes
+
+def assert_matches(results, expected):
+    (top_indices, top_probs), classes = expected
+    assert len(results) == len(top_indices)
+    for result, indices, probs in zip(results, top_indices, top_probs):
+        assert result['cpv'] == classes[indices[0]]
+        assert [t['probability'] for t in result['top5']] == pytest.approx(probs, abs=1e-6)
+
+def artifact_data(model_data, tmp_path, engine):
+    export_artifact(model_data, tmp_path / 'model_mmap', model_version='test', engine=engine)
+    return load_artifact(tmp_path / 'model_mmap')
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_backend_predict_batch_matches_sklearn(model_data, expected, backend):
+    predictor = CPVPredictor(model_data, backend=backend)
+
+    results = predictor.predict_batch(offers(), top_n=3)
+
+    assert all(r['success'] for r in results)
+    assert_matches([r['result'] for r in results], expected)
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_backend_predict_matches_sklearn(model_data, expected, backend):
+    predictor = CPVPredictor(model_data, backend=backend)
+
+    results = [predictor.predict(offer, top_n=3) for offer in offers()]
+
+    assert_matches(results, expected)
+
+@pytest.mark.parametrize('engine', ['compiled', 'compact'])
+def test_mmap_artifact_matches_sklearn(model_data, expected, tmp_path, engine):
+    forest = (CompactForest if engine == 'compact' else CompiledForest).from_sklearn(model_data['model'])
+    predictor = CPVPredictor(artifact_data(model_data, tmp_path, forest))
+
+    assert predictor.backend == engine
+    assert_matches([r['result'] for r in predictor.predict_batch(offers(), top_n=3)], expected)
+
+def test_answer_table_serves_known_combinations(model_data):
+    predictor = CPVPredictor(model_data, backend='table')
+    known = [offer for offer in offers() if offer['CAE_NAME'] != 'Nieznany']
+
+    assert len(model_data['answer_table']) == len(CAE_NAMES) * len(NUTS_CODES) * len(CONTRACT_TYPES)
+    assert all(predictor.answer_table.lookup(o['CAE_NAME'], o['NUTS'], o['TYPE_OF_CONTRACT'],
+                                             predictor.scale_value(o['VALUE_EURO'])) is not None
+               for o in known)
+    assert np.isfinite([predictor.predict(o)['confidence'] for o in known]).all()
@@ -0,0 +1,41 @@
+"""
+Testy FeaturePipeline - kodowanie ofert i kolumn treningowych.
+"""
+
+import numpy as np
+import pytest
+
+from app.services.feature_pipeline import FeaturePipeline
+
+def offer(cae, nuts, contract, value=1000.0):
+    return {'VALUE_EURO': value, 'CAE_NAME': cae, 'NUTS': nuts, 'TYPE_OF_CONTRACT': contract}
+
+@pytest.mark.parametrize('vocabularies', [
+    (['A', 'B'], [], ['WORKS']),      # pusty słownik w środku
+    (['A', 'B'], ['PL21'], []),       # pusty ostatni słownik
+    ([], [], []),
+])
+def test_empty_vocabulary_block_stays_empty(vocabularies):
+    pipeline = FeaturePipeline(*vocabularies, mean=0.0, scale=1.0)
+    offers = [offer('B', 'PL99', 'WORKS'), offer('Nieznany', 'PL21', 'SUPPLIES')]
+
+    X = pipeline.transform(offers)
+
+    assert X.shape == (2, pipeline.num_features)
+    # Niepusty blok: dokładnie jedna jedynka (nieznana kategoria = indeks 0)
+    for offset, size in zip(pipeline.offsets, pipeline.sizes):
+        assert X[:, offset:offset + size].sum(axis=1).tolist() == [1 if size else 0] * 2
+
+@pytest.mark.parametrize('vocabularies', [(['A', 'B'], [], ['WORKS']), (['A'], ['PL21'], [])])
+def test_transform_codes_dense_and_sparse_agree(vocabularies):
+    pipeline = FeaturePipeline(*vocabularies, mean=10.0, scale=2.0)
+    values = np.array([10.0, 14.0, 8.0])
+    codes = [np.zeros(3, dtype=np.int32) for _ in vocabularies]
+
+    dense = pipeline.transform_codes(values, codes)
+    sparse = pipeline.transform_codes(values, codes, sparse=True)
+
+    assert np.array_equal(sparse.toarray(), dense)
+    assert dense[:, 0].tolist() == [0.0, 2.0, -1.0]
+    first = [vocab[0] if vocab else 'x' for vocab in vocabularies]
+    assert np.array_equal(dense, pipeline.transform([offer(*first, value=x) for x in values]))
@@ -0,0 +1,31 @@
+"""
+Testy FastJSONProvider - parsowanie żądań jak w standardowym json.
+"""
+
+import math
+
+def test_loads_accepts_stdlib_literals(app):
+    data = app.json.loads('{"a": NaN, "b": Infinity, "c": -Infinity, "d": 123456789012345678901234}')
+
+    assert math.isnan(data['a'])
+    assert data['b'] == math.inf and data['c'] == -math.inf
+    assert data['d'] == 123456789012345678901234
+
+def test_nan_value_is_a_validation_error_not_a_parse_error(client):
+    body = '{"VALUE_EURO": NaN, "CAE_NAME": "Gmina A", "NUTS": "PL21", "TYPE_OF_CONTRACT": "WORKS"}'
+
+    response = client.post('/api/predict', data=body, content_type='application/json')
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Nieprawidłowa wartość VALUE_EURO'
+
+def test_big_integer_value_is_accepted(client):
+    body = (
+        '{"VALUE_EURO": 123456789012345678901234, "CAE_NAME": "Gmina A", '
+        '"NUTS": "PL21", "TYPE_OF_CONTRACT": "WORKS"}'
+    )
+
+    response = client.post('/api/predict', data=body, content_type='application/json')
+
+    assert response.status_code == 200
+    assert 'cpv' in response.get_json()['result']
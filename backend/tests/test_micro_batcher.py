@@ -0,0 +1,57 @@
+"""
+Testy mikro-batchera - przekroczenie czasu anuluje ofertę w kolejce.
+"""
+
+import threading
+
+import pytest
+
+from conftest import valid_offer
+from app.services.micro_batcher import MicroBatcher, BatcherTimeout
+
+class BlockingPredictor:
+    """Predyktor, który trzyma pierwszą partię do zwolnienia blokady."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.offers = []
+
+    def predict_batch(self, offers, top_n=5):
+        self.started.set()
+        self.release.wait(5)
+        self.offers += offers
+        return [{'success': True, 'result': {'cpv': 1}} for _ in offers]
+
+def test_timed_out_offer_is_cancelled_and_skipped():
+    predictor = BlockingPredictor()
+    batcher = MicroBatcher(lambda: predictor, max_wait_ms=0, max_batch=1)
+
+    first = batcher.submit(valid_offer(0))
+    assert predictor.started.wait(5)
+    # Wątek roboczy zajęty pierwszą partią - druga oferta czeka w kolejce
+    with pytest.raises(BatcherTimeout):
+        batcher.predict(valid_offer(1), timeout=0.05)
+    predictor.release.set()
+    assert first.result(timeout=5) == {'cpv': 1}
+    assert batcher.predict(valid_offer(2), timeout=5) == {'cpv': 1}
+
+    assert predictor.offers == [valid_offer(0), valid_offer(2)]
+    stats = batcher.stats()
+    assert stats['timed_out'] == 1
+    assert stats['cancelled'] == 1
+
+def test_predict_timeout_maps_to_504(client, app, monkeypatch):
+    from app.api import routes
+
+    def timing_out(offer_data, top_n=5, timeout=None):
+        raise BatcherTimeout('Przekroczono czas oczekiwania na predykcję')
+
+    batcher = MicroBatcher(routes.predictor_handle.get)
+    monkeypatch.setattr(batcher, 'predict', timing_out)
+    monkeypatch.setattr(routes, 'micro_batcher', batcher)
+
+    response = client.post('/api/predict', json=valid_offer(0))
+
+    assert response.status_code == 504
+    assert response.get_json()['error'] == 'Przekroczono czas oczekiwania na predykcję'
@@ -0,0 +1,93 @@
+"""
+Testy przeładowania modelu bez restartu (endpoint administracyjny i obserwacja pliku).
+"""
+
+import shutil
+import time
+
+import pytest
+
+from conftest import valid_offer, write_model
+
+TOKEN = 'sekret'
+
+@pytest.fixture
+def reload_app(app, model_path, tmp_path):
+    """Aplikacja na kopii modelu, którą testy mogą nadpisywać."""
+    path = tmp_path / 'model.pkl'
+    shutil.copy(model_path, path)
+    app.config.update(MODEL_PATH=path, ADMIN_TOKEN=TOKEN)
+    return app
+
+@pytest.fixture
+def reload_client(reload_app):
+    client = reload_app.test_client()
+    assert client.post('/api/predict', json=valid_offer(0)).status_code == 200
+    return client
+
+def current_predictor():
+    from app.api.routes import predictor_handle
+    return predictor_handle.get()
+
+def admin_reload(client):
+    return client.post('/api/admin/reload', query_string={'wait': 1},
+                       headers={'X-Admin-Token': TOKEN})
+
+def test_reload_requires_admin_token(reload_client):
+    assert reload_client.post('/api/admin/reload').status_code == 403
+
+def test_successful_reload_swaps_predictor(reload_app, reload_client):
+    from app.models.model_loader import ModelLoader
+
+    old = current_predictor()
+    write_model(reload_app.config['MODEL_PATH'], seed=1)
+
+    response = admin_reload(reload_client)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['swapped'] is True and body['reloads'] == 1
+    new = current_predictor()
+    assert new is not old
+    assert body['model_version'] == new.model_version != old.model_version
+    assert ModelLoader.load() is new.model_data
+    # Żądanie w toku trzyma starą instancję - nadal działa (RCU)
+    assert old.predict(valid_offer(1))['cpv'] in set(old.classes.tolist())
+    assert reload_client.post('/api/predict', json=valid_offer(1)).status_code == 200
+
+def test_corrupt_file_keeps_old_model(reload_app, reload_client):
+    old = current_predictor()
+    reload_app.config['MODEL_PATH'].write_bytes(b'to nie jest pickle')
+
+    response = admin_reload(reload_client)
+
+    assert response.status_code == 500
+    body = response.get_json()
+    assert body['swapped'] is False and body['failures'] == 1
+    assert body['last_error']
+    assert current_predictor() is old
+    assert reload_client.post('/api/predict', json=valid_offer(1)).status_code == 200
+
+def test_feature_count_mismatch_is_rejected(reload_app, reload_client):
+    old = current_predictor()
+    write_model(reload_app.config['MODEL_PATH'], seed=2, n_features=5)
+
+    response = admin_reload(reload_client)
+
+    assert response.status_code == 500
+    assert 'cech' in response.get_json()['last_error']
+    assert current_predictor() is old
+
+def test_file_watcher_reloads_changed_model(reload_app):
+    reload_app.config['MODEL_WATCH_INTERVAL'] = 0.05
+    client = reload_app.test_client()
+    assert client.post('/api/predict', json=valid_offer(0)).status_code == 200
+    old = current_predictor()
+
+    write_model(reload_app.config['MODEL_PATH'], seed=3)
+
+    deadline = time.monotonic() + 10
+    while current_predictor() is old and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert current_predictor() is not old
+    assert current_predictor().model_version != old.model_version
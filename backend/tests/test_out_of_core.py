@@ -0,0 +1,43 @@
+"""
+Testy treningu out-of-core - rozmiar lasu nie rośnie z plikiem.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import out_of_core
+
+@pytest.fixture
+def data_path(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 3000
+    path = tmp_path / 'data.csv'
+    pd.DataFrame({
+        'CPV': rng.choice([45000000, 33000000, 79000000], n),
+        'VALUE_EURO': rng.lognormal(8, 1, n),
+        'CAE_NAME': rng.choice(['Gmina A', 'Gmina B', 'Szpital C'], n),
+        'NUTS': rng.choice(['PL21', 'PL41'], n),
+        'TYPE_OF_CONTRACT': rng.choice(['SERVICES', 'WORKS'], n)
+    }).to_csv(path, index=False)
+    return path
+
+@pytest.mark.parametrize('n_estimators, chunk_rows', [(4, 200), (7, 200), (20, 1000)])
+def test_forest_has_at_most_n_estimators_trees(data_path, n_estimators, chunk_rows):
+    n_rows, pipeline, _, label_encoder = out_of_core.scan(data_path, chunk_rows)
+
+    model, n_chunks, train_rows = out_of_core.train(
+        data_path, pipeline, label_encoder, n_rows, {'min_samples_leaf': 10},
+        n_estimators=n_estimators, chunk_rows=chunk_rows
+    )
+
+    assert n_chunks == -(-n_rows // chunk_rows)
+    assert len(model.estimators_) == n_estimators
+    assert 0 < train_rows < n_rows
+
+def test_no_training_rows_is_a_clear_error(data_path):
+    n_rows, pipeline, _, label_encoder = out_of_core.scan(data_path, 1000)
+
+    with pytest.raises(ValueError, match='brak wierszy treningowych'):
+        out_of_core.train(data_path, pipeline, label_encoder, n_rows, {}, n_estimators=3,
+                          chunk_rows=1000, test_size=1.0)
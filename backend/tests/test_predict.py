@@ -0,0 +1,53 @@
+"""
+Testy /api/predict - walidacja niezależna od cache i mikro-batchera.
+"""
+
+import pytest
+
+from conftest import valid_offer
+
+INVALID_OFFERS = [
+    (dict(valid_offer(0), CAE_NAME=5), 'Nieprawidłowa wartość CAE_NAME'),
+    (dict(valid_offer(0), NUTS=['x']), 'Nieprawidłowa wartość NUTS'),
+    (dict(valid_offer(0), VALUE_EURO='abc'), 'Nieprawidłowa wartość VALUE_EURO'),
+    ({k: v for k, v in valid_offer(0).items() if k != 'NUTS'}, 'Brakuje pola: NUTS'),
+    (['nie', 'obiekt'], 'Oferta musi być obiektem JSON'),
+]
+
+@pytest.fixture(params=['direct', 'micro_batch', 'cache'])
+def predict_client(request, app, client):
+    """Klient z predykcją bezpośrednią, przez mikro-batcher albo przez cache."""
+    app.config.update(MICRO_BATCH_ENABLED=request.param == 'micro_batch',
+                      PREDICTION_CACHE_SIZE=100 if request.param == 'cache' else 0)
+    return client
+
+@pytest.mark.parametrize('offer, error', INVALID_OFFERS)
+def test_invalid_offer_is_400_in_every_mode(predict_client, offer, error):
+    response = predict_client.post('/api/predict', json=offer)
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+def test_valid_offer_in_every_mode(predict_client):
+    response = predict_client.post('/api/predict', json=valid_offer(1))
+
+    assert response.status_code == 200
+    assert 'cpv' in response.get_json()['result']
+
+@pytest.mark.parametrize('offer, error', INVALID_OFFERS + [
+    (dict(valid_offer(0), VALUE_EURO=float('nan')), 'Nieprawidłowa wartość VALUE_EURO'),
+])
+def test_predict_and_predict_batch_share_validation(client, offer, error):
+    from app.api.routes import predictor_handle
+
+    client.get('/api/model-info')
+    predictor = predictor_handle.get()
+
+    with pytest.raises(ValueError, match=error):
+        predictor.predict(offer)
+    assert predictor.predict_batch([offer]) == [{'success': False, 'error': error}]
+
+    single = client.post('/api/predict', json=offer)
+    batch = client.post('/api/predict/batch', json={'offers': [offer]})
+    assert single.status_code == 400
+    assert single.get_json()['error'] == batch.get_json()['results'][0]['error'] == error
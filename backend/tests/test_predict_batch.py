@@ -0,0 +1,27 @@
+"""
+Testy /api/predict/batch - błędy walidacji zgłaszane per wiersz.
+"""
+
+from conftest import valid_offer
+
+def test_batch_rejects_non_string_categorical_per_row(client):
+    offers = [valid_offer(0), dict(valid_offer(1), CAE_NAME=['a']), valid_offer(2)]
+
+    response = client.post('/api/predict/batch', json={'offers': offers})
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [r['success'] for r in results] == [True, False, True]
+    assert results[1]['error'] == 'Nieprawidłowa wartość CAE_NAME'
+    assert 'cpv' in results[0]['result']
+
+def test_batch_rejects_unhashable_nuts_and_contract_type(client):
+    offers = [dict(valid_offer(0), NUTS={'x': 1}), dict(valid_offer(1), TYPE_OF_CONTRACT=3),
+              dict(valid_offer(2), NUTS=None)]
+
+    results = client.post('/api/predict/batch', json={'offers': offers}).get_json()['results']
+
+    assert results[0]['error'] == 'Nieprawidłowa wartość NUTS'
+    assert results[1]['error'] == 'Nieprawidłowa wartość TYPE_OF_CONTRACT'
+    # Brak kategorii (None) - nieznana kategoria, jak dotąd
+    assert results[2]['success']
@@ -0,0 +1,93 @@
+"""
+Testy /api/predict/stream - błędy wierszy nie przerywają strumienia.
+"""
+
+import io
+import json
+
+from conftest import valid_offer
+
+def post_ndjson(client, offers, **params):
+    body = '\n'.join(json.dumps(offer) for offer in offers) + '\n'
+    response = client.post('/api/predict/stream', data=body, query_string=params,
+                           content_type='application/x-ndjson')
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+def test_stream_reports_bad_categorical_row_and_continues(client):
+    offers = [valid_offer(0), dict(valid_offer(1), NUTS=['x']), valid_offer(2), valid_offer(3)]
+
+    records = post_ndjson(client, offers)
+
+    assert [r['row'] for r in records] == [0, 1, 2, 3]
+    assert [r['success'] for r in records] == [True, False, True, True]
+    assert records[1]['error'] == 'Nieprawidłowa wartość NUTS'
+
+def test_stream_failed_chunk_yields_error_rows_and_keeps_streaming(client, app, monkeypatch):
+    from app.services.predictor import CPVPredictor
+
+    app.config['STREAM_CHUNK_SIZE'] = 2
+    original = CPVPredictor.predict_batch
+
+    def failing_first_chunk(self, offers, top_n=5):
+        if offers[0] == valid_offer(0):
+            raise RuntimeError('awaria')
+        return original(self, offers, top_n=top_n)
+
+    monkeypatch.setattr(CPVPredictor, 'predict_batch', failing_first_chunk)
+
+    records = post_ndjson(client, [valid_offer(i) for i in range(5)])
+
+    assert [r['row'] for r in records] == [0, 1, 2, 3, 4]
+    assert [r['success'] for r in records] == [False, False, True, True, True]
+    assert records[0]['error'] == 'Błąd predykcji partii: awaria'
+
+def test_line_separator_inside_json_string_is_one_record(client):
+    offers = [dict(valid_offer(0), NOTE='a\u2028b\u2029c\x85d\x1ce'), valid_offer(1)]
+    body = '\n'.join(json.dumps(offer, ensure_ascii=False) for offer in offers) + '\n'
+
+    response = client.post('/api/predict/stream', data=body.encode('utf-8'),
+                           content_type='application/x-ndjson')
+
+    records = [json.loads(line) for line in response.get_data(as_text=True).split('\n') if line]
+    assert [r['row'] for r in records] == [0, 1]
+    assert all(r['success'] for r in records)
+
+def test_overlong_line_is_a_row_error_and_not_buffered():
+    from app.services.stream_scoring import RowError, iter_lines
+
+    body = b'{"a": 1}\n' + b'x' * 1000 + b'\n{"b": 2}\r\n' + b'y' * 1000
+    lines = list(iter_lines(io.BytesIO(body), read_size=7, max_length=100))
+
+    assert lines[0] == '{"a": 1}\n'
+    assert isinstance(lines[1], RowError)
+    assert lines[2] == '{"b": 2}\r\n'
+    assert isinstance(lines[3], RowError)
+    assert len(lines) == 4
+
+def test_stream_overlong_line_keeps_row_numbers(client, app):
+    app.config['STREAM_MAX_LINE_LENGTH'] = 200
+    long_offer = dict(valid_offer(1), NOTE='x' * 500)
+
+    records = post_ndjson(client, [valid_offer(0), long_offer, valid_offer(2)])
+
+    assert [r['row'] for r in records] == [0, 1, 2]
+    assert [r['success'] for r in records] == [True, False, True]
+    assert records[1]['error'] == 'Wiersz dłuższy niż 200 znaków'
+
+def test_csv_stream_overlong_line_keeps_row_numbers(client, app):
+    app.config['STREAM_MAX_LINE_LENGTH'] = 200
+    rows = ['VALUE_EURO,CAE_NAME,NUTS,TYPE_OF_CONTRACT',
+            '1000,Gmina A,PL21,SERVICES',
+            '2000,' + 'x' * 500 + ',PL41,SUPPLIES',
+            '3000,Szpital C,PL91,WORKS']
+
+    response = client.post('/api/predict/stream', data='\n'.join(rows) + '\n',
+                           query_string={'format': 'csv'}, content_type='text/csv')
+
+    assert response.status_code == 200
+    out = response.get_data(as_text=True).splitlines()
+    assert out[0].startswith('row,')
+    assert [line.split(',')[0] for line in out[1:]] == ['0', '1', '2']
+    assert out[2].endswith('Wiersz dłuższy niż 200 znaków')
+    assert out[1].split(',')[1] and out[3].split(',')[1]
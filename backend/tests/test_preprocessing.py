@@ -0,0 +1,66 @@
+"""
+Testy DataPreprocessor - dopasowanie, transformacja i zapis preprocessora.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.preprocessing import DataPreprocessor
+
+COLUMNS = dict(cpv_col='CPV', value_col='VALUE_EURO',
+               categorical_cols=['CAE_NAME', 'NUTS', 'TYPE_OF_CONTRACT'], text_cols=['TITLE'])
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'CPV': [45000000, 33000000, 79000000, 45000000, 33000000],
+        'VALUE_EURO': [1000.0, 25000.0, np.nan, 500.0, 75000.0],
+        'CAE_NAME': ['Gmina A', 'Szpital C', 'Gmina B', None, 'Gmina A'],
+        # Kody liczbowe i tekstowe w jednej kolumnie
+        'NUTS': ['PL21', 41, 'PL91', 41, 'PL21'],
+        'TYPE_OF_CONTRACT': ['WORKS', 'SUPPLIES', 'SERVICES', 'WORKS', 'SUPPLIES'],
+        'TITLE': ['road repair works', 'medical supplies', 'cleaning services',
+                  'bridge works', 'hospital beds supplies']
+    })
+
+def test_transform_matches_fit_output(frame):
+    preprocessor = DataPreprocessor()
+    X, y, names = preprocessor.create_features(frame, **COLUMNS)
+
+    assert X.shape == (len(frame), len(names))
+    assert X.dtype == np.float32
+    assert (preprocessor.transform(frame) != X).nnz == 0
+    assert list(y) == list(frame['CPV'])
+
+def test_mixed_type_column_is_encoded(frame):
+    preprocessor = DataPreprocessor()
+    preprocessor.create_features(frame, **COLUMNS)
+
+    assert preprocessor.categorical_vocabularies['NUTS'] == ['PL21', 41, 'PL91']
+    assert preprocessor.categorical_vocabularies['CAE_NAME'] == ['Gmina A', 'Gmina B', 'Szpital C']
+
+def test_unknown_category_gives_zero_block(frame):
+    preprocessor = DataPreprocessor()
+    _, _, names = preprocessor.create_features(frame, **COLUMNS)
+    new = frame.head(2).assign(CAE_NAME=['Nieznany', 'Gmina B'], NUTS=['PL99', 41])
+
+    X = preprocessor.transform(new).toarray()
+
+    cae = [i for i, name in enumerate(names) if name.startswith('CAE_NAME_')]
+    nuts = [i for i, name in enumerate(names) if name.startswith('NUTS_')]
+    assert X[0, cae].sum() == 0 and X[0, nuts].sum() == 0
+    assert X[1, cae].sum() == 1 and X[1, nuts].sum() == 1
+
+def test_save_load_round_trip(frame, tmp_path):
+    preprocessor = DataPreprocessor()
+    X, _, names = preprocessor.create_features(frame, **COLUMNS)
+    path = tmp_path / 'preprocessor.pkl'
+
+    preprocessor.save(path)
+    loaded = DataPreprocessor.load(path)
+
+    assert loaded.feature_names == names
+    assert (loaded.transform(frame) != X).nnz == 0
+    X_new, y_new, names_new = loaded.create_features(frame, fit=False)
+    assert (X_new != X).nnz == 0 and names_new == names
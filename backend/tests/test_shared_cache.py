@@ -0,0 +1,66 @@
+"""
+Testy współdzielonego cache SQLite - licznik rozmiaru bez skanowania tabeli.
+"""
+
+import sqlite3
+
+from app.services.shared_cache import SQLitePredictionCache
+
+def table_count(path):
+    with sqlite3.connect(str(path)) as conn:
+        return conn.execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+
+def test_size_tracks_inserts_replaces_and_deletes(tmp_path):
+    path = tmp_path / 'cache.sqlite3'
+    cache = SQLitePredictionCache(path, maxsize=1000)
+
+    for i in range(10):
+        cache.set(('v1', 'A', i), {'cpv': i})
+    # Nadpisanie istniejącego klucza nie zwiększa rozmiaru
+    cache.set(('v1', 'A', 3), {'cpv': 33})
+
+    assert cache.get(('v1', 'A', 3)) == {'cpv': 33}
+    assert cache.stats()['size'] == table_count(path) == 10
+    cache.clear()
+    assert cache.stats()['size'] == table_count(path) == 0
+
+def test_prune_keeps_maxsize(tmp_path):
+    path = tmp_path / 'cache.sqlite3'
+    cache = SQLitePredictionCache(path, maxsize=50)
+    cache.PRUNE_EVERY = 10
+
+    for i in range(200):
+        cache.set(('v1', i), {'cpv': i})
+
+    stats = cache.stats()
+    assert stats['size'] == table_count(path) == 50
+    assert stats['evictions'] == 150
+    # Najstarsze wpisy usunięte
+    assert cache.get(('v1', 0)) is None and cache.get(('v1', 199)) == {'cpv': 199}
+
+def test_size_shared_between_instances_and_existing_database(tmp_path):
+    path = tmp_path / 'cache.sqlite3'
+    with sqlite3.connect(str(path)) as conn:
+        # Baza sprzed licznika rozmiaru
+        conn.execute('CREATE TABLE predictions (key TEXT PRIMARY KEY, value TEXT NOT NULL,'
+                     ' created_at REAL NOT NULL, expires_at REAL)')
+        conn.executemany('INSERT INTO predictions VALUES (?, ?, 0, NULL)',
+                         [(f'["old",{i}]', '{}') for i in range(7)])
+
+    first = SQLitePredictionCache(path)
+    second = SQLitePredictionCache(path)
+    first.set(('v1', 1), {'cpv': 1})
+    second.set(('v1', 2), {'cpv': 2})
+
+    assert first.stats()['size'] == second.stats()['size'] == table_count(path) == 9
+
+def test_invalidate_relies_on_model_version_in_key(tmp_path):
+    cache = SQLitePredictionCache(tmp_path / 'cache.sqlite3')
+    cache.set(('v1', 'A'), {'cpv': 1})
+
+    cache.invalidate()
+
+    # Wpis starej wersji zostaje w bazie, nowa wersja ma osobny klucz
+    assert cache.get(('v1', 'A')) == {'cpv': 1}
+    assert cache.get(('v2', 'A')) is None
+    assert cache.stats()['invalidations'] == 1
@@ -0,0 +1,40 @@
+"""
+Punkt wejścia WSGI dla serwera produkcyjnego (gunicorn)
+Model: CPVClassifier v1.0
+
+Model jest wczytywany raz w procesie master, zanim gunicorn utworzy
+workery (preload_app w gunicorn.conf.py). Workery dziedziczą strony
+pamięci z lasem przez copy-on-write zamiast wczytywać własne kopie.
+
+Uruchomienie (z katalogu backend/):
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import gc
+import os
+
+from app import create_app
+from app.api.routes import init_predictor, warm_up
+
+# Model wczytywany synchronicznie (bez wątku w tle) - przed fork workerów
+app = create_app(os.getenv('FLASK_CONFIG', 'production'), preload=False)
+
+with app.app_context():
+    predictor = init_predictor()
+
+if predictor is None:
+    raise RuntimeError("Nie można uruchomić aplikacji - brak modelu!")
+
+# Predykcja jednego żądania na jednym rdzeniu - równoległość dają workery
+if hasattr(predictor.model, 'n_jobs'):
+    predictor.model.n_jobs = 1
+
+# Rozgrzewka w master - workery startują gotowe (/readyz = 200)
+with app.app_context():
+    if warm_up() is None:
+        raise RuntimeError("Nie można uruchomić aplikacji - rozgrzewka modelu nieudana!")
+
+# Obiekty wczytane przed fork nie są skanowane przez GC w workerach,
+# więc ich strony pamięci pozostają współdzielone
+gc.collect()
+gc.freeze()